@@ -2,6 +2,7 @@
 Smart Surveillance System - Application Factory
 """
 import os
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -38,7 +39,8 @@ def create_app(config_name=None):
     db.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
+    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet',
+                      message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
     
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -50,15 +52,37 @@ def create_app(config_name=None):
     from app.routes.main import main_bp
     from app.routes.api import api_bp
     from app.routes.workflow_api import workflow_api_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.health import health_bp
+    from app.routes.assets import assets_bp
+    from app.routes.media import media_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(workflow_api_bp, url_prefix='/api/workflow')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(assets_bp)
+    app.register_blueprint(media_bp, url_prefix='/media')
     
-    # Create database tables
+    # Vision/inference modules are imported lazily unless asked for up front
+    if app.config.get('PREWARM_IMPORTS'):
+        from app.utils import prewarm_imports
+        prewarm_imports(app.config)
+    
+    # Load models in the background; CLI commands (flask init-db, ...) skip it
+    if app.config['PREWARM_MODELS'] and click.get_current_context(silent=True) is None:
+        from app.utils.warmup import warmup
+        warmup.start(app, app.config['PREWARM_MODELS'])
+    
+    # Create database tables and add columns introduced since they were created
     with app.app_context():
+        from app.models.engine import configure_engine
+        from app.models.schema import add_missing_columns
+        configure_engine(db.engine, app.config)
         db.create_all()
+        add_missing_columns(db)
     
     # Register error handlers
     register_error_handlers(app)
@@ -0,0 +1,50 @@
+"""
+Per-connection database settings of the engine profile
+
+SQLite defaults to a rollback journal, where every commit from the stream
+path locks out readers of /api/events and /api/stats. With WAL, readers
+keep reading the last committed state while one writer appends, and
+synchronous=NORMAL drops the fsync on every commit (the WAL is synced at
+checkpoints). These are connection pragmas, so they are applied as each
+pooled connection is opened. Postgres pool settings are plain engine
+options (see engine_options in config/config.py).
+"""
+import logging
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def configure_engine(engine, config):
+    """
+    Apply the DATABASE_PROFILE to new connections of an engine
+    
+    Args:
+        engine: SQLAlchemy engine
+        config: App config
+    """
+    if config['DATABASE_PROFILE'] != 'auto' or engine.dialect.name != 'sqlite':
+        return
+    
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_MODES)}, got {synchronous!r}")
+    # In-memory databases have no journal file to switch to WAL
+    in_memory = engine.url.database in (None, '', ':memory:')
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory:
+                cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+            cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+        finally:
+            cursor.close()
+    
+    logger.info(f"SQLite profile: WAL={not in_memory}, synchronous={synchronous}, "
+                f"busy_timeout={config['SQLITE_BUSY_TIMEOUT']} ms, mmap_size={config['SQLITE_MMAP_SIZE']}")
@@ -19,6 +19,12 @@ class Event(db.Model):
     confidence = db.Column(db.Float, nullable=False)
     bounding_box = db.Column(db.Text)  # JSON string: {x, y, width, height}
     
+    # Tracking: one event per tracked object, from first to last sighting
+    track_id = db.Column(db.Integer)
+    first_seen = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime)
+    zone = db.Column(db.String(64))  # zone of a zone-rule event (object_type is the rule name)
+    
     # Media files
     image_path = db.Column(db.String(256))
     video_path = db.Column(db.String(256))
@@ -35,22 +41,43 @@ class Event(db.Model):
     is_reviewed = db.Column(db.Boolean, default=False)
     reviewed_at = db.Column(db.DateTime)
     
+    # Fields of to_dict(); list endpoints select only these columns
+    DICT_FIELDS = ('id', 'timestamp', 'camera_id', 'camera_name', 'object_type', 'confidence',
+                   'bounding_box', 'track_id', 'first_seen', 'last_seen', 'zone', 'image_path',
+                   'video_path', 'alert_sent', 'is_reviewed', 'notes')
+    DATETIME_FIELDS = ('timestamp', 'first_seen', 'last_seen')
+    
     def to_dict(self):
         """Convert event to dictionary"""
-        return {
-            'id': self.id,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
-            'camera_id': self.camera_id,
-            'camera_name': self.camera_name,
-            'object_type': self.object_type,
-            'confidence': self.confidence,
-            'bounding_box': self.bounding_box,
-            'image_path': self.image_path,
-            'video_path': self.video_path,
-            'alert_sent': self.alert_sent,
-            'is_reviewed': self.is_reviewed,
-            'notes': self.notes
-        }
+        return Event.rows_to_dicts([tuple(getattr(self, field) for field in Event.DICT_FIELDS)])[0]
+    
+    @classmethod
+    def dict_columns(cls):
+        """Columns to select for rows_to_dicts(), skipping ORM object loading"""
+        return [getattr(cls, field) for field in cls.DICT_FIELDS]
+    
+    @classmethod
+    def rows_to_dicts(cls, rows):
+        """
+        Convert rows of dict_columns() to the dictionaries of to_dict()
+        
+        Args:
+            rows: Iterable of tuples (or result rows) in DICT_FIELDS order
+        
+        Returns:
+            list of dict
+        """
+        fields = cls.DICT_FIELDS
+        datetime_positions = [fields.index(field) for field in cls.DATETIME_FIELDS]
+        
+        result = []
+        for row in rows:
+            values = list(row)
+            for position in datetime_positions:
+                value = values[position]
+                values[position] = value.isoformat() if value else None
+            result.append(dict(zip(fields, values)))
+        return result
     
     def mark_as_reviewed(self, notes=None):
         """Mark event as reviewed"""
@@ -0,0 +1,49 @@
+"""
+Schema upgrades for existing databases
+
+db.create_all() creates missing tables but never alters existing ones, so
+columns added to a model later are added here with ALTER TABLE. Only
+nullable columns without server defaults can be added this way; anything
+else needs a manual migration.
+"""
+import logging
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(db):
+    """
+    Add model columns missing from existing tables (safe to run repeatedly)
+    
+    Args:
+        db: Flask-SQLAlchemy instance, inside an app context
+    
+    Returns:
+        list: 'table.column' names that were added
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            if not column.nullable or column.primary_key:
+                logger.warning(f"Column {table.name}.{column.name} is missing and not nullable; "
+                               f"add it with a manual migration")
+                continue
+            
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(f'{table.name}.{column.name}')
+            logger.info(f"Added column {table.name}.{column.name}")
+    
+    return added
@@ -2,7 +2,10 @@
 User model for authentication and authorization
 """
 from datetime import datetime
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 
@@ -39,7 +42,62 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+def snapshot_user(user):
+    """
+    Detached copy of a loaded user, safe to keep between requests
+    
+    Args:
+        user: Persistent User
+    
+    Returns:
+        User holding the same column values, detached from any session
+    """
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login"""
-    return User.query.get(int(user_id))
+    """Load user by ID for Flask-Login, from the user cache when possible"""
+    from app.utils.user_cache import user_cache
+    
+    user_id = int(user_id)
+    ttl = current_app.config.get('USER_CACHE_TTL', 0)
+    if ttl <= 0:
+        return User.query.get(user_id)
+    
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        # Attach to this request's session without a SELECT
+        return db.session.merge(cached, load=False)
+    
+    user = User.query.get(user_id)
+    if user is not None:
+        user_cache.put(user_id, snapshot_user(user), ttl)
+    return user
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    """Drop a changed user from the cache at flush and again at commit"""
+    from app.utils.user_cache import user_cache
+    
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        # A concurrent request may re-cache the old row before this commits
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    """Drop users changed by the committed transaction"""
+    changed = session.info.pop('changed_user_ids', None)
+    if changed:
+        from app.utils.user_cache import user_cache
+        for user_id in changed:
+            user_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    """Rolled-back changes need no second invalidation"""
+    session.info.pop('changed_user_ids', None)
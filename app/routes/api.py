@@ -1,47 +1,94 @@
 """
 API routes for AJAX requests and video streaming
 """
-from flask import Blueprint, jsonify, request, Response, current_app
+from flask import Blueprint, jsonify, request, Response, current_app, stream_with_context, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models.event import Event
-from app.utils.detector import ObjectDetector
-from app.utils.camera import CameraManager
 from app.utils.email_alerts import send_alert_email, send_test_email
-from app.utils.video_utils import save_frame_image, save_video_clip, encode_frame_to_jpeg
-import cv2
+from app.utils.metrics import time_stage, track_stream, FRAMES_PROCESSED, EVENTS_SAVED, DETECTIONS_UNCONFIRMED
+from app.utils.profiler import run_profiler
+from app.utils.warmup import warmup, os_threading, FAILED
+from app.utils.serialization import json_response
+from sqlalchemy import select, func, event as sa_event
 import json
+import math
+import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 api_bp = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
-# Global instances
+# Global instances (the vision modules behind them are imported on first use)
 camera_manager = None
 detector = None
 detection_active = False
+event_histogram = None
+
+# Real locks: the detector is also built on a warm-up OS thread
+_camera_manager_lock = os_threading().Lock()
+_detector_lock = os_threading().Lock()
 
 def get_camera_manager():
     """Get or create camera manager instance"""
     global camera_manager
     if camera_manager is None:
-        camera_manager = CameraManager()
+        with _camera_manager_lock:
+            if camera_manager is None:
+                from app.utils.camera import CameraManager
+                camera_manager = CameraManager()
     return camera_manager
 
+def get_event_histogram():
+    """Get or create the event histogram (caches closed buckets)"""
+    global event_histogram
+    if event_histogram is None:
+        from app.utils.histogram import EventHistogram
+        event_histogram = EventHistogram(Event, ttl=current_app.config['HISTOGRAM_CACHE_TTL'])
+    return event_histogram
+
+@sa_event.listens_for(Event, 'after_delete')
+def _invalidate_event_histogram(mapper, connection, target):
+    """Deleted events change closed buckets"""
+    if event_histogram is not None:
+        event_histogram.invalidate()
+
 def get_detector():
-    """Get or create detector instance"""
+    """
+    Get or create detector instance (rebuilt if its backend failed to load)
+    
+    Blocks on a real lock while the model loads; request handlers wait
+    for warmup.ensure(app, 'detector') to report ready first, after which
+    this returns without taking the lock.
+    """
     global detector
-    if detector is None:
-        detector = ObjectDetector()
+    if detector is None or detector.backend is None:
+        with _detector_lock:
+            if detector is None or detector.backend is None:
+                from app.utils.detector import ObjectDetector
+                detector = ObjectDetector()
     return detector
 
+def prewarm_detector():
+    """Warm-up initializer; worker mode serves no standard detection, so no model is loaded"""
+    if current_app.config['DETECTION_MODE'] == 'worker':
+        return True
+    return get_detector().backend is not None
+
+warmup.register('detector', prewarm_detector)
+
 @api_bp.route('/start-detection', methods=['POST'])
 @login_required
 def start_detection():
     """Start object detection"""
     global detection_active
     
+    # Detection here runs inside the viewer's stream, i.e. in this web process
+    if current_app.config['DETECTION_MODE'] == 'worker':
+        return jsonify({'success': False,
+                        'message': 'Standard detection is not available in worker mode; use workflow detection'}), 409
+    
     try:
         data = request.get_json()
         camera_id = data.get('camera_id', 'default')
@@ -49,10 +96,13 @@ def start_detection():
         
         manager = get_camera_manager()
         
-        # Add camera if not exists
-        if not manager.get_camera(camera_id):
+        # Add camera if not exists, restart it if its capture loop gave up
+        camera = manager.get_camera(camera_id)
+        if not camera:
             if not manager.add_camera(camera_id, camera_source):
                 return jsonify({'success': False, 'message': 'Failed to initialize camera'}), 400
+        elif not camera.is_active and not camera.start():
+            return jsonify({'success': False, 'message': 'Failed to restart camera'}), 400
         
         detection_active = True
         logger.info(f"Detection started for camera {camera_id}")
@@ -88,72 +138,273 @@ def stop_detection():
         logger.error(f"Error stopping detection: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def open_track_event(track, camera_id, user_id):
+    """
+    Save the event of a new track and send its alert
+    
+    Args:
+        track: Track that just started; best_image holds its annotated frame
+        camera_id: Camera identifier
+        user_id: User the event is recorded for
+    """
+    from app.utils.video_utils import save_frame_image
+    
+    detection = track.best
+    event = Event(
+        camera_id=camera_id,
+        camera_name=f"Camera {camera_id}",
+        object_type=track.object_type,
+        confidence=detection['confidence'],
+        bounding_box=json.dumps(detection['bbox']),
+        track_id=track.track_id,
+        first_seen=track.first_seen,
+        last_seen=track.last_seen,
+        user_id=user_id
+    )
+    
+    with time_stage('db_write', camera_id):
+        db.session.add(event)
+        db.session.flush()
+    
+    with time_stage('disk_write', camera_id):
+        event.image_path = save_frame_image(track.best_image, camera_id, event.id)
+    
+    with time_stage('db_write', camera_id):
+        db.session.commit()
+    EVENTS_SAVED.inc(camera=camera_id)
+    
+    track.event_id = event.id
+    track.saved_confidence = detection['confidence']
+    track.best_image = None
+    
+    # Send alert email (in background), once per tracked object
+    with time_stage('email', camera_id):
+        send_alert_email({
+            'object_type': track.object_type,
+            'confidence': detection['confidence'],
+            'camera_id': camera_id,
+            'camera_name': f"Camera {camera_id}"
+        })
+    event.alert_sent = True
+    event.alert_sent_at = datetime.utcnow()
+    db.session.commit()
+
+def close_track_event(track, camera_id):
+    """
+    Finish the event of an ended track with its last sighting and best detection
+    
+    Args:
+        track: Track that ended
+        camera_id: Camera identifier
+    """
+    from app.utils.video_utils import save_frame_image, remove_frame_image
+    
+    if track.event_id is None:
+        return
+    
+    try:
+        event = db.session.get(Event, track.event_id)
+        if event is None:
+            return
+        
+        event.last_seen = track.last_seen
+        
+        # Replace the evidence image if a better detection came later
+        if track.best_image is not None and track.confidence > track.saved_confidence:
+            with time_stage('disk_write', camera_id):
+                image_path = save_frame_image(track.best_image, camera_id, event.id)
+            if image_path:
+                if event.image_path and event.image_path != image_path:
+                    remove_frame_image(event.image_path)
+                event.image_path = image_path
+            event.confidence = track.confidence
+            event.bounding_box = json.dumps(track.best['bbox'])
+        
+        with time_stage('db_write', camera_id):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error closing event of track {track.track_id}: {str(e)}")
+    finally:
+        track.best_image = None
+
+def save_rule_event(rule_event, frame, det, camera_id, user_id):
+    """
+    Save and alert a zone rule event
+    
+    Args:
+        rule_event: Event dictionary from ZoneRuleEngine.update()
+        frame: Frame the rule fired on
+        det: Detector (draws the boxes)
+        camera_id: Camera identifier
+        user_id: User the event is recorded for
+    """
+    from app.utils.video_utils import save_frame_image
+    
+    now = datetime.utcnow()
+    event = Event(
+        camera_id=camera_id,
+        camera_name=f"Camera {camera_id}",
+        object_type=rule_event['rule'],
+        confidence=rule_event['confidence'],
+        bounding_box=json.dumps(rule_event['bbox']),
+        zone=rule_event['zone'],
+        first_seen=now - timedelta(seconds=rule_event['dwell_seconds']),
+        last_seen=now,
+        user_id=user_id
+    )
+    
+    with time_stage('db_write', camera_id):
+        db.session.add(event)
+        db.session.flush()
+    
+    # Outline the zone along with the detections inside it
+    zone_box = {'class': f"{rule_event['rule']} ({rule_event['zone']})",
+                'confidence': rule_event['confidence'], 'bbox': rule_event['bbox']}
+    with time_stage('draw', camera_id):
+        annotated = det.draw_detections(frame, rule_event['detections'].to_dicts() + [zone_box])
+    with time_stage('disk_write', camera_id):
+        event.image_path = save_frame_image(annotated, camera_id, event.id)
+    
+    with time_stage('db_write', camera_id):
+        db.session.commit()
+    EVENTS_SAVED.inc(camera=camera_id)
+    
+    with time_stage('email', camera_id):
+        send_alert_email({
+            'object_type': rule_event['rule'],
+            'confidence': rule_event['confidence'],
+            'camera_id': camera_id,
+            'camera_name': f"Camera {camera_id}"
+        })
+    event.alert_sent = True
+    event.alert_sent_at = datetime.utcnow()
+    db.session.commit()
+
 @api_bp.route('/video-feed/<camera_id>')
 @login_required
 def video_feed(camera_id):
-    """Video streaming route"""
+    """
+    Video streaming route
+    Query: ?profile=preview|stream (encode profile, default stream)
+    """
+    from app.utils.video_utils import encode_frame_profile, render_status_frame
+    from app.utils.preprocessing import scale_detections
+    
+    # Unknown IDs would add metric series and per-camera state without limit
+    if get_camera_manager().get_camera(camera_id) is None:
+        abort(404)
+    
+    app = current_app._get_current_object()
+    profiles = current_app.config['ENCODE_PROFILES']
+    profile = profiles.get(request.args.get('profile'), profiles['stream'])
+    user_id = current_user.id
+    
     def generate():
+        # Feeds opened before start or after stop have nothing to stream
+        if not detection_active:
+            return
+        
         manager = get_camera_manager()
+        
+        # Show a status frame instead of blocking while the model loads (or
+        # waits for a retry): get_detector() holds a real lock during the load,
+        # which would stall the eventlet hub if a greenlet waited on it
+        while not warmup.ensure(app, 'detector'):
+            if not detection_active:
+                return
+            if warmup.state('detector') == FAILED:
+                text = 'Detector failed to load, retrying...'
+            else:
+                text = 'Warming up detector...'
+            status_bytes = render_status_frame(text, profile)
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + status_bytes + b'\r\n')
+            time.sleep(0.5)
+        
         det = get_detector()
+        preprocessor = manager.get_preprocessor(camera_id)
+        confirmation = manager.get_confirmation_filter(camera_id)
+        zones = manager.get_zone_engine(camera_id)
+        tracker = manager.get_tracker(camera_id)
+        tracker.attach()
         frame_count = 0
+        last_seq = 0
         
-        while detection_active:
-            frame = manager.get_frame(camera_id)
-            
-            if frame is None:
-                continue
-            
-            # Perform detection on every Nth frame
-            if frame_count % current_app.config['FRAME_SKIP'] == 0:
-                detections = det.detect_objects(frame)
+        try:
+            while detection_active:
+                handle = manager.get_frame_handle(camera_id)
                 
-                # Save event if objects detected
-                if detections:
-                    for detection in detections:
-                        event = Event(
-                            camera_id=camera_id,
-                            camera_name=f"Camera {camera_id}",
-                            object_type=detection['class'],
-                            confidence=detection['confidence'],
-                            bounding_box=json.dumps(detection['bbox']),
-                            user_id=current_user.id
-                        )
-                        
-                        # Save frame image
-                        db.session.add(event)
-                        db.session.flush()
-                        
-                        frame_with_boxes = det.draw_detections(frame, detections)
-                        image_path = save_frame_image(frame_with_boxes, camera_id, event.id)
-                        event.image_path = image_path
+                # Wait for a frame we have not processed yet
+                if handle is None or handle.seq == last_seq:
+                    time.sleep(0.005)
+                    continue
+                
+                last_seq = handle.seq
+                frame = handle.image
+                detections = None
+                
+                # Perform detection on every Nth frame (on downscaled ROI tiles,
+                # boxes come back in full-frame coordinates)
+                if frame_count % current_app.config['FRAME_SKIP'] == 0:
+                    with time_stage('inference', camera_id):
+                        detections = preprocessor.detect(det, frame)
+                    FRAMES_PROCESSED.inc(pipeline='standard', camera=camera_id)
+                    
+                    # Only classes seen over several frames reach persistence (drops flicker)
+                    confirmed = confirmation.update(detections, handle.seq)
+                    if len(confirmed) < len(detections):
+                        DETECTIONS_UNCONFIRMED.inc(len(detections) - len(confirmed), camera=camera_id)
+                    
+                    if zones is not None:
+                        # Cameras with zones save rule-level events only
+                        with time_stage('rules', camera_id):
+                            rule_events = zones.update(confirmed, time.time(), frame.shape, handle.seq)
+                        for rule_event in rule_events:
+                            save_rule_event(rule_event, frame, det, camera_id, user_id)
+                        tracks = None
+                    else:
+                        # Follow objects across frames; events are saved per track, not per detection
+                        with time_stage('track', camera_id):
+                            tracks = tracker.update(confirmed, datetime.utcnow(), handle.seq)
+                    
+                    if tracks is not None:
+                        started, matched, ended = tracks
                         
-                        db.session.commit()
+                        # Keep the annotated frame of each track's best detection so far
+                        annotated = None
+                        for track in started + [t for t in matched if t.improved]:
+                            if annotated is None:
+                                with time_stage('draw', camera_id):
+                                    annotated = det.draw_detections(frame, confirmed)
+                            track.best_image = annotated
                         
-                        # Send alert email (in background)
-                        if not event.alert_sent:
-                            send_alert_email({
-                                'object_type': detection['class'],
-                                'confidence': detection['confidence'],
-                                'camera_id': camera_id,
-                                'camera_name': f"Camera {camera_id}"
-                            })
-                            event.alert_sent = True
-                            event.alert_sent_at = datetime.utcnow()
-                            db.session.commit()
+                        for track in started:
+                            open_track_event(track, camera_id, user_id)
+                        for track in ended:
+                            close_track_event(track, camera_id)
                 
-                # Draw detections on frame
-                frame = det.draw_detections(frame, detections)
-            
-            frame_count += 1
-            
-            # Encode frame to JPEG
-            jpeg_bytes = encode_frame_to_jpeg(frame)
-            
-            if jpeg_bytes:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n')
+                frame_count += 1
+                
+                # Stream a downscaled frame with boxes scaled to match
+                display, scale = preprocessor.stream_frame(frame)
+                if detections is not None:
+                    with time_stage('draw', camera_id):
+                        display = det.draw_detections(display, scale_detections(detections, scale))
+                
+                # Encode frame to JPEG
+                with time_stage('encode', camera_id):
+                    jpeg_bytes = encode_frame_profile(display, profile)
+                
+                if jpeg_bytes:
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n')
+        finally:
+            # The last stream of the camera closes the events of tracks still open
+            for track in tracker.detach():
+                close_track_event(track, camera_id)
     
-    return Response(generate(),
+    return Response(stream_with_context(track_stream(generate(), 'standard', camera_id)),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @api_bp.route('/events', methods=['GET'])
@@ -164,34 +415,79 @@ def get_events():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        events_query = Event.query.order_by(Event.timestamp.desc())
+        page = max(page, 1)
+        per_page = per_page if per_page > 0 else 20
         
         # Filtering
+        filters = []
         object_type = request.args.get('object_type')
         if object_type:
-            events_query = events_query.filter_by(object_type=object_type)
+            filters.append(Event.object_type == object_type)
         
         reviewed = request.args.get('reviewed')
         if reviewed is not None:
-            events_query = events_query.filter_by(is_reviewed=reviewed == 'true')
+            filters.append(Event.is_reviewed == (reviewed == 'true'))
         
-        # Pagination
-        pagination = events_query.paginate(page=page, per_page=per_page, error_out=False)
+        # Pagination over plain column rows: no Event objects or identity map for a list view
+        total = db.session.execute(select(func.count(Event.id)).where(*filters)).scalar()
+        rows = db.session.execute(
+            select(*Event.dict_columns()).where(*filters)
+            .order_by(Event.timestamp.desc())
+            .limit(per_page).offset((page - 1) * per_page)
+        ).all()
         
-        events_data = [event.to_dict() for event in pagination.items]
-        
-        return jsonify({
+        return json_response({
             'success': True,
-            'events': events_data,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page
+            'events': Event.rows_to_dicts(rows),
+            'total': total,
+            'pages': math.ceil(total / per_page),
+            'current_page': page
         })
         
     except Exception as e:
         logger.error(f"Error fetching events: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def parse_utc(value):
+    """Naive UTC datetime of an ISO 8601 string (None stays None), as stored in Event.timestamp"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@api_bp.route('/events/histogram', methods=['GET'])
+@login_required
+def get_events_histogram():
+    """
+    Event counts per time bucket
+    Query: ?bucket=hour&start=<ISO>&end=<ISO>&group_by=camera_id,object_type&camera_id=...&object_type=...
+    Returns: bucket starts and one zero-filled count series per group
+    """
+    try:
+        group_by = [name for name in request.args.get('group_by', '').split(',') if name]
+        filters = [(name, request.args[name]) for name in ('camera_id', 'object_type') if request.args.get(name)]
+        start, end = (parse_utc(request.args.get(name)) for name in ('start', 'end'))
+        
+        histogram = get_event_histogram().query(
+            db.session,
+            bucket=request.args.get('bucket', 'hour'),
+            start=start,
+            end=end,
+            group_by=group_by,
+            filters=filters,
+            max_buckets=current_app.config['HISTOGRAM_MAX_BUCKETS']
+        )
+        
+        return json_response({'success': True, **histogram})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error computing event histogram: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @api_bp.route('/events/<int:event_id>/review', methods=['POST'])
 @login_required
 def review_event(event_id):
@@ -224,7 +520,8 @@ def get_cameras():
             {
                 'id': cam_id,
                 'source': cam.source,
-                'is_active': cam.is_active
+                'is_active': cam.is_active,
+                'health': cam.get_health()
             }
             for cam_id, cam in cameras.items()
         ]
@@ -238,6 +535,22 @@ def get_cameras():
         logger.error(f"Error fetching cameras: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@api_bp.route('/cameras/health', methods=['GET'])
+@login_required
+def get_cameras_health():
+    """Get health state of every camera"""
+    try:
+        manager = get_camera_manager()
+        
+        return jsonify({
+            'success': True,
+            'health': manager.get_health()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error fetching camera health: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @api_bp.route('/test-email', methods=['POST'])
 @login_required
 def test_email():
@@ -297,3 +610,47 @@ def get_stats():
     except Exception as e:
         logger.error(f"Error fetching stats: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
+
+@api_bp.route('/admin/profile', methods=['GET'])
+@login_required
+def profile_pipeline():
+    """
+    Sample all threads for a while and return collapsed stacks (admin only)
+    Query: ?seconds=10&interval=0.01&thread=camera-&lines=1
+    Returns: text/plain collapsed stacks for flamegraph.pl / speedscope
+    """
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Admin access required'}), 403
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval', 0.01))
+        # float() also accepts nan and inf, which would make an empty or endless run
+        if not all(math.isfinite(value) and value > 0 for value in (seconds, interval)):
+            return jsonify({'success': False, 'message': 'seconds and interval must be positive numbers'}), 400
+        seconds = min(seconds, current_app.config['PROFILER_MAX_SECONDS'])
+        interval = max(interval, 0.001)
+        
+        profiler = run_profiler(
+            seconds,
+            interval,
+            sleep=time.sleep,
+            thread_filter=request.args.get('thread') or None,
+            include_lines=request.args.get('lines') == '1'
+        )
+        
+        if profiler is None:
+            return jsonify({'success': False, 'message': 'A profile is already running'}), 409
+        
+        logger.info(f"Profiled {profiler.samples} samples over {seconds}s for {current_user.username}")
+        
+        filename = f"profile_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.folded"
+        return Response(profiler.collapsed(), mimetype='text/plain',
+                        headers={'Content-Disposition': f'attachment; filename={filename}',
+                                 'X-Profile-Samples': str(profiler.samples)})
+        
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seconds and interval must be numbers'}), 400
+    except Exception as e:
+        logger.error(f"Error profiling pipeline: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
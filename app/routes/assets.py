@@ -0,0 +1,52 @@
+"""
+Fingerprinted static bundles with long-lived caching and precompression
+"""
+import mimetypes
+import os
+from flask import Blueprint, current_app, request, send_from_directory, url_for, abort
+from app.utils.assets import get_manifest
+
+assets_bp = Blueprint('assets', __name__)
+
+
+def _manifest():
+    """Bundle manifest of the running app"""
+    return get_manifest(current_app.static_folder, current_app.config['ASSET_BUILD_FOLDER'],
+                        check_sources=current_app.debug)
+
+
+def asset_url(name):
+    """URL of a bundle (e.g. 'workflow_dashboard.js') for templates"""
+    return url_for('assets.asset', filename=_manifest()[name])
+
+
+@assets_bp.app_context_processor
+def inject_asset_url():
+    """Make asset_url() available in every template"""
+    return {'asset_url': asset_url}
+
+
+@assets_bp.route('/assets/<filename>')
+def asset(filename):
+    """
+    Serve a fingerprinted bundle, precompressed when the client accepts it
+    Returns: The bundle with Cache-Control: immutable, 404 for unknown files
+    """
+    if filename not in _manifest().values():
+        abort(404)
+    
+    folder = current_app.config['ASSET_BUILD_FOLDER']
+    served, encoding = filename, None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.exists(os.path.join(folder, filename + suffix)):
+            served, encoding = filename + suffix, candidate
+            break
+    
+    max_age = current_app.config['ASSET_MAX_AGE']
+    response = send_from_directory(folder, served, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=max_age, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,42 @@
+"""
+Liveness and readiness probes
+"""
+from flask import Blueprint, jsonify, current_app
+from sqlalchemy import text
+from app import db
+from app.utils.warmup import warmup, READY
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.route('/readyz')
+def readyz():
+    """
+    Readiness: the database answers and every prewarmed model is loaded
+    Returns: 200 when ready, 503 while warming up or after a failure
+    (failed models are retried with backoff as the probe keeps asking)
+    """
+    try:
+        db.session.execute(text('SELECT 1'))
+        database = 'ok'
+    except Exception as e:
+        database = str(e)
+    
+    required = current_app.config['PREWARM_MODELS']
+    warmup.start(current_app._get_current_object(), required)
+    components = warmup.status()
+    ready = database == 'ok' and all(
+        components.get(name, {}).get('state') == READY for name in required
+    )
+    
+    return jsonify({
+        'ready': ready,
+        'database': database,
+        'components': components
+    }), 200 if ready else 503
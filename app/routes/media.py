@@ -0,0 +1,99 @@
+"""
+Evidence media of events: images, video clips and thumbnails
+"""
+import os
+import logging
+from flask import Blueprint, current_app, request, send_file, abort
+from flask_login import login_required
+from sqlalchemy import select
+from app import db
+from app.models.event import Event
+from app.utils.warmup import os_threading
+
+media_bp = Blueprint('media', __name__)
+logger = logging.getLogger(__name__)
+
+# Created on first thumbnail request (imports cv2)
+thumbnail_cache = None
+_thumbnail_cache_lock = os_threading().Lock()
+
+
+def get_thumbnail_cache():
+    """Get or create the thumbnail cache"""
+    global thumbnail_cache
+    if thumbnail_cache is None:
+        with _thumbnail_cache_lock:
+            if thumbnail_cache is None:
+                from app.utils.thumbnails import create_thumbnail_cache
+                thumbnail_cache = create_thumbnail_cache(current_app.config)
+    return thumbnail_cache
+
+
+def media_path(event_id, column):
+    """
+    Path of an event's media file, only if it lies in DETECTED_EVENTS_FOLDER
+    
+    Args:
+        event_id: Event ID
+        column: Event.image_path or Event.video_path
+    
+    Returns:
+        Absolute path; aborts with 404 for unknown events, missing files
+        and paths outside the evidence folder
+    """
+    path = db.session.execute(select(column).where(Event.id == event_id)).scalar()
+    if not path:
+        abort(404)
+    
+    root = os.path.realpath(current_app.config['DETECTED_EVENTS_FOLDER'])
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([root, real_path]) != root or not os.path.isfile(real_path):
+        logger.warning(f"Refusing media of event {event_id}: {path} is not a file in {root}")
+        abort(404)
+    return real_path
+
+
+def send_media(path, mimetype):
+    """Send a file with ETag/Last-Modified, Range support and the media cache policy"""
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    max_age = current_app.config['MEDIA_MAX_AGE']
+    # Evidence is private, and revalidation (304) is cheap when not cached outright
+    response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'private, no-cache'
+    return response
+
+
+@media_bp.route('/events/<int:event_id>/image')
+@login_required
+def event_image(event_id):
+    """Full-size evidence image of an event"""
+    return send_media(media_path(event_id, Event.image_path), 'image/jpeg')
+
+
+@media_bp.route('/events/<int:event_id>/video')
+@login_required
+def event_video(event_id):
+    """Video clip of an event; supports Range requests for seeking"""
+    return send_media(media_path(event_id, Event.video_path), 'video/mp4')
+
+
+@media_bp.route('/events/<int:event_id>/thumbnail')
+@login_required
+def event_thumbnail(event_id):
+    """
+    Thumbnail of an event's image
+    Query: width (one of THUMBNAIL_SIZES, default the smallest)
+    """
+    sizes = current_app.config['THUMBNAIL_SIZES']
+    width = request.args.get('width', min(sizes), type=int)
+    if width not in sizes:
+        abort(400, description=f"width must be one of {', '.join(str(size) for size in sizes)}")
+    
+    image_path = media_path(event_id, Event.image_path)
+    try:
+        thumbnail = get_thumbnail_cache().get(image_path, width)
+    except Exception as e:
+        logger.error(f"Error creating thumbnail for event {event_id}: {str(e)}")
+        thumbnail = None
+    if thumbnail is None:
+        abort(404)
+    return send_media(thumbnail, 'image/jpeg')
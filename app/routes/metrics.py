@@ -0,0 +1,82 @@
+"""
+Prometheus metrics endpoint
+"""
+from flask import Blueprint, Response, current_app, request, abort
+from app.routes import api, workflow_api
+from app.utils.metrics import REGISTRY, Counter, Gauge
+from app.utils.workflow_detector import WorkflowDetector
+
+metrics_bp = Blueprint('metrics', __name__)
+
+CAMERA_STATES = ('connecting', 'streaming', 'stalled', 'failed', 'stopped')
+
+
+@REGISTRY.register_collector
+def collect_cameras():
+    """Capture counters of the standard pipeline, read at scrape time"""
+    manager = api.camera_manager
+    if manager is None:
+        return []
+    
+    captured = Counter('surveillance_camera_frames_captured_total', 'Frames read from the camera', ['camera'])
+    dropped = Counter('surveillance_frames_dropped_total',
+                      'Frames overwritten before any consumer read them', ['camera'])
+    backlog = Gauge('surveillance_frame_backlog', 'Frames committed since the last read', ['camera'])
+    reconnects = Gauge('surveillance_camera_reconnect_attempts', 'Current reconnect attempts', ['camera'])
+    frame_age = Gauge('surveillance_camera_last_frame_age_seconds', 'Seconds since the last frame', ['camera'])
+    state = Gauge('surveillance_camera_state', 'Camera health state (1 = current)', ['camera', 'state'])
+    
+    for camera_id, camera in list(manager.get_all_cameras().items()):
+        health = camera.get_health()
+        stats = camera.frame_buffer.get_stats()
+        
+        captured.inc(health['frames_captured'], camera=camera_id)
+        dropped.inc(stats['dropped'], camera=camera_id)
+        backlog.set(stats['unread'], camera=camera_id)
+        reconnects.set(health['reconnect_attempts'], camera=camera_id)
+        if health['last_frame_age'] is not None:
+            frame_age.set(health['last_frame_age'], camera=camera_id)
+        for name in CAMERA_STATES:
+            state.set(1 if health['state'] == name else 0, camera=camera_id, state=name)
+    
+    return [captured, dropped, backlog, reconnects, frame_age, state]
+
+
+@REGISTRY.register_collector
+def collect_workflow():
+    """Per-camera counters of the workflow pipeline, read at scrape time"""
+    detector = workflow_api.workflow_detector
+    # In worker mode the pipelines (and their counters) live in the detection worker
+    if not isinstance(detector, WorkflowDetector):
+        return []
+    
+    frames = Counter('surveillance_workflow_frames_total', 'Frames received from the workflow pipeline', ['camera'])
+    encodes = Counter('surveillance_workflow_encodes_total', 'JPEG encodes for workflow viewers', ['camera'])
+    cache_hits = Counter('surveillance_workflow_encode_cache_hits_total',
+                         'Viewer frames served from an existing encode', ['camera'])
+    running = Gauge('surveillance_workflow_pipelines', 'Running workflow pipelines', [])
+    
+    for camera_id, slot in list(detector.cameras.items()):
+        frames.inc(slot.frame_count, camera=camera_id)
+        encodes.inc(slot.encode_cache.encodes, camera=camera_id)
+        cache_hits.inc(slot.encode_cache.hits, camera=camera_id)
+    running.set(len(detector.pipelines))
+    
+    return [frames, encodes, cache_hits, running]
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus text exposition of all metrics"""
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        # Camera IDs and pipeline state are not public: without a token only development serves them
+        if not (current_app.debug or current_app.testing):
+            abort(404)
+    elif request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
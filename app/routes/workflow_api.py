@@ -1,18 +1,19 @@
 """
 Workflow-based API routes using Roboflow InferencePipeline
 """
-from flask import Blueprint, jsonify, request, Response, current_app
+from flask import Blueprint, jsonify, request, Response, current_app, stream_with_context, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models.event import Event
-from app.utils.workflow_detector import WorkflowDetector
+from app.utils.workflow_detector import WorkflowDetector, DEFAULT_CAMERA_ID
 from app.utils.email_alerts import send_alert_email
-from app.utils.video_utils import save_frame_image
-import cv2
+from app.utils.metrics import time_stage, track_stream, EVENTS_SAVED, DETECTIONS_UNCONFIRMED
+from app.utils.warmup import warmup, os_threading, WARMING
+from app.utils.serialization import json_response
 import json
-import numpy as np
 import time
 import logging
+import threading
 from datetime import datetime
 
 workflow_api_bp = Blueprint('workflow_api', __name__)
@@ -20,36 +21,81 @@ logger = logging.getLogger(__name__)
 
 # Global workflow detector instance
 workflow_detector = None
+# Real lock: the local detector is also built on the warm-up OS thread
+_workflow_detector_lock = os_threading().Lock()
+# Green lock (patched under eventlet): building the remote detector waits for the
+# embedded worker, and a greenlet must not yield while holding a real lock
+_remote_detector_lock = threading.Lock()
+
+# Detection confirmation per camera for events saved through the API
+confirmation_filters = {}
 
 def get_workflow_detector():
-    """Get or create workflow detector instance"""
+    """Get or create workflow detector instance (a proxy of the detection worker in worker mode)"""
     global workflow_detector
     if workflow_detector is None:
-        workflow_detector = WorkflowDetector()
+        # Only requests build the remote detector (prewarm skips it in worker mode)
+        if current_app.config['DETECTION_MODE'] == 'worker':
+            with _remote_detector_lock:
+                if workflow_detector is None:
+                    from app.utils.detection_worker import create_remote_detector
+                    workflow_detector = create_remote_detector(current_app._get_current_object())
+        else:
+            with _workflow_detector_lock:
+                if workflow_detector is None:
+                    workflow_detector = WorkflowDetector()
     return workflow_detector
 
+def prewarm_workflow():
+    """Warm-up initializer; in worker mode the models live in the detection worker"""
+    if current_app.config['DETECTION_MODE'] == 'worker':
+        return True
+    return get_workflow_detector().prewarm()
+
+warmup.register('workflow', prewarm_workflow)
+
 @workflow_api_bp.route('/start-workflow-detection', methods=['POST'])
 @login_required
 def start_workflow_detection():
     """
     Start workflow-based detection
     Body: {
-        "camera_source": "0" or "video_url" or "rtsp://..."
+        "camera_source": "0" or "video_url" or "rtsp://...",
+        "camera_id": "default"
+    }
+    or, to run several cameras on one shared pipeline: {
+        "cameras": {"hall_a_1": "rtsp://...", "hall_a_2": "rtsp://..."}
     }
     """
     try:
-        data = request.get_json() or {}
-        camera_source = data.get('camera_source', current_app.config['CAMERA_SOURCE'])
-        
-        # Convert "0" string to integer for webcam
-        if camera_source == "0" or camera_source == 0:
-            camera_source = 0
+        # Loading the backend twice in parallel would waste the warm-up
+        if warmup.state('workflow') == WARMING:
+            response = jsonify({'success': False, 'message': 'Detector is warming up, try again shortly'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
+        data = request.get_json() or {}
         detector = get_workflow_detector()
-        result = detector.start_detection(camera_source)
+        
+        cameras = data.get('cameras')
+        if cameras:
+            if not isinstance(cameras, dict):
+                return jsonify({'success': False, 'message': 'cameras must map camera IDs to sources'}), 400
+            result = detector.start_group(cameras)
+            sources = cameras
+        else:
+            camera_id = data.get('camera_id', DEFAULT_CAMERA_ID)
+            camera_source = data.get('camera_source', current_app.config['CAMERA_SOURCE'])
+            
+            # Convert "0" string to integer for webcam
+            if camera_source == "0" or camera_source == 0:
+                camera_source = 0
+            
+            result = detector.start_detection(camera_source, camera_id)
+            sources = {camera_id: camera_source}
         
         if result['success']:
-            logger.info(f"Workflow detection started for source: {camera_source}")
+            logger.info(f"Workflow detection started for sources: {sources}")
             return jsonify(result)
         else:
             logger.error(f"Failed to start workflow detection: {result['message']}")
@@ -62,10 +108,14 @@ def start_workflow_detection():
 @workflow_api_bp.route('/stop-workflow-detection', methods=['POST'])
 @login_required
 def stop_workflow_detection():
-    """Stop workflow-based detection"""
+    """
+    Stop workflow-based detection
+    Body (optional): {"camera_id": "..."}; stops every camera when omitted
+    """
     try:
+        data = request.get_json(silent=True) or {}
         detector = get_workflow_detector()
-        result = detector.stop_detection()
+        result = detector.stop_detection(data.get('camera_id'))
         
         logger.info("Workflow detection stopped")
         return jsonify(result)
@@ -75,16 +125,18 @@ def stop_workflow_detection():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @workflow_api_bp.route('/workflow-status', methods=['GET'])
+@workflow_api_bp.route('/workflow-status/<camera_id>', methods=['GET'])
 @login_required
-def workflow_status():
-    """Get workflow detection status"""
+def workflow_status(camera_id=DEFAULT_CAMERA_ID):
+    """Get workflow detection status of a camera, plus a summary of all cameras"""
     try:
         detector = get_workflow_detector()
-        status = detector.get_status()
+        status = detector.get_status(camera_id)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'status': status
+            'status': status,
+            'cameras': detector.get_all_status()
         })
         
     except Exception as e:
@@ -92,14 +144,28 @@ def workflow_status():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @workflow_api_bp.route('/workflow-video-feed')
+@workflow_api_bp.route('/workflow-video-feed/<camera_id>')
 @login_required
-def workflow_video_feed():
+def workflow_video_feed(camera_id=DEFAULT_CAMERA_ID):
     """
     Video streaming route for workflow-based detection
+    Query: ?profile=preview|stream (encode profile, default stream)
     Returns: Multipart JPEG stream
     """
+    from app.utils.video_utils import render_status_frame
+    
+    app = current_app._get_current_object()
+    profiles = current_app.config['ENCODE_PROFILES']
+    profile = request.args.get('profile', 'stream')
+    if profile not in profiles:
+        profile = 'stream'
+    
+    # Unknown IDs would add metric series without limit
+    detector = get_workflow_detector()
+    if camera_id not in detector.cameras:
+        abort(404)
+    
     def generate():
-        detector = get_workflow_detector()
         last_yield = 0
         
         while True:
@@ -111,34 +177,29 @@ def workflow_video_feed():
                     continue
                 
                 # Get processed frame from detector
-                frame_bytes = detector.get_frame()
+                frame_bytes = detector.get_frame(profile, camera_id)
                 
                 if frame_bytes:
                     last_yield = current_time
                     yield (b'--frame\r\n'
                            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
                 else:
-                    # Send blank frame when no data available
-                    blank = np.zeros((480, 640, 3), dtype=np.uint8)
-                    
-                    # Add status text
-                    status = detector.get_status()
+                    # Send a status frame when no data available
+                    status = detector.get_status(camera_id)
                     if status['is_running']:
                         text = f'Processing... Frames: {status["frame_count"]}'
                         color = (0, 255, 0)
+                    elif not warmup.ensure(app, 'workflow'):
+                        text = 'Warming up detector...'
+                        color = (0, 255, 255)
                     else:
                         text = 'Waiting for detection to start...'
                         color = (255, 255, 255)
                     
-                    cv2.putText(blank, text, (150, 240), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                    
-                    # Encode blank frame
-                    ret, buffer = cv2.imencode('.jpg', blank, 
-                                              [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    if ret:
+                    blank_bytes = render_status_frame(text, profiles[profile], color)
+                    if blank_bytes:
                         yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                               b'Content-Type: image/jpeg\r\n\r\n' + blank_bytes + b'\r\n')
                     
                     time.sleep(0.1)
                     
@@ -149,22 +210,23 @@ def workflow_video_feed():
                 logger.error(f"Error in workflow video feed: {e}")
                 time.sleep(0.1)
     
-    return Response(generate(),
+    return Response(stream_with_context(track_stream(generate(), 'workflow', camera_id)),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @workflow_api_bp.route('/workflow-predictions', methods=['GET'])
+@workflow_api_bp.route('/workflow-predictions/<camera_id>', methods=['GET'])
 @login_required
-def workflow_predictions():
-    """Get latest predictions from workflow"""
+def workflow_predictions(camera_id=DEFAULT_CAMERA_ID):
+    """Get latest predictions from workflow for a camera"""
     try:
         detector = get_workflow_detector()
-        predictions = detector.get_predictions()
-        detections = detector.parse_detections()
+        predictions = detector.get_predictions(camera_id)
+        detections = detector.parse_detections(camera_id)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'predictions': predictions,
-            'detections': detections
+            'detections': detections.to_dicts()
         })
         
     except Exception as e:
@@ -182,50 +244,67 @@ def save_detection_event():
         "detections": [...]
     }
     """
+    from app.utils.video_utils import save_frame_image
+    from app.utils.detections import Detections
+    from app.utils.confirmation import create_confirmation_filter
+    
     try:
         data = request.get_json()
-        camera_id = data.get('camera_id', 'default')
+        camera_id = data.get('camera_id', DEFAULT_CAMERA_ID)
         camera_name = data.get('camera_name', 'Camera')
-        detections = data.get('detections', [])
+        detections = Detections.from_predictions(data.get('detections', []))
         
         detector = get_workflow_detector()
+        if camera_id not in detector.cameras:
+            return jsonify({'success': False, 'message': f'Camera {camera_id} is not running'}), 400
+        
+        # Each request counts as one frame; only confirmed classes are saved
+        confirmation = confirmation_filters.get(camera_id)
+        if confirmation is None:
+            confirmation = confirmation_filters[camera_id] = create_confirmation_filter(current_app.config)
+        confirmed = confirmation.update(detections)
+        if len(confirmed) < len(detections):
+            DETECTIONS_UNCONFIRMED.inc(len(detections) - len(confirmed), camera=camera_id)
         
-        # Save each detection as an event
+        # Save each confirmed detection as an event
         saved_events = []
-        for detection in detections:
+        for detection in confirmed.to_dicts():
             event = Event(
                 camera_id=camera_id,
                 camera_name=camera_name,
-                object_type=detection.get('class', 'unknown'),
-                confidence=detection.get('confidence', 0.0),
-                bounding_box=json.dumps(detection.get('bbox', [])),
+                object_type=detection['class'],
+                confidence=detection['confidence'],
+                bounding_box=json.dumps(detection['bbox']),
                 user_id=current_user.id
             )
             
-            db.session.add(event)
-            db.session.flush()
+            with time_stage('db_write', camera_id):
+                db.session.add(event)
+                db.session.flush()
             
-            # Save frame image
-            frame_bytes = detector.get_frame()
-            if frame_bytes:
-                # Convert bytes back to image
-                nparr = np.frombuffer(frame_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is not None:
+            # Save frame image: the latest annotated frame of this camera only (another
+            # camera's image would be false evidence). Inline it is encoded once at
+            # evidence quality; in worker mode it is decoded from the published
+            # stream JPEG, so the evidence is a re-compressed copy
+            frame = detector.get_current_frame(camera_id)
+            if frame is not None:
+                with time_stage('disk_write', camera_id):
                     image_path = save_frame_image(frame, camera_id, event.id)
-                    event.image_path = image_path
+                event.image_path = image_path
             
             saved_events.append(event.to_dict())
         
-        db.session.commit()
+        with time_stage('db_write', camera_id):
+            db.session.commit()
+        EVENTS_SAVED.inc(len(saved_events), camera=camera_id)
         
         logger.info(f"Saved {len(saved_events)} detection events")
         
         return jsonify({
             'success': True,
             'message': f'Saved {len(saved_events)} events',
-            'events': saved_events
+            'events': saved_events,
+            'unconfirmed': len(detections) - len(confirmed)
         })
         
     except Exception as e:
@@ -0,0 +1,382 @@
+// Global variables
+let statusInterval;
+let predictionsInterval;
+let uptimeStart = null;
+let uptimeInterval;
+let currentTheme = 'light';
+let totalDetections = 0;
+let alertCount = 0;
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    loadWorkflowConfig();
+    initializeTheme();
+    updateUptime();
+});
+
+// Theme Toggle
+function toggleTheme() {
+    currentTheme = currentTheme === 'light' ? 'dark' : 'light';
+    document.documentElement.setAttribute('data-theme', currentTheme);
+    localStorage.setItem('theme', currentTheme);
+
+    const icon = document.querySelector('.theme-toggle i');
+    icon.className = currentTheme === 'dark' ? 'fas fa-sun' : 'fas fa-moon';
+
+    showToast(`${currentTheme === 'dark' ? 'Dark' : 'Light'} mode activated`, 'info');
+}
+
+function initializeTheme() {
+    const savedTheme = localStorage.getItem('theme') || 'light';
+    currentTheme = savedTheme;
+    document.documentElement.setAttribute('data-theme', savedTheme);
+
+    const icon = document.querySelector('.theme-toggle i');
+    icon.className = savedTheme === 'dark' ? 'fas fa-sun' : 'fas fa-moon';
+}
+
+// Uptime Counter
+function updateUptime() {
+    if (uptimeStart) {
+        const now = new Date();
+        const diff = now - uptimeStart;
+        const hours = Math.floor(diff / 3600000);
+        const minutes = Math.floor((diff % 3600000) / 60000);
+        const seconds = Math.floor((diff % 60000) / 1000);
+
+        document.getElementById('uptime').textContent = 
+            `${pad(hours)}:${pad(minutes)}:${pad(seconds)}`;
+    } else {
+        document.getElementById('uptime').textContent = '00:00:00';
+    }
+}
+
+function pad(num) {
+    return num.toString().padStart(2, '0');
+}
+
+// Tab Switching
+function switchTab(tabName) {
+    document.querySelectorAll('.tab-content').forEach(tab => {
+        tab.classList.remove('active');
+    });
+    document.querySelectorAll('.tab-btn').forEach(btn => {
+        btn.classList.remove('active');
+    });
+
+    document.getElementById(tabName + '-tab').classList.add('active');
+    event.target.classList.add('active');
+}
+
+// Camera Source Selection
+function getCameraSource() {
+    const activeTab = document.querySelector('.tab-content.active');
+
+    if (activeTab.id === 'webcam-tab') {
+        return document.getElementById('webcamSelect').value;
+    } else if (activeTab.id === 'rtsp-tab') {
+        const url = document.getElementById('rtspUrl').value.trim();
+        if (!url) {
+            showToast('Please enter an RTSP URL', 'error');
+            return null;
+        }
+        return url;
+    } else if (activeTab.id === 'file-tab') {
+        const path = document.getElementById('videoFile').value.trim();
+        if (!path) {
+            showToast('Please enter a video file path', 'error');
+            return null;
+        }
+        return path;
+    }
+
+    return "0";
+}
+
+// Start Detection
+document.getElementById('startBtn').addEventListener('click', function() {
+    const cameraSource = getCameraSource();
+    if (cameraSource === null) return;
+
+    this.disabled = true;
+    showToast('Starting detection...', 'info');
+
+    fetch('/api/workflow/start-workflow-detection', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({camera_source: cameraSource})
+    })
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            document.getElementById('startBtn').disabled = true;
+            document.getElementById('stopBtn').disabled = false;
+
+            updateStatusBadge('running');
+            document.getElementById('cameraStatus').textContent = 'Active';
+
+            // Start uptime
+            if (!uptimeStart) {
+                uptimeStart = new Date();
+                uptimeInterval = setInterval(updateUptime, 1000);
+            }
+
+            startStatusUpdates();
+            reloadVideoFeed();
+            showToast('Detection started successfully!', 'success');
+        } else {
+            document.getElementById('startBtn').disabled = false;
+            showToast('Failed to start: ' + data.message, 'error');
+            displayError(data.message);
+        }
+    })
+    .catch(err => {
+        console.error('Error:', err);
+        document.getElementById('startBtn').disabled = false;
+        showToast('Error starting detection', 'error');
+        displayError(err.message);
+    });
+});
+
+// Stop Detection
+document.getElementById('stopBtn').addEventListener('click', function() {
+    this.disabled = true;
+    showToast('Stopping detection...', 'info');
+
+    fetch('/api/workflow/stop-workflow-detection', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'}
+    })
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            document.getElementById('startBtn').disabled = false;
+            document.getElementById('stopBtn').disabled = true;
+
+            updateStatusBadge('stopped');
+            document.getElementById('cameraStatus').textContent = 'Inactive';
+
+            stopStatusUpdates();
+            clearError();
+            showToast('Detection stopped', 'info');
+        } else {
+            document.getElementById('stopBtn').disabled = false;
+            showToast('Failed to stop: ' + data.message, 'error');
+        }
+    })
+    .catch(err => {
+        console.error('Error:', err);
+        document.getElementById('stopBtn').disabled = false;
+        showToast('Error stopping detection', 'error');
+    });
+});
+
+// Status Updates
+function startStatusUpdates() {
+    statusInterval = setInterval(updateStatus, 2000);
+    predictionsInterval = setInterval(updatePredictions, 3000);
+}
+
+function stopStatusUpdates() {
+    if (statusInterval) clearInterval(statusInterval);
+    if (predictionsInterval) clearInterval(predictionsInterval);
+    if (uptimeInterval) clearInterval(uptimeInterval);
+    uptimeStart = null;
+}
+
+function updateStatus() {
+    fetch('/api/workflow/workflow-status')
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            const status = data.status;
+
+            // Update stats
+            document.getElementById('framesProcessed').textContent = status.frame_count || 0;
+            document.getElementById('frameCount').textContent = 'Frames: ' + (status.frame_count || 0);
+            document.getElementById('detectionStatus').textContent = 
+                status.is_running ? 'Running' : 'Stopped';
+            document.getElementById('videoSource').textContent = 
+                status.video_source || '-';
+            document.getElementById('hasFrame').textContent = 
+                status.has_frame ? 'Yes' : 'No';
+
+            // Calculate FPS (approximate)
+            const fps = status.frame_count > 0 ? 
+                Math.min(30, Math.floor(status.frame_count / (Date.now() - uptimeStart) * 1000)) : 0;
+            document.getElementById('frameRate').textContent = fps + ' FPS';
+            document.getElementById('fps-display').textContent = 'FPS: ' + fps;
+
+            // Handle errors
+            if (status.error_message) {
+                displayError(status.error_message);
+            } else {
+                clearError();
+            }
+        }
+    })
+    .catch(err => console.error('Status update error:', err));
+}
+
+function updatePredictions() {
+    fetch('/api/workflow/workflow-predictions')
+    .then(res => res.json())
+    .then(data => {
+        if (data.success && data.detections && data.detections.length > 0) {
+            totalDetections = data.detections.length;
+            document.getElementById('detectionCount').textContent = totalDetections;
+            displayDetections(data.detections);
+        }
+    })
+    .catch(err => console.error('Predictions update error:', err));
+}
+
+function loadPredictions() {
+    showToast('Refreshing detections...', 'info');
+    updatePredictions();
+}
+
+function displayDetections(detections) {
+    const list = document.getElementById('detectionsList');
+    list.innerHTML = '';
+
+    if (detections.length === 0) {
+        list.innerHTML = `
+            <div class="no-data">
+                <i class="fas fa-search"></i>
+                <p>No detections yet</p>
+            </div>
+        `;
+        return;
+    }
+
+    detections.slice(0, 10).forEach((det, index) => {
+        const confidence = (det.confidence * 100).toFixed(1);
+        let confClass = 'confidence-low';
+        if (det.confidence > 0.7) confClass = 'confidence-high';
+        else if (det.confidence > 0.4) confClass = 'confidence-medium';
+
+        const item = document.createElement('div');
+        item.className = `detection-item ${confClass}`;
+        item.innerHTML = `
+            <div class="detection-header">
+                <span class="detection-class">
+                    <i class="fas fa-crosshairs"></i> ${det.class || 'Unknown'}
+                </span>
+                <span class="detection-confidence">${confidence}%</span>
+            </div>
+            <div class="detection-time">
+                <i class="fas fa-clock"></i> Just now
+            </div>
+        `;
+        list.appendChild(item);
+    });
+}
+
+function updateStatusBadge(status) {
+    const badge = document.getElementById('statusBadge');
+    if (status === 'running') {
+        badge.innerHTML = '<i class="fas fa-circle" style="color: #28a745;"></i> Running';
+    } else {
+        badge.innerHTML = '<i class="fas fa-circle" style="color: #dc3545;"></i> Stopped';
+    }
+}
+
+function displayError(message) {
+    const errorDiv = document.getElementById('errorMessage');
+    const errorText = document.getElementById('errorText');
+    errorText.textContent = message;
+    errorDiv.style.display = 'block';
+}
+
+function clearError() {
+    const errorDiv = document.getElementById('errorMessage');
+    errorDiv.style.display = 'none';
+}
+
+// Load Workflow Configuration
+function loadWorkflowConfig() {
+    fetch('/api/workflow/test-workflow')
+    .then(res => res.json())
+    .then(data => {
+        if (data.success) {
+            const config = data.config;
+            document.getElementById('workflowConfig').innerHTML = `
+                <div class="config-item">
+                    <div class="config-label">API Key</div>
+                    <div class="config-value ${config.api_key_set ? 'success' : 'danger'}">
+                        ${config.api_key_set ? '✓ Configured' : '✗ Not Set'}
+                    </div>
+                </div>
+                <div class="config-item">
+                    <div class="config-label">Workspace</div>
+                    <div class="config-value">${config.workspace || 'Not set'}</div>
+                </div>
+                <div class="config-item">
+                    <div class="config-label">Workflow ID</div>
+                    <div class="config-value">${config.workflow_id}</div>
+                </div>
+                <div class="config-item">
+                    <div class="config-label">Max FPS</div>
+                    <div class="config-value">${config.max_fps}</div>
+                </div>
+            `;
+        } else {
+            document.getElementById('workflowConfig').innerHTML = `
+                <div class="no-data">
+                    <i class="fas fa-exclamation-circle"></i>
+                    <p>Failed to load configuration</p>
+                </div>
+            `;
+        }
+    })
+    .catch(err => {
+        console.error('Config load error:', err);
+        document.getElementById('workflowConfig').innerHTML = `
+            <div class="no-data">
+                <i class="fas fa-exclamation-circle"></i>
+                <p>Error loading configuration</p>
+            </div>
+        `;
+    });
+}
+
+// Video Error Handling
+// The feed answers 404 until its camera runs: request it again once started
+function reloadVideoFeed() {
+    const img = document.getElementById('videoFeed');
+    img.src = img.src.split('?')[0] + '?t=' + Date.now();
+}
+
+function handleVideoError(img) {
+    // Expected before detection starts; reloadVideoFeed() requests it again
+    console.warn('Video feed not available yet');
+}
+
+// Toast Notifications
+function showToast(message, type = 'info') {
+    const toast = document.createElement('div');
+    toast.className = `toast ${type}`;
+
+    let icon = 'fa-info-circle';
+    if (type === 'success') icon = 'fa-check-circle';
+    else if (type === 'error') icon = 'fa-exclamation-circle';
+    else if (type === 'warning') icon = 'fa-exclamation-triangle';
+
+    toast.innerHTML = `
+        <i class="fas ${icon}"></i>
+        <span>${message}</span>
+    `;
+
+    document.body.appendChild(toast);
+
+    setTimeout(() => {
+        toast.style.animation = 'slideOut 0.3s ease-out';
+        setTimeout(() => toast.remove(), 300);
+    }, 3000);
+}
+
+// Cleanup on page unload
+window.addEventListener('beforeunload', function() {
+    stopStatusUpdates();
+});
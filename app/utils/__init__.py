@@ -1,9 +1,71 @@
 """
 Utility functions package
+
+The vision and inference modules (cv2, numpy, roboflow, inference) are
+expensive to import, so the names below are resolved on first access and
+importing any app.utils submodule stays cheap.
 """
-from app.utils.detector import ObjectDetector
-from app.utils.camera import CameraManager
-from app.utils.email_alerts import send_alert_email
-from app.utils.video_utils import save_video_clip
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+_LAZY_ATTRIBUTES = {
+    'ObjectDetector': 'app.utils.detector',
+    'CameraManager': 'app.utils.camera',
+    'send_alert_email': 'app.utils.email_alerts',
+    'save_video_clip': 'app.utils.video_utils'
+}
+
+# Always imported by prewarm_imports()
+CORE_MODULES = ('numpy', 'cv2', 'app.utils.detector', 'app.utils.camera', 'app.utils.video_utils',
+                'app.utils.workflow_detector')
+
+# Third-party package behind each detector backend, imported only when that backend is configured
+BACKEND_MODULES = {'roboflow': 'roboflow', 'onnx': 'onnxruntime'}
 
 __all__ = ['ObjectDetector', 'CameraManager', 'send_alert_email', 'save_video_clip']
+
+
+def __getattr__(name):
+    """Import the module behind a public name on first access (PEP 562)"""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Include the lazy names in dir()"""
+    return sorted(set(globals()) | set(__all__))
+
+
+def prewarm_imports(config):
+    """
+    Import the heavy modules now instead of on the first detection request
+    
+    Args:
+        config: App config; DETECTOR_BACKEND and WORKFLOW_BACKEND pick the extra packages
+    
+    Returns:
+        list: Modules that failed to import (e.g. optional packages not installed)
+    """
+    modules = list(CORE_MODULES)
+    for backend in (config.get('DETECTOR_BACKEND'), config.get('WORKFLOW_BACKEND')):
+        module_name = BACKEND_MODULES.get(backend)
+        if module_name and module_name not in modules:
+            modules.append(module_name)
+    # The Roboflow workflow runs on the inference package (by far the slowest import)
+    if config.get('WORKFLOW_BACKEND') == 'roboflow':
+        modules.append('inference')
+    
+    failed = []
+    for module_name in modules:
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            logger.warning(f"Prewarm could not import {module_name}: {str(e)}")
+            failed.append(module_name)
+    return failed
@@ -0,0 +1,143 @@
+"""
+Fingerprinted static bundles
+
+Page styles and scripts live as plain files under app/static and are
+concatenated into bundles named after a hash of their content
+(workflow_dashboard.3f2a9c1e0b.js), each with precompressed .gz and, when
+the brotli package is installed, .br variants. A content change yields a
+new URL, so the /assets route can let browsers cache bundles for a year and
+repeat page loads only transfer the HTML shell.
+
+Bundles are built by `flask build-assets` at deploy time, or on first use
+when the build folder is missing or older than the sources.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bundle name -> source files relative to the static folder, concatenated in order
+BUNDLES = {
+    'workflow_dashboard.css': ['css/workflow_dashboard.css'],
+    'workflow_dashboard.js': ['js/workflow_dashboard.js']
+}
+
+MANIFEST_NAME = 'manifest.json'
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def _write_atomic(path, data):
+    """Write a file so concurrent readers never see it half-written"""
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _compress_brotli(data):
+    """Brotli-compressed data, or None if the brotli package is missing"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def build_assets(static_folder, output_folder, bundles=None):
+    """
+    Build every bundle with its compressed variants and write the manifest
+    
+    Args:
+        static_folder: Folder the bundle sources are relative to
+        output_folder: Folder for the fingerprinted files and manifest.json
+        bundles: Bundle name -> source files (default: BUNDLES)
+    
+    Returns:
+        dict: Bundle name -> fingerprinted file name
+    """
+    bundles = bundles or BUNDLES
+    os.makedirs(output_folder, exist_ok=True)
+    
+    manifest = {}
+    brotli_available = True
+    for name, sources in bundles.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), 'rb') as f:
+                parts.append(f.read())
+        data = b'\n'.join(parts)
+        
+        stem, extension = os.path.splitext(name)
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}'
+        path = os.path.join(output_folder, filename)
+        
+        _write_atomic(path, data)
+        # mtime=0 keeps the .gz byte-identical across builds
+        _write_atomic(f'{path}.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        compressed = _compress_brotli(data)
+        if compressed is not None:
+            _write_atomic(f'{path}.br', compressed)
+        else:
+            brotli_available = False
+        
+        manifest[name] = filename
+    
+    # Drop bundles of earlier builds
+    current = set(manifest.values())
+    for entry in os.listdir(output_folder):
+        base = entry[:-3] if entry.endswith(('.gz', '.br')) else entry
+        if entry != MANIFEST_NAME and base not in current and not entry.endswith('.tmp'):
+            os.remove(os.path.join(output_folder, entry))
+    
+    _write_atomic(os.path.join(output_folder, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    
+    if not brotli_available:
+        logger.info("brotli not installed, assets are precompressed with gzip only (pip install brotli)")
+    logger.info(f"Built assets: {', '.join(f'{name} -> {filename}' for name, filename in manifest.items())}")
+    return manifest
+
+
+def _is_stale(static_folder, output_folder, bundles):
+    """Whether the manifest is missing or older than any bundle source"""
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return True
+    built = os.path.getmtime(manifest_path)
+    return any(os.path.getmtime(os.path.join(static_folder, source)) > built
+               for sources in bundles.values() for source in sources)
+
+
+def get_manifest(static_folder, output_folder, check_sources=False):
+    """
+    Bundle name -> fingerprinted file name, building the bundles if needed
+    
+    Args:
+        static_folder: Folder the bundle sources are relative to
+        output_folder: Folder of the built bundles
+        check_sources: Rebuild when a source changed (development); otherwise
+            the manifest is read once per process
+    
+    Returns:
+        dict
+    """
+    global _manifest
+    
+    if _manifest is not None and not check_sources:
+        return _manifest
+    
+    with _manifest_lock:
+        if _manifest is not None and not check_sources:
+            return _manifest
+        
+        if _is_stale(static_folder, output_folder, BUNDLES):
+            _manifest = build_assets(static_folder, output_folder)
+        elif _manifest is None:
+            with open(os.path.join(output_folder, MANIFEST_NAME)) as f:
+                _manifest = json.load(f)
+        return _manifest
@@ -1,31 +1,98 @@
 """
 Camera management and video stream handling
 """
+import os
 import cv2
 import threading
+import time
 import logging
 from flask import current_app
+from app.utils.frame_buffer import FrameBuffer
+from app.utils.preprocessing import FramePreprocessor, parse_rois
+from app.utils.tracker import IoUTracker
+from app.utils.confirmation import create_confirmation_filter
+from app.utils.zones import parse_zone_config, create_zone_engine
+from app.utils.metrics import observe_stage
 
 logger = logging.getLogger(__name__)
 
+# Camera health states
+STATE_STOPPED = 'stopped'
+STATE_CONNECTING = 'connecting'
+STATE_STREAMING = 'streaming'
+STATE_STALLED = 'stalled'
+STATE_FAILED = 'failed'
+
+
+def get_camera_settings(config):
+    """
+    Snapshot the camera related configuration
+    
+    Capture threads run outside the application context, so they work
+    from this plain dictionary instead of current_app.config.
+    
+    Args:
+        config: Flask configuration mapping
+        
+    Returns:
+        dict: Camera settings
+    """
+    return {
+        'width': config['VIDEO_WIDTH'],
+        'height': config['VIDEO_HEIGHT'],
+        'fps': config['VIDEO_FPS'],
+        'buffer_slots': config['CAMERA_BUFFER_SLOTS'],
+        'reconnect_delay': config['CAMERA_RECONNECT_DELAY'],
+        'reconnect_max_delay': config['CAMERA_RECONNECT_MAX_DELAY'],
+        'max_reconnect_attempts': config['CAMERA_MAX_RECONNECT_ATTEMPTS'],
+        'stall_timeout': config['CAMERA_STALL_TIMEOUT'],
+        'loop_video_files': config['CAMERA_LOOP_VIDEO_FILES'],
+        'process_max_width': config['CAMERA_PROCESS_MAX_WIDTH'],
+        'process_max_height': config['CAMERA_PROCESS_MAX_HEIGHT'],
+        'process_start_timeout': config['CAMERA_PROCESS_START_TIMEOUT']
+    }
+
+
 class Camera:
     """Individual camera handler"""
     
-    def __init__(self, camera_id, source):
+    def __init__(self, camera_id, source, settings=None):
         """
         Initialize camera
         
         Args:
             camera_id: Unique camera identifier
-            source: Camera source (0 for webcam, RTSP URL for IP camera)
+            source: Camera source (0 for webcam, RTSP URL for IP camera,
+                or path to a video file)
+            settings: Camera settings from get_camera_settings(); read
+                from current_app.config when omitted
         """
+        if settings is None:
+            settings = get_camera_settings(current_app.config)
+        
         self.camera_id = camera_id
         self.source = source
+        self.settings = settings
         self.video_capture = None
         self.is_active = False
-        self.current_frame = None
-        self.lock = threading.Lock()
+        self.frame_buffer = FrameBuffer(settings['buffer_slots'])
         self.thread = None
+        self._stop_event = threading.Event()
+        
+        # Try to convert source to int (for webcam index)
+        try:
+            self.capture_source = int(source)
+        except (TypeError, ValueError):
+            self.capture_source = source
+        self.is_file = isinstance(self.capture_source, str) and os.path.isfile(self.capture_source)
+        
+        # Health
+        self.state = STATE_STOPPED
+        self.state_since = time.time()
+        self.last_error = None
+        self.last_frame_at = None
+        self.frames_captured = 0
+        self.reconnect_attempts = 0
     
     def start(self):
         """Start camera capture"""
@@ -34,27 +101,19 @@ class Camera:
             return False
         
         try:
-            # Try to convert source to int (for webcam index)
-            try:
-                source = int(self.source)
-            except ValueError:
-                source = self.source
-            
-            self.video_capture = cv2.VideoCapture(source)
+            self._stop_event.clear()
+            self._set_state(STATE_CONNECTING)
             
-            if not self.video_capture.isOpened():
+            if not self._open():
                 logger.error(f"Failed to open camera {self.camera_id} with source {self.source}")
+                self._set_state(STATE_FAILED, f"Failed to open source {self.source}")
                 return False
             
-            # Set camera properties
-            self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, current_app.config['VIDEO_WIDTH'])
-            self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, current_app.config['VIDEO_HEIGHT'])
-            self.video_capture.set(cv2.CAP_PROP_FPS, current_app.config['VIDEO_FPS'])
-            
             self.is_active = True
+            self.reconnect_attempts = 0
             
             # Start frame capture thread
-            self.thread = threading.Thread(target=self._capture_frames, daemon=True)
+            self.thread = threading.Thread(target=self._capture_frames, name=f'camera-{self.camera_id}', daemon=True)
             self.thread.start()
             
             logger.info(f"Camera {self.camera_id} started successfully")
@@ -62,44 +121,240 @@ class Camera:
             
         except Exception as e:
             logger.error(f"Error starting camera {self.camera_id}: {str(e)}")
+            self._set_state(STATE_FAILED, str(e))
             return False
     
     def stop(self):
         """Stop camera capture"""
         self.is_active = False
+        self._stop_event.set()
         
         if self.thread:
             self.thread.join(timeout=2.0)
         
-        if self.video_capture:
+        # A thread stuck in read() releases the capture itself on exit
+        if self.thread is None or not self.thread.is_alive():
+            self._release()
+        
+        self.thread = None
+        self.frame_buffer.clear()
+        self._set_state(STATE_STOPPED)
+        logger.info(f"Camera {self.camera_id} stopped")
+    
+    def _open(self):
+        """
+        Open the video capture and apply camera properties
+        
+        Returns:
+            True if the source was opened
+        """
+        self._release()
+        if isinstance(self.capture_source, str) and not self.is_file:
+            # Network streams: a blocked read() returns False after stall_timeout, so
+            # the stall and reconnect handling of the capture loop takes over
+            timeout_ms = int(self.settings['stall_timeout'] * 1000)
+            self.video_capture = cv2.VideoCapture(self.capture_source, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+            ])
+        else:
+            self.video_capture = cv2.VideoCapture(self.capture_source)
+        
+        if not self.video_capture.isOpened():
+            self._release()
+            return False
+        
+        # Set camera properties
+        self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.settings['width'])
+        self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.settings['height'])
+        self.video_capture.set(cv2.CAP_PROP_FPS, self.settings['fps'])
+        return True
+    
+    def _release(self):
+        """Release the video capture if open"""
+        if self.video_capture is not None:
             self.video_capture.release()
             self.video_capture = None
+    
+    def _set_state(self, state, error=None):
+        """Move the health state machine to a new state"""
+        if error:
+            self.last_error = error
         
-        self.current_frame = None
-        logger.info(f"Camera {self.camera_id} stopped")
+        if state == self.state:
+            return
+        
+        previous = self.state
+        self.state = state
+        self.state_since = time.time()
+        
+        if state in (STATE_STALLED, STATE_FAILED):
+            logger.warning(f"Camera {self.camera_id}: {previous} -> {state}"
+                           + (f" ({error})" if error else ""))
+        else:
+            logger.info(f"Camera {self.camera_id}: {previous} -> {state}")
+    
+    def _source_fps(self):
+        """Frame rate to pace file playback at"""
+        fps = self.video_capture.get(cv2.CAP_PROP_FPS) if self.video_capture else 0
+        if not fps or fps <= 0 or fps > 240:
+            fps = self.settings['fps']
+        return fps
+    
+    def _reconnect(self):
+        """
+        Reopen the source with exponential backoff
+        
+        Returns:
+            True once reconnected, False if stopped or out of attempts
+        """
+        self._release()
+        max_attempts = self.settings['max_reconnect_attempts']
+        attempt = 0
+        
+        while not self._stop_event.is_set():
+            if max_attempts and attempt >= max_attempts:
+                self._set_state(STATE_FAILED, f"Gave up after {attempt} reconnect attempts")
+                return False
+            
+            delay = min(self.settings['reconnect_delay'] * (2 ** attempt),
+                        self.settings['reconnect_max_delay'])
+            self._set_state(STATE_CONNECTING)
+            logger.info(f"Reconnecting camera {self.camera_id} in {delay:.1f}s "
+                        f"(attempt {attempt + 1})")
+            
+            if self._stop_event.wait(delay):
+                return False
+            
+            attempt += 1
+            self.reconnect_attempts += 1
+            
+            try:
+                if self._open():
+                    return True
+            except Exception as e:
+                self.last_error = str(e)
+        
+        return False
     
     def _capture_frames(self):
         """Internal method to continuously capture frames"""
-        while self.is_active:
-            try:
-                ret, frame = self.video_capture.read()
+        frame_interval = 1.0 / self._source_fps() if self.is_file else 0
+        next_frame_at = time.monotonic()
+        failing_since = None
+        rewound = False
+        
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    # Decode straight into a reusable buffer slot
+                    index, target = self.frame_buffer.acquire_write_slot()
+                    read_started = time.perf_counter()
+                    if target is not None:
+                        ret, frame = self.video_capture.read(target)
+                    else:
+                        ret, frame = self.video_capture.read()
+                except Exception as e:
+                    logger.error(f"Error capturing frame from camera {self.camera_id}: {str(e)}")
+                    self.last_error = str(e)
+                    ret = False
                 
                 if ret:
-                    with self.lock:
-                        self.current_frame = frame
-                else:
-                    logger.warning(f"Failed to read frame from camera {self.camera_id}")
+                    observe_stage('capture', self.camera_id, time.perf_counter() - read_started)
+                    try:
+                        self.frame_buffer.commit(index, frame)
+                    except ValueError as e:
+                        # Frame the buffer cannot hold (e.g. larger than the shared-memory slots)
+                        self._set_state(STATE_FAILED, str(e))
+                        break
+                    self.frames_captured += 1
+                    self.last_frame_at = time.time()
+                    rewound = False
+                    failing_since = None
+                    self._set_state(STATE_STREAMING)
                     
-            except Exception as e:
-                logger.error(f"Error capturing frame from camera {self.camera_id}: {str(e)}")
+                    # Files decode faster than real time; pace them to the source FPS
+                    if frame_interval:
+                        next_frame_at = max(next_frame_at + frame_interval, time.monotonic())
+                        delay = next_frame_at - time.monotonic()
+                        if delay > 0:
+                            self._stop_event.wait(delay)
+                    continue
+                
+                if self.is_file:
+                    # End of file: loop back to the start, or finish
+                    if self.settings['loop_video_files'] and not rewound:
+                        self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        rewound = True
+                        continue
+                    
+                    if rewound:
+                        self._set_state(STATE_FAILED, "Video file contains no readable frames")
+                    else:
+                        logger.info(f"Camera {self.camera_id} reached end of video file")
+                        self._set_state(STATE_STOPPED, "End of video file")
+                    break
+                
+                # Live source: back off briefly, then reconnect once the stall lasts too long
+                if failing_since is None:
+                    failing_since = time.monotonic()
+                
+                if time.monotonic() - failing_since < self.settings['stall_timeout']:
+                    self._set_state(STATE_STALLED, "Failed to read frame")
+                    self._stop_event.wait(0.1)
+                    continue
+                
+                if not self._reconnect():
+                    break
+                failing_since = None
+        finally:
+            self.is_active = False
+            self._release()
+    
+    def get_health(self):
+        """
+        Get camera health information
+        
+        Returns:
+            dict: Health state and counters
+        """
+        now = time.time()
+        state = self.state
+        # A read() blocked inside the backend never reports the stall itself
+        if (state == STATE_STREAMING and self.last_frame_at
+                and now - self.last_frame_at > self.settings['stall_timeout']):
+            state = STATE_STALLED
+        return {
+            'state': state,
+            'state_seconds': round(now - self.state_since, 1),
+            'last_frame_age': round(now - self.last_frame_at, 2) if self.last_frame_at else None,
+            'frames_captured': self.frames_captured,
+            'reconnect_attempts': self.reconnect_attempts,
+            'last_error': self.last_error,
+            'pid': None  # capture runs in this process (see ProcessCamera)
+        }
     
     def get_frame(self):
-        """Get current frame"""
-        with self.lock:
-            if self.current_frame is not None:
-                return self.current_frame.copy()
+        """
+        Get current frame
+        
+        Returns:
+            Read-only view of the latest frame (not a copy) or None
+        """
+        handle = self.frame_buffer.latest()
+        if handle is not None:
+            return handle.image
         return None
     
+    def get_frame_handle(self):
+        """
+        Get current frame together with its sequence number
+        
+        Returns:
+            FrameHandle or None if no frame has been captured yet
+        """
+        return self.frame_buffer.latest()
+    
     def is_opened(self):
         """Check if camera is opened"""
         return self.video_capture is not None and self.video_capture.isOpened()
@@ -112,6 +367,15 @@ class CameraManager:
         """Initialize camera manager"""
         self.cameras = {}
         self.max_cameras = current_app.config['MAX_CAMERAS']
+        self.settings = get_camera_settings(current_app.config)
+        self.capture_mode = current_app.config['CAMERA_CAPTURE_MODE']
+        self.inference_input_size = current_app.config['INFERENCE_INPUT_SIZE']
+        self.rois = parse_rois(current_app.config['CAMERA_ROIS'])
+        self.preprocessors = {}
+        self.trackers = {}
+        self.confirmation_filters = {}
+        self.zone_config = parse_zone_config(current_app.config['ZONE_CONFIG'])
+        self.zone_engines = {}
     
     def add_camera(self, camera_id, source):
         """
@@ -132,7 +396,11 @@ class CameraManager:
             logger.warning(f"Camera {camera_id} already exists")
             return False
         
-        camera = Camera(camera_id, source)
+        if self.capture_mode == 'process':
+            from app.utils.camera_process import ProcessCamera
+            camera = ProcessCamera(camera_id, source, self.settings)
+        else:
+            camera = Camera(camera_id, source, self.settings)
         if camera.start():
             self.cameras[camera_id] = camera
             logger.info(f"Camera {camera_id} added successfully")
@@ -162,6 +430,100 @@ class CameraManager:
             return camera.get_frame()
         return None
     
+    def get_frame_handle(self, camera_id):
+        """Get frame handle (frame plus sequence number) from specific camera"""
+        camera = self.get_camera(camera_id)
+        if camera:
+            return camera.get_frame_handle()
+        return None
+    
+    def get_preprocessor(self, camera_id):
+        """
+        Get the preprocessing stage for a camera
+        
+        Args:
+            camera_id: Camera identifier
+            
+        Returns:
+            FramePreprocessor configured with the camera's regions of interest
+        """
+        preprocessor = self.preprocessors.get(camera_id)
+        if preprocessor is None:
+            preprocessor = FramePreprocessor(
+                input_size=self.inference_input_size,
+                rois=self.rois.get(str(camera_id)),
+                stream_width=self.settings['width'],
+                stream_height=self.settings['height']
+            )
+            self.preprocessors[camera_id] = preprocessor
+        return preprocessor
+    
+    def get_confirmation_filter(self, camera_id):
+        """
+        Get the detection confirmation filter for a camera
+        
+        Args:
+            camera_id: Camera identifier
+            
+        Returns:
+            ConfirmationFilter shared by every stream of the camera
+        """
+        confirmation = self.confirmation_filters.get(camera_id)
+        if confirmation is None:
+            confirmation = create_confirmation_filter(current_app.config)
+            self.confirmation_filters[camera_id] = confirmation
+        return confirmation
+    
+    def get_zone_engine(self, camera_id):
+        """
+        Get the zone rule engine for a camera
+        
+        Args:
+            camera_id: Camera identifier
+            
+        Returns:
+            ZoneRuleEngine, or None if the camera has no (valid) zones configured
+        """
+        if camera_id not in self.zone_engines:
+            config = self.zone_config.get(str(camera_id))
+            self.zone_engines[camera_id] = create_zone_engine(config) if config else None
+        return self.zone_engines[camera_id]
+    
+    def get_tracker(self, camera_id):
+        """
+        Get the object tracker for a camera
+        
+        Args:
+            camera_id: Camera identifier
+            
+        Returns:
+            IoUTracker shared by every stream of the camera
+        """
+        tracker = self.trackers.get(camera_id)
+        if tracker is None:
+            tracker = IoUTracker(
+                iou_threshold=current_app.config['TRACKER_IOU_THRESHOLD'],
+                max_age=current_app.config['TRACKER_MAX_AGE']
+            )
+            self.trackers[camera_id] = tracker
+        return tracker
+    
+    def get_health(self, camera_id=None):
+        """
+        Get health of one or all cameras
+        
+        Args:
+            camera_id: Camera to report on, or None for all cameras
+            
+        Returns:
+            dict: Health of the camera, or mapping of camera ID to health
+        """
+        if camera_id is not None:
+            camera = self.get_camera(camera_id)
+            return camera.get_health() if camera else None
+        
+        return {cam_id: cam.get_health() for cam_id, cam in self.cameras.items()}
+    
     def get_all_cameras(self):
         """Get all cameras"""
         return self.cameras
@@ -0,0 +1,379 @@
+"""
+Out-of-process camera capture
+
+Each ProcessCamera runs the regular Camera capture loop in its own
+process, so H.264 decoding of many streams does not contend for the GIL
+or the eventlet hub of the web worker. Decoded frames are written into a
+multiprocessing.shared_memory block instead of being pickled; the parent
+copies the newest frame into its local FrameBuffer once per new frame and
+all consumers share that copy.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from flask import current_app
+from app.utils.camera import (
+    Camera, get_camera_settings,
+    STATE_STOPPED, STATE_CONNECTING, STATE_STREAMING, STATE_STALLED, STATE_FAILED
+)
+from app.utils.frame_buffer import FrameBuffer
+
+logger = logging.getLogger(__name__)
+
+# Layout of the shared control array (int64 fields)
+_LATEST = 0
+_SEQ = 1
+_HEIGHT = 2
+_WIDTH = 3
+_CHANNELS = 4
+_STATE = 5
+_FRAMES = 6
+_RECONNECTS = 7
+_LAST_FRAME_MS = 8
+_STATE_SINCE_MS = 9
+_CONTROL_FIELDS = 10
+
+_STATES = [STATE_STOPPED, STATE_CONNECTING, STATE_STREAMING, STATE_STALLED, STATE_FAILED]
+_ERROR_BYTES = 256
+
+
+def _slot_count(settings):
+    """Shared-memory slots; at least two, so the worker never decodes into the slot being copied"""
+    return max(2, int(settings['buffer_slots']))
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing block without registering it for cleanup here"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: spawned workers share the parent's resource
+        # tracker, so the extra registration is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameWriter:
+    """
+    Worker-side stand-in for FrameBuffer that publishes into shared memory
+    
+    Implements the acquire_write_slot()/commit() protocol used by
+    Camera._capture_frames. The writer only ever writes a slot other than
+    the published one, and publishes under the control lock, so the
+    parent can copy the latest slot without tearing.
+    """
+    
+    def __init__(self, shm, control, num_slots, slot_bytes):
+        self.shm = shm
+        self.control = control
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self.shape = None
+        self._target = None
+    
+    def _slot_view(self, index, shape):
+        """numpy view of a slot in the shared block"""
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf,
+                          offset=index * self.slot_bytes)
+    
+    def acquire_write_slot(self):
+        """Pick the slot after the published one"""
+        latest = self.control[_LATEST]
+        index = 0 if latest < 0 else (latest + 1) % self.num_slots
+        
+        self._target = None if self.shape is None else self._slot_view(index, self.shape)
+        return index, self._target
+    
+    def commit(self, index, frame):
+        """Publish a frame written into (or decoded next to) a slot"""
+        if frame.dtype != np.uint8:
+            raise ValueError(f"Frame of dtype {frame.dtype} cannot be shared, expected uint8")
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {frame.shape[1]}x{frame.shape[0]} exceeds "
+                             f"CAMERA_PROCESS_MAX_WIDTH x CAMERA_PROCESS_MAX_HEIGHT")
+        
+        # First frame or resolution change: move it into shared memory
+        if frame is not self._target:
+            np.copyto(self._slot_view(index, frame.shape), frame)
+            self.shape = frame.shape
+        self._target = None
+        
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        with self.control.get_lock():
+            self.control[_HEIGHT] = frame.shape[0]
+            self.control[_WIDTH] = frame.shape[1]
+            self.control[_CHANNELS] = channels
+            self.control[_LATEST] = index
+            self.control[_SEQ] += 1
+            self.control[_FRAMES] += 1
+            self.control[_LAST_FRAME_MS] = int(time.time() * 1000)
+        return self.control[_SEQ]
+    
+    def clear(self):
+        """Nothing to release; the parent owns the shared block"""
+
+
+class _WorkerCamera(Camera):
+    """Camera that mirrors its health into the shared control array"""
+    
+    def __init__(self, camera_id, source, settings, control, error):
+        self._control = control
+        self._error = error
+        super().__init__(camera_id, source, settings)
+    
+    def _set_state(self, state, error=None):
+        super()._set_state(state, error)
+        self._control[_STATE] = _STATES.index(self.state)
+        self._control[_STATE_SINCE_MS] = int(self.state_since * 1000)
+        self._control[_RECONNECTS] = self.reconnect_attempts
+        if error:
+            self._error.value = error.encode('utf-8', 'replace')[:_ERROR_BYTES - 1]
+
+
+def _capture_worker(camera_id, source, settings, shm_name, control, error, stop_event):
+    """Entry point of the capture process"""
+    logging.basicConfig(level=logging.INFO,
+                        format=f'%(asctime)s %(levelname)s [camera {camera_id}]: %(message)s')
+    shm = _attach_shared_memory(shm_name)
+    camera = None
+    
+    try:
+        camera = _WorkerCamera(camera_id, source, settings, control, error)
+        num_slots = _slot_count(settings)
+        camera.frame_buffer = SharedFrameWriter(shm, control, num_slots, len(shm.buf) // num_slots)
+        
+        if camera.start():
+            # Capture runs in the camera thread; wait for a stop request or for it to end
+            while not stop_event.wait(0.5):
+                if not camera.is_active:
+                    break
+    except Exception as e:
+        logger.error(f"Capture worker for camera {camera_id} crashed: {str(e)}")
+        control[_STATE] = _STATES.index(STATE_FAILED)
+        error.value = str(e).encode('utf-8', 'replace')[:_ERROR_BYTES - 1]
+    finally:
+        if camera is not None:
+            state = camera.state
+            camera.stop()
+            # Keep the terminal state (failed / end of file) visible to the parent
+            control[_STATE] = _STATES.index(state if state != STATE_STREAMING else STATE_STOPPED)
+            camera.frame_buffer = None
+        shm.close()
+
+
+class ProcessCamera:
+    """
+    Camera whose capture and decode run in a separate process
+    
+    Exposes the same interface as Camera so CameraManager and the routes
+    do not need to know which capture mode is in use.
+    """
+    
+    def __init__(self, camera_id, source, settings=None):
+        """
+        Initialize process camera
+        
+        Args:
+            camera_id: Unique camera identifier
+            source: Camera source (0 for webcam, RTSP URL, or video file)
+            settings: Camera settings from get_camera_settings()
+        """
+        if settings is None:
+            settings = get_camera_settings(current_app.config)
+        
+        self.camera_id = camera_id
+        self.source = source
+        self.settings = settings
+        self.frame_buffer = FrameBuffer(settings['buffer_slots'])
+        self.process = None
+        self.num_slots = _slot_count(settings)
+        self.slot_bytes = settings['process_max_width'] * settings['process_max_height'] * 3
+        self.created_at = time.time()
+        self._shm = None
+        self._control = None
+        self._error = None
+        self._stop_event = None
+        self._copied_seq = 0
+        self._copy_lock = threading.Lock()
+    
+    @property
+    def is_active(self):
+        """Whether the capture process is running"""
+        return self.process is not None and self.process.is_alive()
+    
+    def start(self):
+        """Start the capture process"""
+        if self.is_active:
+            logger.warning(f"Camera {self.camera_id} is already active")
+            return False
+        
+        self._cleanup()
+        
+        try:
+            context = multiprocessing.get_context('spawn')
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=self.slot_bytes * self.num_slots
+            )
+            self._control = context.Array('q', _CONTROL_FIELDS)
+            self._control[_LATEST] = -1
+            self._control[_STATE] = _STATES.index(STATE_CONNECTING)
+            self._control[_STATE_SINCE_MS] = int(time.time() * 1000)
+            self._error = context.Array('c', _ERROR_BYTES)
+            self._stop_event = context.Event()
+            self._copied_seq = 0
+            
+            self.process = context.Process(
+                target=_capture_worker,
+                args=(self.camera_id, self.source, self.settings, self._shm.name,
+                      self._control, self._error, self._stop_event),
+                name=f'camera-{self.camera_id}',
+                daemon=True
+            )
+            self.process.start()
+            
+            # Wait until the worker has opened the source (or given up)
+            deadline = time.time() + self.settings['process_start_timeout']
+            while time.time() < deadline:
+                state = _STATES[self._control[_STATE]]
+                if state != STATE_CONNECTING or not self.process.is_alive():
+                    break
+                time.sleep(0.05)
+            
+            state = _STATES[self._control[_STATE]]
+            if state in (STATE_FAILED, STATE_STOPPED) or not self.process.is_alive():
+                logger.error(f"Failed to open camera {self.camera_id} with source {self.source}")
+                self.stop()
+                return False
+            
+            logger.info(f"Camera {self.camera_id} started in process {self.process.pid}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error starting camera process {self.camera_id}: {str(e)}")
+            self.stop()
+            return False
+    
+    def stop(self):
+        """Stop the capture process and release shared memory"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        
+        if self.process is not None:
+            self.process.join(timeout=3.0)
+            if self.process.is_alive():
+                logger.warning(f"Camera process {self.camera_id} did not exit, terminating")
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+        
+        self._cleanup()
+        self.frame_buffer.clear()
+        logger.info(f"Camera {self.camera_id} stopped")
+    
+    def _cleanup(self):
+        """Release the shared memory block of a finished worker"""
+        with self._copy_lock:
+            if self._shm is not None:
+                self._shm.close()
+                try:
+                    self._shm.unlink()
+                except FileNotFoundError:
+                    pass
+                self._shm = None
+            self.process = None
+    
+    def get_frame_handle(self):
+        """
+        Get current frame together with its sequence number
+        
+        Copies the newest shared-memory frame into the local FrameBuffer
+        the first time it is requested; later calls return views of that
+        copy.
+        
+        Returns:
+            FrameHandle or None if no frame has been captured yet
+        """
+        control = self._control
+        shm = self._shm
+        if control is None or shm is None:
+            return self.frame_buffer.latest()
+        
+        if control[_SEQ] != self._copied_seq:
+            with self._copy_lock, control.get_lock():
+                if self._shm is None:
+                    return self.frame_buffer.latest()
+                
+                seq = control[_SEQ]
+                latest = control[_LATEST]
+                
+                if seq != self._copied_seq and latest >= 0:
+                    shape = (control[_HEIGHT], control[_WIDTH], control[_CHANNELS])
+                    source = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf,
+                                        offset=latest * self.slot_bytes)
+                    
+                    index, target = self.frame_buffer.acquire_write_slot()
+                    if target is None or target.shape != shape:
+                        target = np.empty(shape, dtype=np.uint8)
+                    np.copyto(target, source)
+                    del source
+                    
+                    self.frame_buffer.commit(index, target)
+                    self._copied_seq = seq
+        
+        return self.frame_buffer.latest()
+    
+    def get_frame(self):
+        """
+        Get current frame
+        
+        Returns:
+            Read-only view of the latest frame or None
+        """
+        handle = self.get_frame_handle()
+        if handle is not None:
+            return handle.image
+        return None
+    
+    def get_health(self):
+        """
+        Get camera health information
+        
+        Returns:
+            dict: Health state and counters
+        """
+        now = time.time()
+        control = self._control
+        if control is None:
+            return {
+                'state': STATE_STOPPED,
+                'state_seconds': round(now - self.created_at, 1),
+                'last_frame_age': None,
+                'frames_captured': 0,
+                'reconnect_attempts': 0,
+                'last_error': None,
+                'pid': None
+            }
+        
+        state = _STATES[control[_STATE]]
+        if not self.is_active and state in (STATE_CONNECTING, STATE_STREAMING, STATE_STALLED):
+            state = STATE_FAILED
+        
+        last_frame_ms = control[_LAST_FRAME_MS]
+        # A read() blocked inside the backend never reports the stall itself
+        if (state == STATE_STREAMING and last_frame_ms
+                and now - last_frame_ms / 1000 > self.settings['stall_timeout']):
+            state = STATE_STALLED
+        return {
+            'state': state,
+            'state_seconds': round(now - control[_STATE_SINCE_MS] / 1000, 1),
+            'last_frame_age': round(now - last_frame_ms / 1000, 2) if last_frame_ms else None,
+            'frames_captured': control[_FRAMES],
+            'reconnect_attempts': control[_RECONNECTS],
+            'last_error': self._error.value.decode('utf-8', 'replace') or None,
+            'pid': self.process.pid if self.process is not None else None
+        }
+    
+    def is_opened(self):
+        """Check if camera is opened"""
+        return self.is_active and self.get_health()['state'] == STATE_STREAMING
@@ -0,0 +1,120 @@
+"""
+Temporal confirmation of detections before they become events
+
+A class is confirmed on a camera once it was detected in at least K of the
+last M processed frames, and stays confirmed (hysteresis) until its hits
+in the window drop below a lower clear threshold. Detections of
+unconfirmed classes are still drawn on the stream but never saved or
+alerted, which removes single-frame flicker at a fraction of the cost of
+tracking.
+
+The window is a small per-camera ring array (one row per class seen), so an
+update is a few vectorized operations regardless of the window length.
+"""
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ConfirmationFilter:
+    """Per-class K-of-M confirmation for one camera"""
+    
+    def __init__(self, hits=3, window=5, clear_hits=1):
+        """
+        Initialize filter
+        
+        Args:
+            hits: Detections needed in the window to confirm a class (K)
+            window: Processed frames in the window (M)
+            clear_hits: A confirmed class clears when its hits fall below this
+        """
+        if not 1 <= hits <= window:
+            raise ValueError(f"Confirmation needs 1 <= hits ({hits}) <= window ({window})")
+        if not 0 <= clear_hits <= hits:
+            raise ValueError(f"Confirmation needs 0 <= clear hits ({clear_hits}) <= hits ({hits})")
+        
+        self.hits = hits
+        self.window = window
+        self.clear_hits = clear_hits
+        
+        # Row per class: hit flags of the last `window` frames, their sum and the state
+        self.classes = {}
+        self.ring = np.zeros((0, window), dtype=np.uint8)
+        self.counts = np.zeros(0, dtype=np.int16)
+        self.confirmed = np.zeros(0, dtype=bool)
+        self.position = 0
+        
+        self.last_seq = None
+        self.last_confirmed = None
+    
+    def _add_classes(self, names):
+        """Give classes not seen before a row"""
+        new = [name for name in names if name not in self.classes]
+        if not new:
+            return
+        
+        for name in new:
+            self.classes[name] = len(self.classes)
+        self.ring = np.vstack([self.ring, np.zeros((len(new), self.window), dtype=np.uint8)])
+        self.counts = np.concatenate([self.counts, np.zeros(len(new), dtype=np.int16)])
+        self.confirmed = np.concatenate([self.confirmed, np.zeros(len(new), dtype=bool)])
+    
+    def update(self, detections, seq=None):
+        """
+        Record one processed frame
+        
+        Args:
+            detections: Detections of the frame
+            seq: Frame sequence number; a frame already recorded (e.g. by a
+                second stream of the same camera) does not count twice
+        
+        Returns:
+            Detections whose class is confirmed
+        """
+        if seq is not None:
+            if seq == self.last_seq:
+                return self.last_confirmed
+            self.last_seq = seq
+        
+        class_ids = np.unique(detections.class_id)
+        names = [detections.classes.names[class_id] for class_id in class_ids]
+        self._add_classes(names)
+        rows = [self.classes[name] for name in names]
+        
+        present = np.zeros(len(self.classes), dtype=np.uint8)
+        present[rows] = 1
+        
+        # Replace the oldest column of the ring with this frame
+        self.counts += present.astype(np.int16) - self.ring[:, self.position]
+        self.ring[:, self.position] = present
+        self.position = (self.position + 1) % self.window
+        
+        self.confirmed = (self.counts >= self.hits) | (self.confirmed & (self.counts >= self.clear_hits))
+        
+        # Row of each detection's class, via its class ID
+        row_of_class = np.zeros(len(detections.classes.names), dtype=np.intp)
+        row_of_class[class_ids] = rows
+        self.last_confirmed = detections[self.confirmed[row_of_class[detections.class_id]]]
+        return self.last_confirmed
+    
+    def confirmed_classes(self):
+        """Classes currently confirmed"""
+        return sorted(name for name, row in self.classes.items() if self.confirmed[row])
+
+
+def create_confirmation_filter(config):
+    """
+    Create a filter from the CONFIRMATION_* settings
+    
+    Args:
+        config: App config
+    
+    Returns:
+        ConfirmationFilter
+    """
+    return ConfirmationFilter(
+        hits=config['CONFIRMATION_HITS'],
+        window=config['CONFIRMATION_WINDOW'],
+        clear_hits=config['CONFIRMATION_CLEAR_HITS']
+    )
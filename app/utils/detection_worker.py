@@ -0,0 +1,374 @@
+"""
+Detection workers and their web-side proxy
+
+With DETECTION_MODE=worker, workflow pipelines run in dedicated detection
+worker processes (`flask detection-worker`) instead of the web process.
+Workers publish encoded frames and per-camera state on the message bus;
+web workers keep the latest of each in memory and serve the workflow API
+from it through RemoteWorkflowDetector, so any number of web workers can
+share one set of pipelines.
+
+Channels:
+    surveillance:control:<worker>           start/stop requests (JSON)
+    surveillance:reply:<request id>         replies to control requests (JSON)
+    surveillance:state:<camera>             status, predictions and detections (JSON)
+    surveillance:frame:<profile>:<camera>   JPEG bytes of the latest frame
+"""
+import json
+import threading
+import time
+import uuid
+import logging
+from app.utils.workflow_detector import WorkflowDetector, DEFAULT_CAMERA_ID
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'surveillance:'
+CONTROL_PREFIX = f'{CHANNEL_PREFIX}control:'
+REPLY_PREFIX = f'{CHANNEL_PREFIX}reply:'
+STATE_PREFIX = f'{CHANNEL_PREFIX}state:'
+FRAME_PREFIX = f'{CHANNEL_PREFIX}frame:'
+
+
+def _dumps(value):
+    """JSON payload; workflow predictions may hold values JSON does not know"""
+    return json.dumps(value, default=str).encode()
+
+
+class DetectionWorker:
+    """Runs workflow pipelines and publishes their output on the message bus"""
+    
+    def __init__(self, bus, name='default', publish_fps=15, profiles=('preview', 'stream')):
+        """
+        Initialize detection worker
+        
+        Args:
+            bus: MessageBus
+            name: Worker name; control requests are addressed to it
+            publish_fps: Maximum rate at which frames and state are published
+            profiles: Encode profiles published for every new frame
+        """
+        self.bus = bus
+        self.name = name
+        self.publish_interval = 1.0 / publish_fps
+        self.profiles = tuple(profiles)
+        self.detector = None
+        self.stop_event = threading.Event()
+        self.ready = threading.Event()
+        self._published = {}
+    
+    def run(self):
+        """Serve control requests and publish frames until stop() (needs an app context)"""
+        self.detector = WorkflowDetector()
+        control = self.bus.subscribe(f'{CONTROL_PREFIX}{self.name}')
+        self.ready.set()
+        
+        # Requests arriving meanwhile wait in the subscription
+        if not self.detector.prewarm():
+            logger.warning(f"Detection worker {self.name}: backend not ready: {self.detector.error_message}")
+        
+        logger.info(f"Detection worker {self.name} listening for control requests")
+        next_publish = time.monotonic()
+        
+        try:
+            while not self.stop_event.is_set():
+                message = control.get(timeout=max(0.0, next_publish - time.monotonic()))
+                if message is not None:
+                    self.handle(message[1])
+                
+                if time.monotonic() >= next_publish:
+                    self.publish()
+                    next_publish = time.monotonic() + self.publish_interval
+        finally:
+            control.close()
+            self.detector.stop_detection()
+            self.publish()
+            logger.info(f"Detection worker {self.name} stopped")
+    
+    def stop(self):
+        """Ask run() to return"""
+        self.stop_event.set()
+    
+    def handle(self, payload):
+        """
+        Execute one control request and publish the reply
+        
+        Args:
+            payload: JSON with 'id', 'action' ('start', 'stop' or 'status') and its arguments
+        """
+        try:
+            request = json.loads(payload)
+        except ValueError:
+            logger.error(f"Detection worker {self.name}: malformed control request")
+            return
+        
+        action = request.get('action')
+        try:
+            if action == 'start':
+                result = self.detector.start_group(request.get('cameras') or {})
+            elif action == 'stop':
+                result = self.detector.stop_detection(request.get('camera_id'))
+            elif action == 'status':
+                result = {'success': True, 'cameras': self.detector.get_all_status()}
+            else:
+                result = {'success': False, 'message': f"Unknown action '{action}'"}
+        except Exception as e:
+            logger.error(f"Detection worker {self.name}: {action} failed: {str(e)}")
+            result = {'success': False, 'message': str(e)}
+        
+        if request.get('id'):
+            self.bus.publish(f"{REPLY_PREFIX}{request['id']}", _dumps(result))
+    
+    def publish(self):
+        """Publish state of every camera, and frames that changed since the last call"""
+        cameras = dict(self.detector.cameras)
+        
+        for camera_id, slot in cameras.items():
+            status = self.detector.get_status(camera_id)
+            status['detections'] = self.detector.parse_detections(camera_id).to_dicts()
+            status['worker'] = self.name
+            
+            if slot.frame_count != self._published.get(camera_id):
+                self._published[camera_id] = slot.frame_count
+                for profile in self.profiles:
+                    frame_bytes = self.detector.get_frame(profile, camera_id)
+                    if frame_bytes:
+                        self.bus.publish(f'{FRAME_PREFIX}{profile}:{camera_id}', frame_bytes)
+            
+            self.bus.publish(f'{STATE_PREFIX}{camera_id}', _dumps(status))
+        
+        # One last state for stopped cameras so web workers drop them
+        for camera_id in [camera_id for camera_id in self._published if camera_id not in cameras]:
+            del self._published[camera_id]
+            status = self.detector.get_status(camera_id)
+            status['worker'] = self.name
+            self.bus.publish(f'{STATE_PREFIX}{camera_id}', _dumps(status))
+
+
+def start_embedded_worker(app, bus, name):
+    """
+    Run a detection worker on a thread of this process (for the memory:// bus)
+    
+    Returns:
+        DetectionWorker
+    """
+    worker = DetectionWorker(bus, name, app.config['WORKER_PUBLISH_FPS'], app.config['WORKER_PUBLISH_PROFILES'])
+    
+    def run():
+        with app.app_context():
+            worker.run()
+    
+    threading.Thread(target=run, name=f'detection-worker-{name}', daemon=True).start()
+    worker.ready.wait(10)
+    return worker
+
+
+class RemoteCamera:
+    """Latest state and frames of one camera, as published by a worker"""
+    
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.status = None
+        self.frames = {}
+        self.updated_at = time.monotonic()
+    
+    @property
+    def frame_count(self):
+        return (self.status or {}).get('frame_count', 0)
+
+
+class RemoteWorkflowDetector:
+    """
+    WorkflowDetector interface served from a detection worker's messages
+    
+    Reads come from the latest messages kept in memory; start and stop are
+    forwarded to the worker as control requests.
+    """
+    
+    def __init__(self, bus, worker='default', reply_timeout=30.0, stale_after=10.0):
+        """
+        Initialize remote detector
+        
+        Args:
+            bus: MessageBus
+            worker: Name of the detection worker that receives control requests
+            reply_timeout: Seconds to wait for the worker to answer a request
+            stale_after: Seconds without state after which a camera is dropped
+        """
+        self.bus = bus
+        self.worker = worker
+        self.reply_timeout = reply_timeout
+        self.stale_after = stale_after
+        self.cameras = {}
+        self.error_message = None
+        self.lock = threading.Lock()
+        self.subscription = bus.subscribe(STATE_PREFIX, FRAME_PREFIX)
+        self._listener = threading.Thread(target=self._listen, name='remote-workflow-listener', daemon=True)
+        self._listener.start()
+    
+    @property
+    def is_running(self):
+        """Whether any camera is running on the worker"""
+        return any(camera.status and camera.status.get('is_running') for camera in list(self.cameras.values()))
+    
+    def _listen(self):
+        """Keep the latest state and frames of every camera"""
+        while True:
+            try:
+                message = self.subscription.get(timeout=1.0)
+                if message is not None:
+                    self._receive(*message)
+                self._drop_stale()
+            except Exception as e:
+                logger.error(f"Error receiving detection worker messages: {str(e)}")
+                time.sleep(1.0)
+    
+    def _receive(self, channel, payload):
+        """Store one state or frame message"""
+        if channel.startswith(STATE_PREFIX):
+            camera_id = channel[len(STATE_PREFIX):]
+            status = json.loads(payload)
+            with self.lock:
+                if not status.get('is_running'):
+                    self.cameras.pop(camera_id, None)
+                    return
+                camera = self.cameras.setdefault(camera_id, RemoteCamera(camera_id))
+                camera.status = status
+                camera.updated_at = time.monotonic()
+        
+        elif channel.startswith(FRAME_PREFIX):
+            profile, camera_id = channel[len(FRAME_PREFIX):].split(':', 1)
+            with self.lock:
+                camera = self.cameras.setdefault(camera_id, RemoteCamera(camera_id))
+                camera.frames[profile] = payload
+    
+    def _drop_stale(self):
+        """Forget cameras of workers that stopped publishing"""
+        deadline = time.monotonic() - self.stale_after
+        with self.lock:
+            for camera_id in [camera_id for camera_id, camera in self.cameras.items()
+                              if camera.updated_at < deadline]:
+                logger.warning(f"No state from the detection worker for camera {camera_id}; dropping it")
+                del self.cameras[camera_id]
+    
+    def _request(self, action, **arguments):
+        """
+        Send a control request to the worker and wait for its reply
+        
+        Returns:
+            dict: The worker's result
+        """
+        request_id = uuid.uuid4().hex
+        replies = self.bus.subscribe(f'{REPLY_PREFIX}{request_id}')
+        
+        try:
+            self.bus.publish(f'{CONTROL_PREFIX}{self.worker}',
+                             _dumps({'id': request_id, 'action': action, **arguments}))
+            message = replies.get(timeout=self.reply_timeout)
+        finally:
+            replies.close()
+        
+        if message is None:
+            self.error_message = f"Detection worker '{self.worker}' did not answer"
+            return {'success': False, 'message': self.error_message}
+        return json.loads(message[1])
+    
+    def start_detection(self, video_source=0, camera_id=DEFAULT_CAMERA_ID):
+        """Start the pipeline for one camera on the worker"""
+        return self.start_group({camera_id: video_source})
+    
+    def start_group(self, sources):
+        """Start one pipeline serving several cameras on the worker"""
+        result = self._request('start', cameras=sources)
+        if result.get('success'):
+            # Known before their first state arrives, so their feeds open at once
+            with self.lock:
+                for camera_id in result.get('cameras', []):
+                    self.cameras.setdefault(camera_id, RemoteCamera(camera_id))
+        return result
+    
+    def stop_detection(self, camera_id=None):
+        """Stop a camera's pipeline (or all of them) on the worker"""
+        result = self._request('stop', camera_id=camera_id)
+        if result.get('success'):
+            with self.lock:
+                for stopped in result.get('cameras', []):
+                    self.cameras.pop(stopped, None)
+        return result
+    
+    def get_frame(self, profile='stream', camera_id=DEFAULT_CAMERA_ID):
+        """Latest JPEG of a camera; falls back to the stream profile if the worker does not publish it"""
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            return None
+        return camera.frames.get(profile) or camera.frames.get('stream')
+    
+    def get_current_frame(self, camera_id=DEFAULT_CAMERA_ID):
+        """Latest frame decoded from its stream JPEG (workers do not publish raw frames)"""
+        frame_bytes = self.get_frame('stream', camera_id)
+        if frame_bytes is None:
+            return None
+        
+        import cv2
+        import numpy as np
+        return cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    
+    def get_status(self, camera_id=DEFAULT_CAMERA_ID):
+        """Status of one camera as last published"""
+        camera = self.cameras.get(camera_id)
+        if camera is None or camera.status is None:
+            return {
+                "camera_id": camera_id,
+                "is_running": False,
+                "frame_count": 0,
+                "has_frame": False,
+                "video_source": None,
+                "error_message": self.error_message,
+                "predictions": None
+            }
+        
+        status = {key: value for key, value in camera.status.items() if key != 'detections'}
+        status['has_frame'] = bool(camera.frames)
+        return status
+    
+    def get_all_status(self):
+        """Short status of every camera whose state has arrived"""
+        summary = {}
+        for camera_id in [camera_id for camera_id, camera in list(self.cameras.items()) if camera.status]:
+            status = self.get_status(camera_id)
+            status.pop('predictions', None)
+            summary[camera_id] = status
+        return summary
+    
+    def get_predictions(self, camera_id=DEFAULT_CAMERA_ID):
+        """Latest predictions of a camera"""
+        return self.get_status(camera_id).get('predictions')
+    
+    def parse_detections(self, camera_id=DEFAULT_CAMERA_ID):
+        """Detections parsed by the worker"""
+        from app.utils.detections import Detections
+        
+        camera = self.cameras.get(camera_id)
+        if camera is None or camera.status is None:
+            return Detections.empty()
+        return Detections.from_predictions(camera.status.get('detections') or [])
+
+
+def create_remote_detector(app):
+    """
+    Web-side workflow detector for DETECTION_MODE=worker
+    
+    With the in-process memory:// bus there is no separate worker process
+    to talk to, so one is started on a thread here.
+    
+    Returns:
+        RemoteWorkflowDetector
+    """
+    from app.utils.message_bus import create_bus, InProcessBus
+    
+    bus = create_bus(app.config['MESSAGE_BUS_URL'])
+    name = app.config['DETECTION_WORKER_NAME']
+    if isinstance(bus, InProcessBus):
+        start_embedded_worker(app, bus, name)
+    
+    return RemoteWorkflowDetector(bus, name, app.config['WORKER_REPLY_TIMEOUT'])
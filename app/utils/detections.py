@@ -0,0 +1,231 @@
+"""
+Detections of one frame as NumPy arrays
+
+Detector outputs are parsed once into parallel arrays (xyxy boxes,
+confidences and integer class IDs) and stay in that form through
+preprocessing, confirmation, tracking, zone rules and drawing. Class
+filtering is a lookup in a precomputed per-class mask, and the familiar
+{'class', 'confidence', 'bbox': [x, y, width, height]} dictionaries are only
+built at the API boundary (to_dicts) or for the few detections that become
+events.
+"""
+import numpy as np
+
+
+class ClassMap:
+    """Class names seen by one source, each with a stable integer ID"""
+    
+    def __init__(self, names=()):
+        """
+        Initialize class map
+        
+        Args:
+            names: Class names known up front (e.g. from model metadata)
+        """
+        self.names = []
+        self.ids = {}
+        self._names_array = None
+        self._mask_key = None
+        self._mask = None
+        for name in names:
+            self.id(name)
+    
+    def id(self, name):
+        """ID of a class name, assigning the next ID to names not seen before"""
+        class_id = self.ids.get(name)
+        if class_id is None:
+            class_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return class_id
+    
+    def names_array(self):
+        """Class names as an object array indexable by class ID"""
+        if self._names_array is None or len(self._names_array) != len(self.names):
+            self._names_array = np.array(self.names, dtype=object)
+        return self._names_array
+    
+    def mask(self, wanted):
+        """
+        Boolean mask over class IDs of the classes in `wanted`
+        
+        Args:
+            wanted: Class names to keep (case-insensitive)
+        
+        Returns:
+            Array indexable by class ID; rebuilt only when `wanted` or the
+            known classes change
+        """
+        key = (tuple(wanted), len(self.names))
+        if key != self._mask_key:
+            lowered = {name.lower() for name in wanted}
+            self._mask = np.array([name.lower() in lowered for name in self.names], dtype=bool)
+            self._mask_key = key
+        return self._mask
+
+
+def _top_left_box(prediction):
+    """[x, y, width, height] of a prediction in any of the supported formats"""
+    if 'x' in prediction and 'y' in prediction and 'width' in prediction and 'height' in prediction:
+        return (prediction['x'] - prediction['width'] / 2, prediction['y'] - prediction['height'] / 2,
+                prediction['width'], prediction['height'])
+    if 'bbox' in prediction:
+        return tuple(prediction['bbox'])
+    if 'bounding_box' in prediction:
+        bb = prediction['bounding_box']
+        return (bb.get('x', 0), bb.get('y', 0), bb.get('width', 0), bb.get('height', 0))
+    return (0, 0, 0, 0)
+
+
+class Detections:
+    """Boxes, confidences and class IDs of one frame"""
+    
+    def __init__(self, xyxy, confidence, class_id, classes):
+        """
+        Initialize detections
+        
+        Args:
+            xyxy: Array of shape (N, 4), [x1, y1, x2, y2] in pixels
+            confidence: Array of shape (N,)
+            class_id: Array of shape (N,), IDs in `classes`
+            classes: ClassMap the IDs refer to
+        """
+        self.xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        self.confidence = np.asarray(confidence, dtype=np.float64).reshape(-1)
+        self.class_id = np.asarray(class_id, dtype=np.intp).reshape(-1)
+        self.classes = classes
+    
+    @classmethod
+    def empty(cls, classes=None):
+        """No detections"""
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.intp), classes or ClassMap())
+    
+    @classmethod
+    def from_predictions(cls, predictions, classes=None):
+        """
+        Parse Roboflow, workflow or API predictions
+        
+        Args:
+            predictions: List of dictionaries with a 'class' (or 'class_name'),
+                a 'confidence' and a box as centre x/y/width/height, a
+                top-left 'bbox' [x, y, width, height] or a top-left
+                'bounding_box' {x, y, width, height}
+            classes: ClassMap to assign class IDs from (a new one if None)
+        
+        Returns:
+            Detections
+        """
+        classes = classes if classes is not None else ClassMap()
+        if not predictions:
+            return cls.empty(classes)
+        
+        # One column list per field: a plain loop beats building per-row tuples
+        xs, ys, widths, heights, confidences, class_ids = [], [], [], [], [], []
+        class_id = classes.id
+        try:
+            # Common case: centre-based boxes (Roboflow, ONNX and synthetic backends)
+            for p in predictions:
+                xs.append(p['x'] - p['width'] / 2)
+                ys.append(p['y'] - p['height'] / 2)
+                widths.append(p['width'])
+                heights.append(p['height'])
+                confidences.append(p.get('confidence', 0.0))
+                class_ids.append(class_id(p.get('class', p.get('class_name', 'unknown'))))
+        except (KeyError, TypeError):
+            xs, ys, widths, heights, confidences, class_ids = [], [], [], [], [], []
+            for p in predictions:
+                x, y, width, height = _top_left_box(p)
+                xs.append(x)
+                ys.append(y)
+                widths.append(width)
+                heights.append(height)
+                confidences.append(p.get('confidence', 0.0))
+                class_ids.append(class_id(p.get('class', p.get('class_name', 'unknown'))))
+        
+        boxes = np.array([xs, ys, widths, heights], dtype=np.float64).T
+        xyxy = np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)
+        return cls(xyxy, confidences, class_ids, classes)
+    
+    @classmethod
+    def concatenate(cls, items, classes=None):
+        """
+        Join detections sharing one ClassMap
+        
+        Args:
+            items: List of Detections
+            classes: ClassMap of the result when `items` is empty
+        
+        Returns:
+            Detections
+        """
+        if not items:
+            return cls.empty(classes)
+        if len(items) == 1:
+            return items[0]
+        return cls(np.concatenate([d.xyxy for d in items]),
+                   np.concatenate([d.confidence for d in items]),
+                   np.concatenate([d.class_id for d in items]),
+                   items[0].classes)
+    
+    def __len__(self):
+        return len(self.confidence)
+    
+    def __getitem__(self, index):
+        """Subset by boolean mask, index array or slice"""
+        return Detections(self.xyxy[index], self.confidence[index], self.class_id[index], self.classes)
+    
+    def __repr__(self):
+        return f'<Detections {len(self)}: {", ".join(sorted(set(self.class_names)))}>'
+    
+    @property
+    def class_names(self):
+        """Class name of each detection (object array)"""
+        return self.classes.names_array()[self.class_id]
+    
+    def xywh(self):
+        """Integer top-left [x, y, width, height] boxes, shape (N, 4)"""
+        boxes = np.concatenate([self.xyxy[:, :2], self.xyxy[:, 2:] - self.xyxy[:, :2]], axis=1)
+        # Round off float error first, so a width of 3.0 is never truncated to 2
+        return np.trunc(np.round(boxes, 6)).astype(np.int64)
+    
+    def filter_classes(self, wanted):
+        """Detections whose class is in `wanted` (case-insensitive)"""
+        if not len(self):
+            return self
+        return self[self.classes.mask(wanted)[self.class_id]]
+    
+    def map(self, offset_x, offset_y, scale):
+        """
+        Map boxes from a downscaled tile to full-frame coordinates
+        
+        Args:
+            offset_x, offset_y: Position of the tile in the frame
+            scale: Downscale factor of the tile
+        
+        Returns:
+            New Detections
+        """
+        if scale == 1.0 and offset_x == 0 and offset_y == 0:
+            return self
+        xyxy = self.xyxy / scale + np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float64)
+        return Detections(xyxy, self.confidence, self.class_id, self.classes)
+    
+    def scaled(self, scale):
+        """Detections with every box coordinate multiplied by `scale`"""
+        if scale == 1.0:
+            return self
+        return Detections(self.xyxy * scale, self.confidence, self.class_id, self.classes)
+    
+    def to_dict(self, index):
+        """One detection as {'class', 'confidence', 'bbox': [x, y, width, height]}"""
+        return {
+            'class': self.classes.names[self.class_id[index]],
+            'confidence': float(self.confidence[index]),
+            'bbox': self[index:index + 1].xywh()[0].tolist()
+        }
+    
+    def to_dicts(self):
+        """All detections as JSON-serializable dictionaries"""
+        names = self.class_names.tolist()
+        confidences = self.confidence.tolist()
+        return [{'class': name, 'confidence': confidence, 'bbox': bbox}
+                for name, confidence, bbox in zip(names, confidences, self.xywh().tolist())]
@@ -1,46 +1,89 @@
 """
-Object Detection using Roboflow API
+Object Detection with a pluggable inference backend
 """
-import os
+import time
 import cv2
-import numpy as np
-from roboflow import Roboflow
 from flask import current_app
 import logging
+from app.utils.detector_backends import create_backend
+from app.utils.detections import Detections, ClassMap
 
 logger = logging.getLogger(__name__)
 
+
+def draw_detections(frame, detections):
+    """
+    Draw bounding boxes and labels on frame
+    
+    Args:
+        frame: OpenCV image
+        detections: Detections, or a list of detection dictionaries
+        
+    Returns:
+        Frame with drawn detections
+    """
+    frame_copy = frame.copy()
+    
+    if isinstance(detections, Detections):
+        rows = zip(detections.xywh().tolist(), detections.class_names.tolist(), detections.confidence.tolist())
+    else:
+        rows = ((d['bbox'], d['class'], d['confidence']) for d in detections)
+    
+    for (x, y, w, h), class_name, confidence in rows:
+        # Draw bounding box
+        color = (0, 255, 0)  # Green
+        cv2.rectangle(frame_copy, (x, y), (x + w, y + h), color, 2)
+        
+        # Draw label
+        label = f"{class_name}: {confidence:.2f}"
+        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
+        cv2.rectangle(frame_copy, (x, y - label_size[1] - 10), 
+                     (x + label_size[0], y), color, -1)
+        cv2.putText(frame_copy, label, (x, y - 5), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+    
+    return frame_copy
+
+
 class ObjectDetector:
-    """Roboflow-based object detection"""
+    """Object detection on top of a DetectorBackend (hosted Roboflow or local ONNX)"""
     
     def __init__(self):
-        """Initialize Roboflow detector"""
-        self.model = None
+        """Initialize detector with the configured backend"""
+        self.backend = None
         self.confidence_threshold = current_app.config['CONFIDENCE_THRESHOLD']
         self.detection_classes = current_app.config['DETECTION_CLASSES']
+        # Class IDs shared by every frame, so the class filter mask is built once
+        self.classes = ClassMap()
         self.initialize_model()
     
     def initialize_model(self):
-        """Initialize Roboflow model"""
+        """Load the configured inference backend and warm it up"""
+        backend_name = current_app.config['DETECTOR_BACKEND']
+        
         try:
-            api_key = current_app.config['ROBOFLOW_API_KEY']
-            workspace = current_app.config['ROBOFLOW_WORKSPACE']
-            project = current_app.config['ROBOFLOW_PROJECT']
-            version = current_app.config['ROBOFLOW_VERSION']
-            
-            if not api_key:
-                logger.warning("Roboflow API key not configured. Detection will not work.")
-                return
-            
-            rf = Roboflow(api_key=api_key)
-            project_obj = rf.workspace(workspace).project(project)
-            self.model = project_obj.version(version).model
-            
-            logger.info("Roboflow model initialized successfully")
-            
+            backend = create_backend(backend_name, current_app.config)
+        except ValueError as e:
+            logger.error(str(e))
+            return
+        
+        if not backend.load():
+            return
+        
+        try:
+            warmup_runs = current_app.config['DETECTOR_WARMUP_RUNS']
+            if warmup_runs:
+                start = time.time()
+                backend.warmup(warmup_runs)
+                logger.info(f"Detector backend '{backend_name}' warmed up in {time.time() - start:.2f}s")
         except Exception as e:
-            logger.error(f"Failed to initialize Roboflow model: {str(e)}")
-            self.model = None
+            logger.warning(f"Detector warm-up failed: {str(e)}")
+        
+        self.backend = backend
+    
+    def _parse_predictions(self, predictions):
+        """Convert backend predictions to Detections of the wanted classes"""
+        return Detections.from_predictions(predictions, self.classes).filter_classes(self.detection_classes)
     
     def detect_objects(self, frame):
         """
@@ -50,49 +93,42 @@ class ObjectDetector:
             frame: OpenCV image (numpy array)
             
         Returns:
-            List of detections with format:
-            [{'class': str, 'confidence': float, 'bbox': [x, y, w, h]}, ...]
+            Detections (to_dicts() gives
+            [{'class': str, 'confidence': float, 'bbox': [x, y, w, h]}, ...])
         """
-        if self.model is None:
+        if self.backend is None:
             logger.warning("Model not initialized. Cannot perform detection.")
-            return []
+            return Detections.empty(self.classes)
         
         try:
-            # Save frame temporarily
-            temp_path = 'temp_frame.jpg'
-            cv2.imwrite(temp_path, frame)
-            
-            # Perform inference
-            predictions = self.model.predict(temp_path, confidence=self.confidence_threshold).json()
-            
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            predictions = self.backend.predict(frame, self.confidence_threshold)
+            return self._parse_predictions(predictions)
             
-            # Parse predictions
-            detections = []
-            for pred in predictions.get('predictions', []):
-                class_name = pred['class']
-                
-                # Filter by detection classes
-                if class_name.lower() in [c.lower() for c in self.detection_classes]:
-                    detection = {
-                        'class': class_name,
-                        'confidence': pred['confidence'],
-                        'bbox': [
-                            int(pred['x'] - pred['width'] / 2),
-                            int(pred['y'] - pred['height'] / 2),
-                            int(pred['width']),
-                            int(pred['height'])
-                        ]
-                    }
-                    detections.append(detection)
+        except Exception as e:
+            logger.error(f"Detection error: {str(e)}")
+            return Detections.empty(self.classes)
+    
+    def detect_batch(self, frames):
+        """
+        Detect objects in several frames with one backend call
+        
+        Args:
+            frames: List of OpenCV images
             
-            return detections
+        Returns:
+            List with one Detections per frame
+        """
+        if self.backend is None:
+            logger.warning("Model not initialized. Cannot perform detection.")
+            return [Detections.empty(self.classes) for _ in frames]
+        
+        try:
+            results = self.backend.predict_batch(frames, self.confidence_threshold)
+            return [self._parse_predictions(predictions) for predictions in results]
             
         except Exception as e:
             logger.error(f"Detection error: {str(e)}")
-            return []
+            return [Detections.empty(self.classes) for _ in frames]
     
     def draw_detections(self, frame, detections):
         """
@@ -100,31 +136,12 @@ class ObjectDetector:
         
         Args:
             frame: OpenCV image
-            detections: List of detection dictionaries
+            detections: Detections, or a list of detection dictionaries
             
         Returns:
             Frame with drawn detections
         """
-        frame_copy = frame.copy()
-        
-        for detection in detections:
-            x, y, w, h = detection['bbox']
-            class_name = detection['class']
-            confidence = detection['confidence']
-            
-            # Draw bounding box
-            color = (0, 255, 0)  # Green
-            cv2.rectangle(frame_copy, (x, y), (x + w, y + h), color, 2)
-            
-            # Draw label
-            label = f"{class_name}: {confidence:.2f}"
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
-            cv2.rectangle(frame_copy, (x, y - label_size[1] - 10), 
-                         (x + label_size[0], y), color, -1)
-            cv2.putText(frame_copy, label, (x, y - 5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
-        
-        return frame_copy
+        return draw_detections(frame, detections)
     
     def update_confidence_threshold(self, threshold):
         """Update confidence threshold"""
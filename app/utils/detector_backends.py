@@ -0,0 +1,411 @@
+"""
+Inference backends for ObjectDetector
+
+A backend turns frames into Roboflow-style predictions
+({'class', 'confidence', 'x', 'y', 'width', 'height'} with x/y at the box
+centre), so ObjectDetector can filter and format them the same way no
+matter where inference runs.
+"""
+import ast
+import itertools
+import os
+import logging
+import random
+import time
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {}
+
+
+def register_backend(name):
+    """
+    Class decorator registering a backend under a DETECTOR_BACKEND name
+    
+    Args:
+        name: Name used in configuration
+    """
+    def decorator(backend_class):
+        backend_class.name = name
+        BACKENDS[name] = backend_class
+        return backend_class
+    return decorator
+
+
+class DetectorBackend:
+    """Base class for detection backends"""
+    
+    name = None
+    
+    def __init__(self, config):
+        """
+        Initialize backend
+        
+        Args:
+            config: Flask configuration mapping
+        """
+        self.config = config
+        self.is_ready = False
+    
+    def load(self):
+        """
+        Load the model
+        
+        Returns:
+            True if the backend is ready for inference
+        """
+        raise NotImplementedError
+    
+    def warmup(self, runs=1):
+        """
+        Run throwaway inferences so the first real frame is not slow
+        
+        Args:
+            runs: Number of warm-up inferences
+        """
+    
+    def predict(self, frame, confidence):
+        """
+        Run inference on one frame
+        
+        Args:
+            frame: OpenCV image (numpy array)
+            confidence: Minimum confidence to report
+        
+        Returns:
+            List of prediction dictionaries
+        """
+        raise NotImplementedError
+    
+    def predict_batch(self, frames, confidence):
+        """
+        Run inference on several frames
+        
+        Args:
+            frames: List of OpenCV images
+            confidence: Minimum confidence to report
+        
+        Returns:
+            List with one list of predictions per frame
+        """
+        return [self.predict(frame, confidence) for frame in frames]
+
+
+@register_backend('roboflow')
+class RoboflowBackend(DetectorBackend):
+    """Hosted Roboflow model; every prediction is an HTTP round-trip"""
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.model = None
+    
+    def load(self):
+        """Initialize Roboflow model"""
+        try:
+            api_key = self.config['ROBOFLOW_API_KEY']
+            workspace = self.config['ROBOFLOW_WORKSPACE']
+            project = self.config['ROBOFLOW_PROJECT']
+            version = self.config['ROBOFLOW_VERSION']
+            
+            if not api_key:
+                logger.warning("Roboflow API key not configured. Detection will not work.")
+                return False
+            
+            from roboflow import Roboflow
+            
+            rf = Roboflow(api_key=api_key)
+            project_obj = rf.workspace(workspace).project(project)
+            self.model = project_obj.version(version).model
+            self.is_ready = True
+            
+            logger.info("Roboflow model initialized successfully")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to initialize Roboflow model: {str(e)}")
+            self.model = None
+            return False
+    
+    def predict(self, frame, confidence):
+        """Send the frame to the hosted model"""
+        # Save frame temporarily
+        temp_path = 'temp_frame.jpg'
+        cv2.imwrite(temp_path, frame)
+        
+        try:
+            predictions = self.model.predict(temp_path, confidence=confidence).json()
+        finally:
+            # Clean up temp file
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        return predictions.get('predictions', [])
+
+
+@register_backend('onnx')
+class OnnxBackend(DetectorBackend):
+    """
+    Local ONNX Runtime model (CPU)
+    
+    Expects a YOLO-style export: input (batch, 3, size, size) RGB in [0, 1]
+    and output either (batch, 4 + classes, boxes) (YOLOv8 and later) or
+    (batch, boxes, 5 + classes) with an objectness column (YOLOv5).
+    """
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.session = None
+        self.input_name = None
+        self.input_size = config['ONNX_INPUT_SIZE']
+        self.dynamic_batch = False
+        self.class_names = []
+        self.nms_iou = config['ONNX_NMS_IOU']
+    
+    def load(self):
+        """Create the ONNX Runtime session from the weights on disk"""
+        model_path = self.config['ONNX_MODEL_PATH']
+        
+        if not model_path or not os.path.exists(model_path):
+            logger.error(f"ONNX model not found: {model_path!r}. Set ONNX_MODEL_PATH.")
+            return False
+        
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            logger.error("onnxruntime is not installed. Install it with: pip install onnxruntime")
+            return False
+        
+        try:
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.config['ONNX_INTRA_OP_THREADS']:
+                options.intra_op_num_threads = self.config['ONNX_INTRA_OP_THREADS']
+            if self.config['ONNX_INTER_OP_THREADS']:
+                options.inter_op_num_threads = self.config['ONNX_INTER_OP_THREADS']
+            
+            self.session = ort.InferenceSession(model_path, sess_options=options,
+                                                providers=['CPUExecutionProvider'])
+            
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            batch_dim, _, height, _ = model_input.shape
+            self.dynamic_batch = not isinstance(batch_dim, int)
+            if isinstance(height, int):
+                self.input_size = height
+            
+            self.class_names = self._load_class_names()
+            self.is_ready = True
+            
+            logger.info(f"ONNX model loaded from {model_path} "
+                        f"({len(self.class_names)} classes, input {self.input_size}px)")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to load ONNX model: {str(e)}")
+            self.session = None
+            return False
+    
+    def _load_class_names(self):
+        """Class names from ONNX_CLASS_NAMES, else from the model metadata"""
+        configured = self.config['ONNX_CLASS_NAMES']
+        if configured:
+            return [name.strip() for name in configured.split(',')]
+        
+        # Ultralytics exports store {index: name} in the 'names' metadata entry
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if 'names' in metadata:
+            try:
+                names = ast.literal_eval(metadata['names'])
+                if isinstance(names, dict):
+                    return [names[i] for i in sorted(names)]
+                return list(names)
+            except (ValueError, SyntaxError):
+                logger.warning("Could not parse class names from ONNX metadata")
+        
+        return []
+    
+    def warmup(self, runs=1):
+        """Run inference on blank frames"""
+        blank = np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict(blank, 1.0)
+    
+    def _letterbox(self, frame):
+        """
+        Resize keeping aspect ratio and pad to the square model input
+        
+        Returns:
+            tuple: (CHW float32 tensor, scale, pad_x, pad_y)
+        """
+        size = self.input_size
+        h, w = frame.shape[:2]
+        scale = min(size / h, size / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        pad_x = (size - new_w) // 2
+        pad_y = (size - new_h) // 2
+        
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+        
+        tensor = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0, scale, pad_x, pad_y
+    
+    def _postprocess(self, output, confidence, scale, pad_x, pad_y):
+        """Decode one image's raw output into predictions"""
+        # YOLOv8 layout is (4 + classes, boxes); YOLOv5 is (boxes, 5 + classes)
+        if output.shape[0] < output.shape[1]:
+            output = output.T
+            boxes = output[:, :4]
+            class_scores = output[:, 4:]
+        else:
+            boxes = output[:, :4]
+            class_scores = output[:, 5:] * output[:, 4:5]
+        
+        if class_scores.shape[1] == 0:
+            return []
+        
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores >= confidence
+        if not keep.any():
+            return []
+        
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+        
+        # Undo letterboxing: centre x/y, width, height in frame pixels
+        boxes = boxes.copy()
+        boxes[:, 0] = (boxes[:, 0] - pad_x) / scale
+        boxes[:, 1] = (boxes[:, 1] - pad_y) / scale
+        boxes[:, 2:] /= scale
+        
+        # Class-aware NMS: shift each class by more than the extent of all boxes
+        # (frame size and boxes past its edges alike) so classes never overlap
+        top_left = boxes[:, :2] - boxes[:, 2:] / 2
+        bottom_right = boxes[:, :2] + boxes[:, 2:] / 2
+        span = float(bottom_right.max() - top_left.min()) + 1.0
+        offset = class_ids[:, None] * span
+        nms_boxes = np.concatenate([top_left + offset, boxes[:, 2:]], axis=1)
+        indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), scores.tolist(), confidence, self.nms_iou)
+        
+        predictions = []
+        for i in np.array(indices).reshape(-1):
+            class_id = int(class_ids[i])
+            predictions.append({
+                'class': self.class_names[class_id] if class_id < len(self.class_names) else str(class_id),
+                'confidence': float(scores[i]),
+                'x': float(boxes[i, 0]),
+                'y': float(boxes[i, 1]),
+                'width': float(boxes[i, 2]),
+                'height': float(boxes[i, 3])
+            })
+        return predictions
+    
+    def predict(self, frame, confidence):
+        """Run the local model on one frame"""
+        return self.predict_batch([frame], confidence)[0]
+    
+    def predict_batch(self, frames, confidence):
+        """Run the local model on several frames, batched when the model allows it"""
+        prepared = [self._letterbox(frame) for frame in frames]
+        
+        if self.dynamic_batch:
+            batch = np.stack([p[0] for p in prepared])
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = [self.session.run(None, {self.input_name: p[0][None]})[0][0] for p in prepared]
+        
+        return [
+            self._postprocess(outputs[i], confidence, scale, pad_x, pad_y)
+            for i, (_, scale, pad_x, pad_y) in enumerate(prepared)
+        ]
+
+
+@register_backend('synthetic')
+class SyntheticBackend(DetectorBackend):
+    """
+    Fake model for load testing without API keys, network or weights
+    
+    Emits the same detections for the same call sequence: boxes drift
+    across the frame as calls accumulate, and each call sleeps for a
+    configured latency plus seeded jitter to stand in for inference time.
+    """
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.latency = config['SYNTHETIC_LATENCY_MS'] / 1000.0
+        self.jitter = config['SYNTHETIC_JITTER_MS'] / 1000.0
+        self.objects = config['SYNTHETIC_OBJECTS']
+        self.classes = [c.strip() for c in config['DETECTION_CLASSES']] or ['object']
+        self._random = random.Random(config['SYNTHETIC_SEED'])
+        self._calls = itertools.count()
+    
+    def load(self):
+        """Nothing to load"""
+        self.is_ready = True
+        logger.info(f"Synthetic detector ready ({self.objects} objects, "
+                    f"{self.latency * 1000:.0f}±{self.jitter * 1000:.0f} ms)")
+        return True
+    
+    def _sleep(self):
+        """Simulate inference time"""
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+    
+    def _detections(self, call, frame, confidence):
+        """Deterministic predictions for the n-th call"""
+        h, w = frame.shape[:2]
+        predictions = []
+        
+        for i in range(self.objects):
+            score = 0.55 + 0.4 * (((call + i * 7) % 10) / 10)
+            if score < confidence:
+                continue
+            
+            box_w = w * (0.1 + 0.05 * (i % 3))
+            box_h = h * (0.2 + 0.05 * (i % 2))
+            # Each object drifts horizontally at its own speed and wraps around
+            progress = ((call * (i + 1) * 0.01) + i / max(1, self.objects)) % 1.0
+            predictions.append({
+                'class': self.classes[i % len(self.classes)],
+                'confidence': round(score, 3),
+                'x': box_w / 2 + progress * (w - box_w),
+                'y': box_h / 2 + ((i + 1) / (self.objects + 1)) * (h - box_h),
+                'width': box_w,
+                'height': box_h
+            })
+        
+        return predictions
+    
+    def predict(self, frame, confidence):
+        """Return synthetic predictions after the simulated latency"""
+        self._sleep()
+        return self._detections(next(self._calls), frame, confidence)
+    
+    def predict_batch(self, frames, confidence):
+        """One simulated inference for the whole batch"""
+        self._sleep()
+        return [self._detections(next(self._calls), frame, confidence) for frame in frames]
+
+
+def create_backend(name, config):
+    """
+    Create a detection backend by name
+    
+    Args:
+        name: Backend name (see BACKENDS)
+        config: Flask configuration mapping
+    
+    Returns:
+        DetectorBackend instance
+    """
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Unknown detector backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    return backend_class(config)
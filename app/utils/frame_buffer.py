@@ -0,0 +1,196 @@
+"""
+Preallocated frame buffers for zero-copy frame handoff between the
+capture thread and its consumers
+"""
+import sys
+import threading
+import time
+
+
+def _unreferenced_refcount():
+    """Refcount of a list item that nothing else refers to"""
+    holder = [object()]
+    return sys.getrefcount(holder[0])
+
+
+# Measured once so the check does not depend on interpreter details
+_UNREFERENCED = _unreferenced_refcount()
+
+
+class FrameHandle:
+    """
+    Immutable reference to a captured frame
+    
+    The image is a read-only view into the buffer slot it was captured
+    into, so handing a handle to several consumers never copies pixels.
+    """
+    
+    __slots__ = ('_seq', '_timestamp', '_image')
+    
+    def __init__(self, seq, timestamp, image):
+        self._seq = seq
+        self._timestamp = timestamp
+        self._image = image
+    
+    @property
+    def seq(self):
+        """Monotonic sequence number of the frame (starts at 1)"""
+        return self._seq
+    
+    @property
+    def timestamp(self):
+        """Capture time as returned by time.time()"""
+        return self._timestamp
+    
+    @property
+    def image(self):
+        """Read-only numpy view of the frame"""
+        return self._image
+    
+    @property
+    def shape(self):
+        """Shape of the frame image"""
+        return self._image.shape
+    
+    def __repr__(self):
+        return f'<FrameHandle seq={self._seq} shape={self._image.shape}>'
+
+
+class FrameBuffer:
+    """
+    Ring of preallocated frame arrays (double/triple buffering)
+    
+    The writer asks for a slot with acquire_write_slot(), decodes into it
+    (e.g. VideoCapture.read(image)) and publishes it with commit(). Readers
+    get read-only views of the most recently committed slot.
+    
+    A slot is only reused once no reader holds a view into it. If every
+    candidate slot is still referenced, the referenced array is detached
+    from the ring (readers keep their memory) and a fresh array is
+    allocated in its place, so readers never observe a torn frame.
+    """
+    
+    def __init__(self, num_slots=3):
+        """
+        Initialize frame buffer
+        
+        Args:
+            num_slots: Number of preallocated slots (minimum 2)
+        """
+        self.num_slots = max(2, int(num_slots))
+        self._slots = [None] * self.num_slots
+        self._latest = None
+        self._seq = 0
+        self._timestamp = None
+        self._read_seq = 0
+        self._lock = threading.Lock()
+        
+        # Statistics
+        self.allocations = 0
+        self.reuses = 0
+        self.detached = 0
+        self.dropped = 0
+    
+    @property
+    def seq(self):
+        """Sequence number of the latest committed frame (0 if none)"""
+        return self._seq
+    
+    def _is_referenced(self, index):
+        """Check whether a reader still holds a view into a slot"""
+        # numpy views keep a reference to the array owning the memory
+        return sys.getrefcount(self._slots[index]) > _UNREFERENCED
+    
+    def acquire_write_slot(self):
+        """
+        Pick a slot the writer may overwrite
+        
+        Returns:
+            tuple: (slot index, preallocated array or None if the slot
+            has not been allocated yet)
+        """
+        with self._lock:
+            start = 0 if self._latest is None else self._latest + 1
+            
+            for offset in range(self.num_slots):
+                index = (start + offset) % self.num_slots
+                if index == self._latest:
+                    continue
+                if self._slots[index] is None or not self._is_referenced(index):
+                    return index, self._slots[index]
+            
+            # Every candidate is pinned by a reader: detach one
+            index = start % self.num_slots
+            if index == self._latest:
+                index = (index + 1) % self.num_slots
+            self._slots[index] = None
+            self.detached += 1
+            return index, None
+    
+    def commit(self, index, frame):
+        """
+        Publish a frame written into a slot
+        
+        Args:
+            index: Slot index returned by acquire_write_slot()
+            frame: Array holding the frame; normally the slot array itself.
+                A different array (first frame, resolution change) is
+                adopted as the slot's new storage.
+        
+        Returns:
+            int: Sequence number assigned to the frame
+        """
+        with self._lock:
+            if frame is self._slots[index]:
+                self.reuses += 1
+            else:
+                self._slots[index] = frame
+                self.allocations += 1
+            
+            if self._seq > self._read_seq:
+                self.dropped += 1
+            
+            self._latest = index
+            self._seq += 1
+            self._timestamp = time.time()
+            return self._seq
+    
+    def latest(self):
+        """
+        Get a handle to the most recent frame
+        
+        Returns:
+            FrameHandle or None if no frame has been committed
+        """
+        with self._lock:
+            if self._latest is None:
+                return None
+            
+            view = self._slots[self._latest].view()
+            view.flags.writeable = False
+            self._read_seq = self._seq
+            return FrameHandle(self._seq, self._timestamp, view)
+    
+    def clear(self):
+        """Drop all slots; the sequence keeps counting up"""
+        with self._lock:
+            self._slots = [None] * self.num_slots
+            self._latest = None
+            self._timestamp = None
+    
+    def get_stats(self):
+        """
+        Get buffer statistics
+        
+        Returns:
+            dict: Allocation and reuse counters, plus frames committed
+            since the last read ('unread')
+        """
+        return {
+            'seq': self._seq,
+            'unread': self._seq - self._read_seq,
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'detached': self.detached,
+            'dropped': self.dropped
+        }
@@ -0,0 +1,230 @@
+"""
+Event counts per time bucket, computed in the database
+
+Counts are grouped by the event timestamp truncated to the minute, hour or
+day (date_trunc on Postgres, strftime on SQLite) and optionally by camera
+and object type, so a chart needs one small query instead of every event.
+
+Buckets that have ended never change (events are stamped when they are
+saved), so their counts are cached per query shape together with the time
+range they cover; a repeated request only queries the current bucket and
+any range not covered yet. Deleting events through the ORM clears the
+cache, and entries also expire after HISTOGRAM_CACHE_TTL seconds so other
+worker processes catch up with deletions.
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from app.utils.warmup import os_threading
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+
+# Buckets returned when no start is given
+DEFAULT_BUCKET_COUNTS = {'minute': 60, 'hour': 24, 'day': 30}
+
+SQLITE_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00'
+}
+
+GROUP_COLUMNS = ('camera_id', 'object_type')
+
+
+def truncate(timestamp, bucket):
+    """Start of the bucket containing a timestamp"""
+    if bucket == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if bucket == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_expression(column, bucket, dialect):
+    """
+    SQL expression truncating a timestamp column to its bucket
+    
+    Args:
+        column: DateTime column
+        bucket: 'minute', 'hour' or 'day'
+        dialect: SQLAlchemy dialect name
+    
+    Returns:
+        Expression, or None if the dialect has no supported truncation
+    """
+    if dialect == 'postgresql':
+        return func.date_trunc(bucket, column)
+    if dialect == 'sqlite':
+        return func.strftime(SQLITE_FORMATS[bucket], column)
+    return None
+
+
+class EventHistogram:
+    """Bucketed event counts with a cache of closed buckets"""
+    
+    def __init__(self, model, ttl=300.0, max_entries=64):
+        """
+        Initialize histogram
+        
+        Args:
+            model: Event model
+            ttl: Seconds a cached query shape is reused
+            max_entries: Query shapes cached at most (least recently used dropped)
+        """
+        self.model = model
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = os_threading().Lock()
+        # key -> {'created', 'covered': (start, end), 'counts': {(bucket, group...): count}}
+        self.cache = OrderedDict()
+    
+    def _count(self, session, bucket, group_by, filters, start, end):
+        """
+        Counts of [start, end) from the database
+        
+        Returns:
+            dict: (bucket start, *group values) -> count
+        """
+        model = self.model
+        groups = [getattr(model, name) for name in group_by]
+        conditions = [model.timestamp >= start, model.timestamp < end]
+        conditions += [getattr(model, name) == value for name, value in filters]
+        
+        expression = bucket_expression(model.timestamp, bucket, session.get_bind().dialect.name)
+        if expression is None:
+            # Unknown dialect: truncate in Python
+            rows = session.execute(select(model.timestamp, *groups).where(*conditions)).all()
+            counts = {}
+            for row in rows:
+                key = (truncate(row[0], bucket),) + tuple(row[1:])
+                counts[key] = counts.get(key, 0) + 1
+            return counts
+        
+        bucket_column = expression.label('bucket')
+        rows = session.execute(
+            select(bucket_column, *groups, func.count(model.id))
+            .where(*conditions)
+            .group_by(bucket_column, *groups)
+        ).all()
+        
+        counts = {}
+        for row in rows:
+            bucket_start = row[0]
+            if isinstance(bucket_start, str):
+                bucket_start = datetime.fromisoformat(bucket_start)
+            counts[(bucket_start,) + tuple(row[1:-1])] = row[-1]
+        return counts
+    
+    def _closed_counts(self, session, bucket, group_by, filters, start, end):
+        """Counts of closed buckets in [start, end), from the cache where possible"""
+        key = (bucket, group_by, filters)
+        now = time.monotonic()
+        
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and now - entry['created'] > self.ttl:
+                entry = None
+            if entry is not None:
+                self.cache.move_to_end(key)
+                covered_start, covered_end = entry['covered']
+                counts = dict(entry['counts'])
+        
+        if entry is None or start > covered_end or end < covered_start:
+            # Nothing cached that this range extends contiguously
+            counts = self._count(session, bucket, group_by, filters, start, end)
+            covered_start, covered_end = start, end
+            created = now
+        else:
+            if start < covered_start:
+                counts.update(self._count(session, bucket, group_by, filters, start, covered_start))
+                covered_start = start
+            if end > covered_end:
+                counts.update(self._count(session, bucket, group_by, filters, covered_end, end))
+                covered_end = end
+            created = entry['created']
+        
+        with self.lock:
+            self.cache[key] = {'created': created, 'covered': (covered_start, covered_end), 'counts': counts}
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        
+        return {k: v for k, v in counts.items() if start <= k[0] < end}
+    
+    def query(self, session, bucket='hour', start=None, end=None, group_by=(), filters=(), max_buckets=1000):
+        """
+        Event counts per bucket
+        
+        Args:
+            session: Database session
+            bucket: 'minute', 'hour' or 'day'
+            start: First timestamp (UTC, naive); default DEFAULT_BUCKET_COUNTS buckets before end
+            end: Timestamp in the last bucket; default now
+            group_by: Subset of GROUP_COLUMNS to split the counts by
+            filters: (column name, value) pairs of GROUP_COLUMNS to filter on
+            max_buckets: Largest number of buckets a request may span
+        
+        Returns:
+            dict: 'buckets' (ISO bucket starts) and 'series', one per group
+                with its group values and a count per bucket (zero-filled)
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        for name in tuple(group_by) + tuple(name for name, _ in filters):
+            if name not in GROUP_COLUMNS:
+                raise ValueError(f"Can only group and filter by {', '.join(GROUP_COLUMNS)}, got {name!r}")
+        
+        step = BUCKETS[bucket]
+        now = datetime.utcnow()
+        current = truncate(now, bucket)
+        last = truncate(end, bucket) if end else current
+        first = truncate(start, bucket) if start else last - step * (DEFAULT_BUCKET_COUNTS[bucket] - 1)
+        if last < first:
+            raise ValueError("end must not be before start")
+        bucket_count = int((last - first) / step) + 1
+        if bucket_count > max_buckets:
+            raise ValueError(f"{bucket_count} buckets requested, at most {max_buckets} allowed")
+        
+        group_by = tuple(group_by)
+        filters = tuple(sorted(filters))
+        range_end = last + step
+        
+        # Closed buckets from the cache; the current one (if in range) always from the database
+        closed_end = min(range_end, current)
+        counts = {}
+        if closed_end > first:
+            counts.update(self._closed_counts(session, bucket, group_by, filters, first, closed_end))
+        if range_end > current >= first:
+            counts.update(self._count(session, bucket, group_by, filters, current, range_end))
+        
+        starts = [first + step * i for i in range(bucket_count)]
+        index = {bucket_start: i for i, bucket_start in enumerate(starts)}
+        series = {}
+        for (bucket_start, *groups), count in counts.items():
+            position = index.get(bucket_start)
+            if position is None:
+                continue
+            series.setdefault(tuple(groups), [0] * bucket_count)[position] += count
+        if not group_by and not series:
+            series[()] = [0] * bucket_count
+        
+        return {
+            'bucket': bucket,
+            'buckets': [bucket_start.isoformat() for bucket_start in starts],
+            'group_by': list(group_by),
+            'series': [dict(zip(group_by, groups), counts=values, total=sum(values))
+                       for groups, values in sorted(series.items(), key=lambda item: tuple(map(str, item[0])))]
+        }
+    
+    def invalidate(self):
+        """Forget every cached count"""
+        with self.lock:
+            self.cache.clear()
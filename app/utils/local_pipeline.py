@@ -0,0 +1,254 @@
+"""
+In-process stand-in for Roboflow's InferencePipeline
+
+Reads one or more video sources with OpenCV, runs a DetectorBackend on
+each round of frames and hands the results to the same on_prediction
+callback WorkflowDetector registers with InferencePipeline. With the
+synthetic backend and a video file this exercises the whole workflow path
+without API keys or network access.
+"""
+import os
+import threading
+import time
+import logging
+import cv2
+from app.utils.detector import draw_detections
+from app.utils.detections import Detections, ClassMap
+
+logger = logging.getLogger(__name__)
+
+
+class VideoFrame:
+    """Raw frame passed to the sink, mirroring inference's VideoFrame"""
+    
+    __slots__ = ('image', 'source_id', 'frame_id', 'frame_timestamp')
+    
+    def __init__(self, image, source_id, frame_id):
+        self.image = image
+        self.source_id = source_id
+        self.frame_id = frame_id
+        self.frame_timestamp = time.time()
+
+
+class OutputImage:
+    """Annotated frame, mirroring the workflow 'output_image' field"""
+    
+    __slots__ = ('numpy_image',)
+    
+    def __init__(self, numpy_image):
+        self.numpy_image = numpy_image
+
+
+class _Source:
+    """One video reference of a pipeline with its capture and reconnect state"""
+    
+    __slots__ = ('reference', 'is_file', 'capture', 'failing_since', 'attempts', 'retry_at', 'finished')
+    
+    def __init__(self, reference):
+        self.reference = reference
+        self.is_file = isinstance(reference, str) and os.path.isfile(reference)
+        self.capture = None
+        self.failing_since = None
+        self.attempts = 0
+        self.retry_at = None
+        self.finished = False
+    
+    def open(self):
+        """Open the capture; returns whether it succeeded"""
+        self.release()
+        capture = cv2.VideoCapture(self.reference)
+        if not capture.isOpened():
+            capture.release()
+            return False
+        self.capture = capture
+        return True
+    
+    def release(self):
+        """Release the capture if open"""
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class LocalPipeline:
+    """Capture + inference loop running a DetectorBackend in a thread"""
+    
+    def __init__(self, backend, video_references, on_prediction, max_fps=30,
+                 confidence=0.5, loop_video_files=True, reconnect_delay=1.0,
+                 reconnect_max_delay=30.0, max_reconnect_attempts=0, stall_timeout=5.0,
+                 on_source_error=None):
+        """
+        Initialize pipeline
+        
+        Args:
+            backend: Loaded DetectorBackend
+            video_references: List of camera indexes, video paths or stream URLs
+            on_prediction: Sink called like InferencePipeline's on_prediction
+            max_fps: Upper bound on processed rounds per second
+            confidence: Minimum confidence passed to the backend
+            loop_video_files: Restart video files at the end instead of stopping
+            reconnect_delay: Seconds before reopening a failed live source, doubled per attempt
+            reconnect_max_delay: Upper bound of the reconnect delay
+            max_reconnect_attempts: Attempts before a live source is given up (0 = retry forever)
+            stall_timeout: Seconds without frames before a live source is reopened
+            on_source_error: Optional callable(index, message) for sources given up
+        """
+        self.backend = backend
+        self.video_references = list(video_references)
+        self.on_prediction = on_prediction
+        self.max_fps = max_fps
+        self.confidence = confidence
+        self.loop_video_files = loop_video_files
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.stall_timeout = stall_timeout
+        self.on_source_error = on_source_error
+        self._sources = []
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """
+        Open every source and start the processing thread
+        
+        Raises:
+            RuntimeError: If a source cannot be opened (nothing is started)
+        """
+        sources = [_Source(reference) for reference in self.video_references]
+        for source in sources:
+            if not source.open():
+                for opened in sources:
+                    opened.release()
+                raise RuntimeError(f"Could not open video source {source.reference}")
+        
+        self._sources = sources
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='local-pipeline', daemon=True)
+        self._thread.start()
+    
+    def terminate(self):
+        """Stop processing and wait for the thread to exit"""
+        self._stop_event.set()
+        self.join()
+    
+    def join(self):
+        """Wait for the processing thread"""
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+    
+    def _read(self, index, source):
+        """
+        Read the next frame of a source
+        
+        Video files are rewound when looping and finish otherwise. Live
+        sources that fail for longer than stall_timeout are reopened with
+        exponential backoff (like Camera._reconnect) without holding up the
+        other sources of the pipeline.
+        
+        Returns:
+            Frame or None
+        """
+        if source.finished:
+            return None
+        
+        if source.capture is None:
+            if time.monotonic() < source.retry_at:
+                return None
+            source.attempts += 1
+            if not source.open():
+                self._schedule_reconnect(index, source)
+                return None
+            logger.info(f"Local pipeline reopened video source {source.reference} "
+                        f"(attempt {source.attempts})")
+        
+        ret, frame = source.capture.read()
+        if not ret and source.is_file and self.loop_video_files:
+            source.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = source.capture.read()
+        
+        if ret:
+            source.failing_since = None
+            source.attempts = 0
+            return frame
+        
+        if source.is_file:
+            source.finished = True
+            source.release()
+            return None
+        
+        now = time.monotonic()
+        if source.failing_since is None:
+            source.failing_since = now
+        elif now - source.failing_since >= self.stall_timeout:
+            logger.warning(f"Local pipeline video source {source.reference} stalled, reconnecting")
+            source.release()
+            self._schedule_reconnect(index, source)
+        return None
+    
+    def _schedule_reconnect(self, index, source):
+        """Set the time of the next reopen attempt, or give the source up"""
+        if self.max_reconnect_attempts and source.attempts >= self.max_reconnect_attempts:
+            source.finished = True
+            message = f"Gave up on video source {source.reference} after {source.attempts} reconnect attempts"
+            logger.error(message)
+            if self.on_source_error is not None:
+                self.on_source_error(index, message)
+            return
+        
+        delay = min(self.reconnect_delay * (2 ** source.attempts), self.reconnect_max_delay)
+        source.retry_at = time.monotonic() + delay
+        source.failing_since = None
+        logger.info(f"Reopening video source {source.reference} in {delay:.1f}s "
+                    f"(attempt {source.attempts + 1})")
+    
+    def _run(self):
+        """Processing loop: read a round of frames, infer, call the sink"""
+        sources = self._sources
+        period = 1.0 / self.max_fps if self.max_fps else 0.0
+        frame_id = 0
+        classes = ClassMap()
+        batched = len(sources) > 1
+        
+        try:
+            while not self._stop_event.is_set():
+                started = time.time()
+                frame_id += 1
+                
+                frames = [self._read(i, source) for i, source in enumerate(sources)]
+                indexes = [i for i, frame in enumerate(frames) if frame is not None]
+                
+                if not indexes:
+                    # Files that ended and live sources given up do not come back
+                    if all(source.finished for source in sources):
+                        logger.info("Local pipeline has no video sources left")
+                        break
+                    self._stop_event.wait(0.1)
+                    continue
+                
+                predictions = self.backend.predict_batch([frames[i] for i in indexes], self.confidence)
+                
+                results = [None] * len(frames)
+                video_frames = [None] * len(frames)
+                for i, preds in zip(indexes, predictions):
+                    video_frames[i] = VideoFrame(frames[i], i, frame_id)
+                    results[i] = {
+                        'predictions': preds,
+                        'output_image': OutputImage(draw_detections(frames[i], Detections.from_predictions(preds, classes)))
+                    }
+                
+                if batched:
+                    self.on_prediction(results, video_frames)
+                else:
+                    self.on_prediction(results[0], video_frames[0])
+                
+                remaining = period - (time.time() - started)
+                if remaining > 0:
+                    self._stop_event.wait(remaining)
+        
+        except Exception as e:
+            logger.error(f"Local pipeline stopped: {str(e)}")
+        
+        finally:
+            for source in sources:
+                source.release()
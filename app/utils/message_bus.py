@@ -0,0 +1,206 @@
+"""
+Message bus between detection workers and web workers
+
+Publish/subscribe of bytes payloads on string channels. Subscriptions take
+channel prefixes, so a web worker follows every camera with a single
+subscription. Slow subscribers lose old messages instead of slowing the
+publisher down, which suits frames: only the latest one matters.
+
+Backends:
+    memory://           In-process stand-in (one process, for development and tests)
+    redis://host:6379   Redis pub/sub, shared by every web and detection worker
+"""
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Messages a subscriber may fall behind by before the oldest are dropped
+SUBSCRIPTION_QUEUE_SIZE = 256
+
+# Seconds to wait for a Redis subscription to be confirmed
+SUBSCRIBE_TIMEOUT = 5.0
+
+
+class Subscription:
+    """Messages received on a set of channel prefixes"""
+    
+    def get(self, timeout=None):
+        """
+        Wait for the next message
+        
+        Args:
+            timeout: Seconds to wait (None waits forever)
+        
+        Returns:
+            tuple: (channel, payload bytes), or None on timeout
+        """
+        raise NotImplementedError
+    
+    def close(self):
+        """Stop receiving messages"""
+        raise NotImplementedError
+
+
+class MessageBus:
+    """Base class of message bus backends"""
+    
+    def publish(self, channel, payload):
+        """
+        Send a message to every subscriber of the channel
+        
+        Args:
+            channel: Channel name
+            payload: Message bytes
+        """
+        raise NotImplementedError
+    
+    def subscribe(self, *prefixes):
+        """
+        Receive messages of every channel starting with one of the prefixes
+        
+        Returns:
+            Subscription
+        """
+        raise NotImplementedError
+    
+    def close(self):
+        """Release connections"""
+
+
+class _QueueSubscription(Subscription):
+    """Subscription of the in-process bus"""
+    
+    def __init__(self, bus, prefixes):
+        self.bus = bus
+        self.prefixes = tuple(prefixes)
+        self.messages = deque(maxlen=SUBSCRIPTION_QUEUE_SIZE)
+        self.condition = threading.Condition()
+    
+    def put(self, channel, payload):
+        with self.condition:
+            self.messages.append((channel, payload))
+            self.condition.notify()
+    
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.messages:
+                self.condition.wait(timeout)
+            return self.messages.popleft() if self.messages else None
+    
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class InProcessBus(MessageBus):
+    """Message bus within one process"""
+    
+    def __init__(self):
+        self.subscriptions = []
+        self.lock = threading.Lock()
+    
+    def publish(self, channel, payload):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            if channel.startswith(subscription.prefixes):
+                subscription.put(channel, payload)
+    
+    def subscribe(self, *prefixes):
+        subscription = _QueueSubscription(self, prefixes)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+    
+    def _unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+
+class _RedisSubscription(Subscription):
+    """Subscription backed by a Redis pattern subscription"""
+    
+    def __init__(self, client, prefixes):
+        self.pubsub = client.pubsub()
+        self.pubsub.psubscribe(*[f'{prefix}*' for prefix in prefixes])
+        
+        # Wait for the server to confirm, so messages published right after
+        # subscribe() returns (e.g. a reply to a request) are not missed
+        confirmed = 0
+        deadline = time.monotonic() + SUBSCRIBE_TIMEOUT
+        while confirmed < len(prefixes) and time.monotonic() < deadline:
+            message = self.pubsub.get_message(timeout=deadline - time.monotonic())
+            if message is not None and message['type'] == 'psubscribe':
+                confirmed += 1
+    
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        # get_message() also returns None for control messages, so wait out the full timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            message = self.pubsub.get_message(timeout=remaining)
+            if message is not None and message['type'] == 'pmessage':
+                channel = message['channel']
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                return channel, message['data']
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+    
+    def close(self):
+        try:
+            self.pubsub.close()
+        except Exception as e:
+            logger.warning(f"Error closing Redis subscription: {str(e)}")
+
+
+class RedisBus(MessageBus):
+    """Message bus on Redis pub/sub"""
+    
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(f"MESSAGE_BUS_URL {url} needs the redis package (pip install redis)")
+        
+        self.client = redis.Redis.from_url(url)
+    
+    def publish(self, channel, payload):
+        self.client.publish(channel, payload)
+    
+    def subscribe(self, *prefixes):
+        return _RedisSubscription(self.client, prefixes)
+    
+    def close(self):
+        self.client.close()
+
+
+# memory:// buses are shared by everything in the process, like a server would be
+_in_process_buses = {}
+_in_process_lock = threading.Lock()
+
+
+def create_bus(url):
+    """
+    Connect to the message bus at a URL
+    
+    Args:
+        url: memory://[name] or redis://...
+    
+    Returns:
+        MessageBus
+    """
+    if url.startswith('memory://'):
+        with _in_process_lock:
+            if url not in _in_process_buses:
+                _in_process_buses[url] = InProcessBus()
+            return _in_process_buses[url]
+    
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBus(url)
+    
+    raise ValueError(f"Unsupported MESSAGE_BUS_URL '{url}' (use memory:// or redis://)")
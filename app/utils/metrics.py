@@ -0,0 +1,267 @@
+"""
+Lightweight Prometheus metrics
+
+Counters, gauges and histograms with labels, rendered in the Prometheus
+text exposition format by the /metrics endpoint. Hot-path cost is one lock
+and a bucket search per observation; values that already exist elsewhere
+(frame buffer counters, camera health) are read by collectors at scrape
+time instead of being mirrored on every frame.
+"""
+import bisect
+import math
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers ~1 ms encodes up to multi-second hosted inference
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    """Escape a label value for the exposition format"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    """Render {name="value",...}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """Render a sample value"""
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class holding one value (or histogram) per label combination"""
+    
+    kind = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self._values = {}
+    
+    def _key(self, labels):
+        """Label values in declaration order"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def remove(self, **labels):
+        """Forget one label combination (e.g. a removed camera)"""
+        with self.lock:
+            self._values.pop(self._key(labels), None)
+    
+    def render(self):
+        """Exposition lines of this metric"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+    
+    kind = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        """Add to the counter"""
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    
+    kind = 'gauge'
+    
+    def set(self, value, **labels):
+        """Set the gauge"""
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = value
+    
+    def inc(self, amount=1, **labels):
+        """Increase the gauge"""
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount=1, **labels):
+        """Decrease the gauge"""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        """Record one observation"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, +Inf last, then sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def render(self):
+        """Exposition lines with cumulative buckets, sum and count"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Set of metrics and scrape-time collectors"""
+    
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self.lock = threading.Lock()
+    
+    def register(self, metric):
+        """Add a metric; returns it for assignment at module level"""
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector):
+        """
+        Add a callable run at scrape time
+        
+        The callable returns an iterable of metrics (typically Gauges or
+        Counters freshly filled from existing state) to render.
+        """
+        with self.lock:
+            self.collectors.append(collector)
+        return collector
+    
+    def render(self):
+        """Whole registry in the Prometheus text format"""
+        with self.lock:
+            metrics = list(self.metrics)
+            collectors = list(self.collectors)
+        
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        
+        for collector in collectors:
+            try:
+                for metric in collector():
+                    lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {str(e)}")
+        
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'surveillance_stage_seconds',
+    'Time spent in each pipeline stage',
+    ['stage', 'camera']
+))
+
+FRAMES_PROCESSED = REGISTRY.register(Counter(
+    'surveillance_frames_processed_total',
+    'Frames that went through detection',
+    ['pipeline', 'camera']
+))
+
+STREAM_CLIENTS = REGISTRY.register(Gauge(
+    'surveillance_stream_clients',
+    'Open MJPEG stream connections',
+    ['feed', 'camera']
+))
+
+EVENTS_SAVED = REGISTRY.register(Counter(
+    'surveillance_events_saved_total',
+    'Detection events written to the database',
+    ['camera']
+))
+
+DETECTIONS_UNCONFIRMED = REGISTRY.register(Counter(
+    'surveillance_detections_unconfirmed_total',
+    'Detections dropped before persistence because their class was not confirmed over enough frames',
+    ['camera']
+))
+
+USER_CACHE_REQUESTS = REGISTRY.register(Counter(
+    'surveillance_user_cache_requests_total',
+    'Logged-in user lookups served from the user cache (hit) or the database (miss)',
+    ['result']
+))
+
+
+def observe_stage(stage, camera_id, seconds):
+    """Record the duration of a pipeline stage"""
+    STAGE_SECONDS.observe(seconds, stage=stage, camera=camera_id)
+
+
+def time_stage(stage, camera_id):
+    """Context manager timing a pipeline stage"""
+    return STAGE_SECONDS.time(stage=stage, camera=camera_id)
+
+
+def track_stream(generator, feed, camera_id):
+    """
+    Wrap a streaming generator so it is counted in STREAM_CLIENTS
+    
+    Args:
+        generator: Response body generator
+        feed: Feed name ('standard' or 'workflow')
+        camera_id: Camera being streamed
+    """
+    STREAM_CLIENTS.inc(feed=feed, camera=camera_id)
+    try:
+        yield from generator
+    finally:
+        STREAM_CLIENTS.dec(feed=feed, camera=camera_id)
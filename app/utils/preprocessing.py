@@ -0,0 +1,193 @@
+"""
+Per-camera frame preprocessing ahead of inference and streaming
+
+Frames arrive at whatever resolution the camera delivers. The
+preprocessor crops configured regions of interest (e.g. desks), downscales
+each region to the model input size, and maps the resulting bounding boxes
+back to full-frame coordinates.
+"""
+import json
+import logging
+from app.utils.video_utils import resize_frame
+from app.utils.detections import Detections
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rois(value):
+    """
+    Parse the CAMERA_ROIS setting
+    
+    Args:
+        value: JSON string or dict mapping camera ID to a list of
+            [x, y, width, height] regions. Values <= 1 are treated as
+            fractions of the frame size.
+    
+    Returns:
+        dict: Camera ID to list of regions
+    """
+    if not value:
+        return {}
+    
+    if isinstance(value, dict):
+        return value
+    
+    try:
+        rois = json.loads(value)
+    except ValueError as e:
+        logger.error(f"Invalid CAMERA_ROIS setting: {str(e)}")
+        return {}
+    
+    if not isinstance(rois, dict):
+        logger.error("CAMERA_ROIS must map camera IDs to lists of [x, y, width, height]")
+        return {}
+    
+    return rois
+
+
+def scale_detections(detections, scale):
+    """
+    Scale detection boxes, e.g. from full-frame to display coordinates
+    
+    Args:
+        detections: Detections
+        scale: Multiplier applied to every box coordinate
+    
+    Returns:
+        Scaled Detections
+    """
+    return detections.scaled(scale)
+
+
+class FramePreprocessor:
+    """Downscale and ROI-crop frames for one camera"""
+    
+    def __init__(self, input_size=640, rois=None, stream_width=None, stream_height=None):
+        """
+        Initialize preprocessor
+        
+        Args:
+            input_size: Longest side of the image sent to the model
+                (0 disables downscaling)
+            rois: List of [x, y, width, height] regions; None for full frame
+            stream_width: Maximum width of streamed frames
+            stream_height: Maximum height of streamed frames
+        """
+        self.input_size = input_size
+        self.rois = rois or []
+        self.stream_width = stream_width
+        self.stream_height = stream_height
+    
+    def _regions(self, frame):
+        """Resolve configured regions to pixel boxes clipped to the frame"""
+        h, w = frame.shape[:2]
+        
+        if not self.rois:
+            return [(0, 0, w, h)]
+        
+        regions = []
+        for roi in self.rois:
+            x, y, rw, rh = roi
+            if max(x, y, rw, rh) <= 1:
+                x, y, rw, rh = x * w, y * h, rw * w, rh * h
+            
+            x0 = max(0, int(x))
+            y0 = max(0, int(y))
+            x1 = min(w, int(x + rw))
+            y1 = min(h, int(y + rh))
+            if x1 > x0 and y1 > y0:
+                regions.append((x0, y0, x1 - x0, y1 - y0))
+        
+        return regions
+    
+    def prepare(self, frame):
+        """
+        Crop and downscale a frame for inference
+        
+        Crops are numpy views, so only the downscaled tiles allocate.
+        
+        Args:
+            frame: Full-resolution frame
+        
+        Returns:
+            list: (tile, (offset_x, offset_y, scale)) per region, where
+            full-frame coordinate = tile coordinate / scale + offset
+        """
+        tiles = []
+        
+        for x, y, w, h in self._regions(frame):
+            crop = frame[y:y + h, x:x + w]
+            scale = 1.0
+            
+            if self.input_size and max(w, h) > self.input_size:
+                if w >= h:
+                    crop = resize_frame(crop, width=self.input_size)
+                else:
+                    crop = resize_frame(crop, height=self.input_size)
+                scale = crop.shape[1] / w
+            
+            tiles.append((crop, (x, y, scale)))
+        
+        return tiles
+    
+    def map_detections(self, detections, transform):
+        """
+        Map detections from tile to full-frame coordinates
+        
+        Args:
+            detections: Detections in tile coordinates
+            transform: (offset_x, offset_y, scale) returned by prepare()
+        
+        Returns:
+            Detections in full-frame coordinates
+        """
+        offset_x, offset_y, scale = transform
+        return detections.map(offset_x, offset_y, scale)
+    
+    def detect(self, detector, frame):
+        """
+        Run a detector over the preprocessed tiles of a frame
+        
+        Several regions are sent as one batch when the detector supports it.
+        
+        Args:
+            detector: Object with a detect_objects(frame) method
+            frame: Full-resolution frame
+        
+        Returns:
+            Detections in full-frame coordinates
+        """
+        tiles = self.prepare(frame)
+        
+        if len(tiles) > 1 and hasattr(detector, 'detect_batch'):
+            results = detector.detect_batch([tile for tile, _ in tiles])
+        else:
+            results = [detector.detect_objects(tile) for tile, _ in tiles]
+        
+        return Detections.concatenate([self.map_detections(tile_detections, transform)
+                                       for tile_detections, (_, transform) in zip(results, tiles)],
+                                      getattr(detector, 'classes', None))
+    
+    def stream_frame(self, frame):
+        """
+        Downscale a frame for streaming
+        
+        Args:
+            frame: Full-resolution frame
+        
+        Returns:
+            tuple: (display frame, scale from full-frame to display)
+        """
+        h, w = frame.shape[:2]
+        scale = 1.0
+        
+        if self.stream_width and w > self.stream_width:
+            scale = self.stream_width / w
+        if self.stream_height and h * scale > self.stream_height:
+            scale = self.stream_height / h
+        
+        if scale == 1.0:
+            return frame, scale
+        
+        display = resize_frame(frame, width=max(1, int(w * scale)), height=max(1, int(h * scale)))
+        return display, scale
@@ -0,0 +1,206 @@
+"""
+Sampling profiler for the live pipeline
+
+Samples the stacks of every thread (and, under eventlet, every suspended
+greenlet) at a fixed interval and aggregates them into the collapsed-stack
+format read by flamegraph.pl, speedscope and similar tools:
+
+    thread;outer_function (file.py);inner_function (file.py) 42
+
+The sampler runs on a real OS thread, so it keeps sampling while a green
+thread hogs the hub, and it only reads frames; nothing is installed into
+the profiled threads.
+"""
+import gc
+import os
+import sys
+import threading
+import weakref
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import greenlet
+    from eventlet import patcher
+except ImportError:
+    greenlet = None
+    patcher = None
+
+# How often suspended greenlets are rediscovered (a full gc scan), in samples
+GREENLET_REFRESH_SAMPLES = 100
+
+
+def _original(module_name):
+    """Unpatched stdlib module when eventlet has monkey patched it"""
+    if patcher is not None:
+        return patcher.original(module_name)
+    return __import__(module_name)
+
+
+def _frame_label(frame, include_lines):
+    """Name of one stack frame"""
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    filename = os.path.basename(code.co_filename)
+    if include_lines:
+        return f'{name} ({filename}:{frame.f_lineno})'
+    return f'{name} ({filename})'
+
+
+def _collapse(frame, include_lines):
+    """Root-first, semicolon separated stack of a frame"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame, include_lines).replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Collects collapsed stacks of all threads for a fixed duration"""
+    
+    def __init__(self, seconds=10.0, interval=0.01, thread_filter=None, include_lines=False,
+                 include_greenlets=True):
+        """
+        Initialize profiler
+        
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            thread_filter: Only keep threads/greenlets whose name contains this text
+            include_lines: Add line numbers to frames (finer, but less aggregated)
+            include_greenlets: Also sample suspended eventlet greenlets
+        """
+        self.seconds = seconds
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.include_lines = include_lines
+        self.include_greenlets = include_greenlets and greenlet is not None
+        self.stacks = Counter()
+        self.samples = 0
+        self.error = None
+        self._time = _original('time')
+        self._thread = None
+        self._done = _original('threading').Event()
+        self._greenlets = []
+    
+    @property
+    def done(self):
+        """Whether sampling has finished"""
+        return self._done.is_set()
+    
+    def start(self):
+        """Start sampling on a real OS thread"""
+        os_threading = _original('threading')
+        self._thread = os_threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+    
+    def _thread_names(self):
+        """OS thread ident to thread name"""
+        names = {}
+        for module in {threading, _original('threading')}:
+            for thread in module.enumerate():
+                if thread.ident is not None:
+                    names[thread.ident] = thread.name
+        return names
+    
+    def _refresh_greenlets(self):
+        """Rediscover greenlets (expensive, so done only now and then)"""
+        self._greenlets = [
+            weakref.ref(obj) for obj in gc.get_objects()
+            if isinstance(obj, greenlet.greenlet)
+        ]
+    
+    def _keep(self, name):
+        """Apply the thread filter"""
+        return not self.thread_filter or self.thread_filter in name
+    
+    def _sample(self, own_ident, names):
+        """Take one sample of every thread and greenlet"""
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            name = names.get(ident, f'thread-{ident}')
+            if self._keep(name):
+                self.stacks[f'{name};{_collapse(frame, self.include_lines)}'] += 1
+        
+        if not self.include_greenlets:
+            return
+        
+        if self.samples % GREENLET_REFRESH_SAMPLES == 0:
+            self._refresh_greenlets()
+        
+        for ref in self._greenlets:
+            glet = ref()
+            # Running greenlets have no gr_frame; they show up as their OS thread above
+            frame = getattr(glet, 'gr_frame', None) if glet is not None else None
+            if frame is None:
+                continue
+            # Green threading.Thread objects are keyed by id(greenlet) under monkey patching
+            name = names.get(id(glet))
+            if name is None:
+                run = getattr(glet, '_run', None) or getattr(glet, 'run', None)
+                name = f"greenlet {getattr(run, '__qualname__', type(glet).__name__)}"
+            if self._keep(name):
+                self.stacks[f'{name};{_collapse(frame, self.include_lines)}'] += 1
+    
+    def _run(self):
+        """Sampling loop"""
+        own_ident = _original('threading').get_ident()
+        deadline = self._time.monotonic() + self.seconds
+        
+        try:
+            while self._time.monotonic() < deadline:
+                self._sample(own_ident, self._thread_names())
+                self.samples += 1
+                self._time.sleep(self.interval)
+        except Exception as e:
+            logger.error(f"Sampling profiler failed: {str(e)}")
+            self.error = str(e)
+        finally:
+            self._greenlets = []
+            self._done.set()
+    
+    def collapsed(self):
+        """
+        Aggregated stacks in collapsed format
+        
+        Returns:
+            str: One 'stack count' line per distinct stack, hottest first
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+_profile_lock = threading.Lock()
+
+
+def run_profiler(seconds, interval=0.01, sleep=None, **options):
+    """
+    Profile the running process for a number of seconds
+    
+    Only one profile runs at a time. The caller waits with `sleep` (pass
+    the green time.sleep under eventlet so the hub keeps serving requests).
+    
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        sleep: Function used to wait for the sampler
+        **options: Passed to SamplingProfiler
+    
+    Returns:
+        SamplingProfiler with results, or None if a profile is already running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    
+    try:
+        profiler = SamplingProfiler(seconds, interval, **options)
+        wait = sleep or profiler._time.sleep
+        profiler.start()
+        while not profiler.done:
+            wait(0.05)
+        return profiler
+    finally:
+        _profile_lock.release()
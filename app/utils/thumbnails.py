@@ -0,0 +1,160 @@
+"""
+On-demand evidence thumbnails with a size-capped disk cache
+
+Thumbnails are generated at a few fixed widths the first time they are
+requested and kept in THUMBNAIL_CACHE_FOLDER, named after the source image
+and its modification time, so a replaced evidence image gets new
+thumbnails. Serving a cached thumbnail bumps its mtime; once the folder
+grows past THUMBNAIL_CACHE_MAX_BYTES the least recently used files are
+removed. The thumbnail saved next to each evidence image
+(SAVE_EVIDENCE_THUMBNAILS) is reused for its own width.
+"""
+import os
+import cv2
+import logging
+from app.utils.video_utils import encode_frame_profile, get_thumbnail_path
+from app.utils.warmup import os_threading
+
+logger = logging.getLogger(__name__)
+
+# Decoding at 1/2 scale (JPEG DCT scaling) is much cheaper than a full decode plus resize
+REDUCED_DECODE_MAX_WIDTH = 480
+
+
+class ThumbnailCache:
+    """Fixed-width thumbnails of evidence images in one folder"""
+    
+    def __init__(self, folder, max_bytes, quality=70, saved_width=None):
+        """
+        Initialize cache
+        
+        Args:
+            folder: Cache folder (created if missing)
+            max_bytes: Size cap of the folder; 0 disables eviction
+            quality: JPEG quality of generated thumbnails
+            saved_width: Width of the thumbnails saved next to evidence images, if any
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.saved_width = saved_width
+        self.lock = os_threading().Lock()
+        self.total_bytes = None
+        os.makedirs(folder, exist_ok=True)
+    
+    def _cache_path(self, image_path, width):
+        """Cache file of one source image (at its current mtime) and width"""
+        root = os.path.splitext(os.path.basename(image_path))[0]
+        return os.path.join(self.folder, f'{root}_{width}w_{os.stat(image_path).st_mtime_ns}.jpg')
+    
+    def get(self, image_path, width):
+        """
+        Path of a thumbnail, generating it on first use
+        
+        Args:
+            image_path: Evidence image (already checked to be servable)
+            width: Thumbnail width in pixels
+        
+        Returns:
+            Thumbnail path, or None if the image cannot be decoded
+        """
+        if width == self.saved_width:
+            saved = get_thumbnail_path(image_path)
+            if os.path.exists(saved):
+                return saved
+        
+        path = self._cache_path(image_path, width)
+        try:
+            # Touch on hit: mtime order is the LRU order
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        
+        data = self._render(image_path, width)
+        if data is None:
+            return None
+        
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._account(len(data), path)
+        return path
+    
+    def _render(self, image_path, width):
+        """JPEG bytes of the image scaled down to `width` (never up)"""
+        frame = None
+        if width <= REDUCED_DECODE_MAX_WIDTH:
+            frame = cv2.imread(image_path, cv2.IMREAD_REDUCED_COLOR_2)
+            if frame is not None and frame.shape[1] < width:
+                # Source narrower than twice the width: decode at full size
+                frame = None
+        if frame is None:
+            frame = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if frame is None:
+            logger.warning(f"Could not decode {image_path} for a thumbnail")
+            return None
+        
+        target = width if frame.shape[1] > width else None
+        return encode_frame_profile(frame, {'width': target, 'quality': self.quality})
+    
+    def _account(self, added_bytes, added_path):
+        """Add a new file to the running size and evict past the cap"""
+        if not self.max_bytes:
+            return
+        
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(self.folder)
+                                       if entry.is_file())
+            else:
+                self.total_bytes += added_bytes
+            if self.total_bytes > self.max_bytes:
+                self._evict(keep=added_path)
+    
+    def _evict(self, keep=None):
+        """Remove least recently used thumbnails (except `keep`) down to 90% of the cap"""
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not evict thumbnail {path}: {str(e)}")
+        
+        self.total_bytes = total
+        logger.info(f"Evicted {removed} thumbnails, cache now {total / 1024 / 1024:.1f} MB")
+
+
+def create_thumbnail_cache(config):
+    """
+    Create a cache from the THUMBNAIL_* settings
+    
+    Args:
+        config: App config
+    
+    Returns:
+        ThumbnailCache
+    """
+    profile = config['ENCODE_PROFILES']['thumbnail']
+    return ThumbnailCache(
+        config['THUMBNAIL_CACHE_FOLDER'],
+        config['THUMBNAIL_CACHE_MAX_BYTES'],
+        quality=profile['quality'],
+        saved_width=profile['width'] if config['SAVE_EVIDENCE_THUMBNAILS'] else None
+    )
@@ -0,0 +1,219 @@
+"""
+Multi-object tracking between detection and event persistence
+
+Detections of consecutive processed frames are associated by box overlap
+(IoU, greedy highest-overlap-first, same class only), so an object that
+stays in view keeps one track ID. Events are then saved once per track
+instead of once per detection per frame: when the track starts, and
+updated with the last-seen time and the best-confidence detection when it
+ends.
+"""
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise intersection over union of two sets of boxes
+    
+    Args:
+        boxes_a: Array of shape (N, 4), [x1, y1, x2, y2] per row
+        boxes_b: Array of shape (M, 4), [x1, y1, x2, y2] per row
+    
+    Returns:
+        Array of shape (N, M)
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    
+    inter_w = np.clip(np.minimum(a[:, 2][:, None], b[:, 2][None, :]) - np.maximum(a[:, 0][:, None], b[:, 0][None, :]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, 3][:, None], b[:, 3][None, :]) - np.maximum(a[:, 1][:, None], b[:, 1][None, :]), 0, None)
+    intersection = inter_w * inter_h
+    
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+class Track:
+    """One object followed across frames"""
+    
+    def __init__(self, track_id, detections, index, timestamp):
+        """
+        Start a track
+        
+        Args:
+            track_id: Identifier, unique per tracker
+            detections: Detections of the frame
+            index: Index of the detection that started the track
+            timestamp: Time of the frame (datetime)
+        """
+        detection = detections.to_dict(index)
+        self.track_id = track_id
+        self.object_type = detection['class']
+        self.bbox = detections.xyxy[index]
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        
+        # Highest-confidence detection so far
+        self.best = detection
+        self.improved = True
+        
+        # Set by the caller: the event saved for this track and what it holds
+        self.event_id = None
+        self.best_image = None
+        self.saved_confidence = None
+    
+    @property
+    def confidence(self):
+        """Best confidence seen during the track"""
+        return self.best['confidence']
+    
+    def update(self, detections, index, timestamp):
+        """Record a matched detection"""
+        self.bbox = detections.xyxy[index]
+        self.last_seen = timestamp
+        self.hits += 1
+        self.improved = detections.confidence[index] > self.best['confidence']
+        if self.improved:
+            self.best = detections.to_dict(index)
+    
+    def __repr__(self):
+        return f'<Track {self.track_id}: {self.object_type} {self.confidence:.2f}>'
+
+
+class IoUTracker:
+    """Associate detections of consecutive frames of one camera into tracks"""
+    
+    def __init__(self, iou_threshold=0.3, max_age=2.0):
+        """
+        Initialize tracker
+        
+        Args:
+            iou_threshold: Minimum overlap for a detection to continue a track
+            max_age: Seconds a track survives without matching detections
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.tracks = []
+        self.next_id = 1
+        self.last_seq = None
+        # Streams feeding this tracker; the last one to leave ends the open tracks
+        self.streams = 0
+    
+    def update(self, detections, timestamp, seq=None):
+        """
+        Advance the tracker by one processed frame
+        
+        Args:
+            detections: Detections of the frame
+            timestamp: Time of the frame (datetime)
+            seq: Frame sequence number; a frame already seen (e.g. by a
+                second stream of the same camera) is ignored
+        
+        Returns:
+            tuple: (started, matched, ended) lists of Track, or None if the
+                frame was already processed. Matched tracks have
+                `improved` set when their best confidence went up.
+        """
+        if seq is not None:
+            if seq == self.last_seq:
+                return None
+            self.last_seq = seq
+        
+        matched_tracks, matched_detections = self._associate(detections)
+        
+        matched = []
+        for track_index, detection_index in zip(matched_tracks, matched_detections):
+            track = self.tracks[track_index]
+            track.update(detections, detection_index, timestamp)
+            matched.append(track)
+        
+        # Tracks not seen for max_age seconds have left the scene
+        ended = []
+        kept = []
+        matched_set = set(matched_tracks)
+        for index, track in enumerate(self.tracks):
+            if index not in matched_set:
+                if (timestamp - track.last_seen).total_seconds() > self.max_age:
+                    ended.append(track)
+                    continue
+            kept.append(track)
+        
+        # Unmatched detections start new tracks
+        started = []
+        detection_set = set(matched_detections)
+        for index in range(len(detections)):
+            if index not in detection_set:
+                track = Track(self.next_id, detections, index, timestamp)
+                self.next_id += 1
+                started.append(track)
+        
+        self.tracks = kept + started
+        return started, matched, ended
+    
+    def _associate(self, detections):
+        """
+        Greedily pair tracks and detections by descending IoU
+        
+        Returns:
+            tuple: (track indices, detection indices) of the matched pairs
+        """
+        if not self.tracks or not len(detections):
+            return [], []
+        
+        ious = iou_matrix(np.array([track.bbox for track in self.tracks]), detections.xyxy)
+        
+        # Only boxes of the same class continue a track
+        track_classes = np.array([track.object_type for track in self.tracks], dtype=object)
+        detection_classes = detections.class_names
+        ious[track_classes[:, None] != detection_classes[None, :]] = 0.0
+        
+        # Only pairs above the threshold can match; visit them by descending IoU
+        candidate_tracks, candidate_detections = np.nonzero(ious >= self.iou_threshold)
+        order = np.argsort(-ious[candidate_tracks, candidate_detections], kind='stable')
+        
+        track_indices, detection_indices = [], []
+        used_tracks, used_detections = set(), set()
+        pairs = zip(candidate_tracks[order].tolist(), candidate_detections[order].tolist())
+        for track_index, detection_index in pairs:
+            if track_index in used_tracks or detection_index in used_detections:
+                continue
+            used_tracks.add(track_index)
+            used_detections.add(detection_index)
+            track_indices.append(track_index)
+            detection_indices.append(detection_index)
+        
+        return track_indices, detection_indices
+    
+    def attach(self):
+        """Register a stream feeding this tracker"""
+        self.streams += 1
+    
+    def detach(self):
+        """
+        Unregister a stream
+        
+        Returns:
+            list: Tracks ended because no stream is left (empty otherwise)
+        """
+        self.streams = max(0, self.streams - 1)
+        if self.streams:
+            return []
+        return self.flush()
+    
+    def flush(self):
+        """
+        End every open track
+        
+        Returns:
+            list: The tracks that were open
+        """
+        ended = self.tracks
+        self.tracks = []
+        self.last_seq = None
+        return ended
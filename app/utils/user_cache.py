@@ -0,0 +1,84 @@
+"""
+Short-lived cache of users for the Flask-Login loader
+
+Every authenticated request (dashboard status and prediction polls, feed
+requests) loads the logged-in user. The cache keeps a detached copy of each
+user row for USER_CACHE_TTL seconds, and a hit is merged into the request's
+session without a query (Session.merge with load=False). Entries are
+dropped as soon as the user is updated or deleted through the ORM in this
+process; other worker processes pick the change up when their copy
+expires, so the TTL bounds how long they can serve a stale user (e.g. one
+just deactivated or made admin).
+"""
+import time
+
+from app.utils.metrics import USER_CACHE_REQUESTS
+
+
+class UserCache:
+    """Detached user copies by ID, each with an expiry time"""
+    
+    def __init__(self, max_size=1024):
+        """
+        Initialize cache
+        
+        Args:
+            max_size: Entries kept at most; expired ones are pruned first
+        """
+        self.max_size = max_size
+        self.entries = {}
+    
+    def get(self, user_id):
+        """
+        Cached copy of a user
+        
+        Args:
+            user_id: User ID
+        
+        Returns:
+            Detached User, or None on a miss or an expired entry
+        """
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            USER_CACHE_REQUESTS.inc(result='hit')
+            return entry[1]
+        
+        if entry is not None:
+            self.entries.pop(user_id, None)
+        USER_CACHE_REQUESTS.inc(result='miss')
+        return None
+    
+    def put(self, user_id, user, ttl):
+        """
+        Cache a detached copy of a user
+        
+        Args:
+            user_id: User ID
+            user: Detached User (see snapshot_user)
+            ttl: Seconds the copy may be served
+        """
+        if len(self.entries) >= self.max_size and user_id not in self.entries:
+            now = time.monotonic()
+            self.entries = {key: entry for key, entry in self.entries.items() if entry[0] > now}
+            if len(self.entries) >= self.max_size:
+                # Still full of live entries: drop the one expiring first
+                self.entries.pop(min(self.entries, key=lambda key: self.entries[key][0]), None)
+        self.entries[user_id] = (time.monotonic() + ttl, user)
+    
+    def invalidate(self, user_id=None):
+        """
+        Drop one user, or every user if `user_id` is None
+        
+        Args:
+            user_id: User ID
+        """
+        if user_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(user_id, None)
+    
+    def __len__(self):
+        return len(self.entries)
+
+
+user_cache = UserCache()
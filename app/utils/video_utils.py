@@ -3,9 +3,13 @@ Video processing utilities
 """
 import os
 import cv2
+import numpy as np
+import threading
+import time
 import logging
 from datetime import datetime
 from flask import current_app
+from app.utils.metrics import observe_stage
 
 logger = logging.getLogger(__name__)
 
@@ -75,8 +79,16 @@ def save_frame_image(frame, camera_id, event_id):
         filename = f"event_{event_id}_{camera_id}_{timestamp}.jpg"
         filepath = os.path.join(current_app.config['DETECTED_EVENTS_FOLDER'], filename)
         
-        # Save image
-        cv2.imwrite(filepath, frame)
+        # Save image at evidence quality
+        profiles = current_app.config['ENCODE_PROFILES']
+        cv2.imwrite(filepath, frame, [int(cv2.IMWRITE_JPEG_QUALITY), profiles['evidence']['quality']])
+        
+        # Small preview for review grids
+        if current_app.config['SAVE_EVIDENCE_THUMBNAILS']:
+            thumbnail = encode_frame_profile(frame, profiles['thumbnail'])
+            if thumbnail:
+                with open(get_thumbnail_path(filepath), 'wb') as f:
+                    f.write(thumbnail)
         
         logger.info(f"Frame image saved: {filepath}")
         return filepath
@@ -147,6 +159,131 @@ def encode_frame_to_jpeg(frame, quality=85):
         return None
 
 
+def remove_frame_image(image_path):
+    """
+    Delete an evidence image and its thumbnail
+    
+    Args:
+        image_path: Path of the full-size image
+    """
+    for path in (image_path, get_thumbnail_path(image_path)):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {str(e)}")
+
+
+def get_thumbnail_path(image_path):
+    """
+    Get the path of the thumbnail saved next to an evidence image
+    
+    Args:
+        image_path: Path of the full-size image
+        
+    Returns:
+        Thumbnail path
+    """
+    root, ext = os.path.splitext(image_path)
+    return f"{root}_thumb{ext or '.jpg'}"
+
+
+def encode_frame_profile(frame, profile):
+    """
+    Encode frame according to an encode profile
+    
+    Args:
+        frame: OpenCV frame
+        profile: Dictionary with 'quality' and optional max 'width'
+        
+    Returns:
+        JPEG encoded bytes
+    """
+    if frame is None:
+        return None
+    
+    width = profile.get('width')
+    if width and frame.shape[1] > width:
+        frame = resize_frame(frame, width=width)
+    
+    return encode_frame_to_jpeg(frame, profile['quality'])
+
+
+def render_status_frame(text, profile, color=(255, 255, 255)):
+    """
+    Encode a blank frame with a status message, for feeds with nothing to show yet
+    
+    Args:
+        text: Message drawn in the middle of the frame
+        profile: Encode profile
+        color: BGR text color
+        
+    Returns:
+        JPEG encoded bytes
+    """
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    (text_width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+    cv2.putText(frame, text, (max(0, (640 - text_width) // 2), 240),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+    return encode_frame_profile(frame, profile)
+
+
+class EncodedFrameCache:
+    """
+    Encode each frame once per profile and share the bytes between viewers
+    
+    Only the encodings of the most recent frame are kept.
+    """
+    
+    def __init__(self, profiles, camera_id=None):
+        """
+        Initialize cache
+        
+        Args:
+            profiles: Mapping of profile name to encode profile
+            camera_id: Camera label for encode timing metrics
+        """
+        self.profiles = profiles
+        self.camera_id = camera_id
+        self.lock = threading.Lock()
+        self.frame_key = None
+        self.encoded = {}
+        self.hits = 0
+        self.encodes = 0
+    
+    def get(self, frame_key, frame, profile_name='stream'):
+        """
+        Get the encoded bytes of a frame for a profile
+        
+        Args:
+            frame_key: Identifier of the frame (e.g. sequence number)
+            frame: OpenCV frame, encoded only on a cache miss
+            profile_name: Name of the encode profile
+            
+        Returns:
+            JPEG encoded bytes or None
+        """
+        profile = self.profiles.get(profile_name) or self.profiles['stream']
+        
+        with self.lock:
+            if frame_key != self.frame_key:
+                self.frame_key = frame_key
+                self.encoded = {}
+            
+            data = self.encoded.get(profile_name)
+            if data is None:
+                started = time.perf_counter()
+                data = encode_frame_profile(frame, profile)
+                if self.camera_id is not None:
+                    observe_stage('encode', self.camera_id, time.perf_counter() - started)
+                self.encoded[profile_name] = data
+                self.encodes += 1
+            else:
+                self.hits += 1
+            
+            return data
+
+
 def cleanup_old_files(directory, days=30):
     """
     Clean up old files from directory
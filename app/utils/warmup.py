@@ -0,0 +1,181 @@
+"""
+Model prewarm and readiness
+
+Components (the standard detector, the workflow backend) are initialized
+once on a background OS thread, either at startup (PREWARM_MODELS) or on
+first use. Feeds ask whether a component is ready instead of blocking a
+request on model download or initialization, and /readyz reports the same
+state to load balancers and orchestrators. A failed component is retried
+with exponential backoff the next time it is asked for, so a transient
+download or network error at boot does not need a process restart.
+"""
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from eventlet import patcher
+except ImportError:
+    patcher = None
+
+PENDING = 'pending'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+# Delay before retrying a failed component, doubled per failure up to the maximum
+RETRY_BACKOFF_SECONDS = 5.0
+RETRY_BACKOFF_MAX_SECONDS = 300.0
+
+
+def os_threading():
+    """Unpatched threading module, so blocking model loads do not stall the eventlet hub"""
+    if patcher is not None:
+        return patcher.original('threading')
+    return threading
+
+
+class Component:
+    """One component initialized in the background"""
+    
+    def __init__(self, name, initializer):
+        """
+        Initialize component
+        
+        Args:
+            name: Component name shown by /readyz
+            initializer: Callable run inside an app context; returns True when ready
+        """
+        self.name = name
+        self.initializer = initializer
+        self.state = PENDING
+        self.error = None
+        self.seconds = None
+        self.failures = 0
+        self.retry_at = None
+    
+    def startable(self):
+        """Whether the component has not been started yet, or failed and is due for a retry"""
+        if self.state == PENDING:
+            return True
+        return self.state == FAILED and time.monotonic() >= self.retry_at
+    
+    def to_dict(self):
+        """Readiness details of this component"""
+        retry_in = None
+        if self.state == FAILED:
+            retry_in = round(max(self.retry_at - time.monotonic(), 0.0), 1)
+        return {
+            'state': self.state,
+            'error': self.error,
+            'seconds': round(self.seconds, 3) if self.seconds is not None else None,
+            'failures': self.failures,
+            'retry_in': retry_in
+        }
+
+
+class Warmup:
+    """Registry of components that need initializing before they serve traffic"""
+    
+    def __init__(self):
+        self.components = {}
+        # A real lock, shared with the OS threads that run initializers
+        self.lock = os_threading().Lock()
+    
+    def register(self, name, initializer):
+        """
+        Add a component
+        
+        Args:
+            name: Component name
+            initializer: Callable run inside an app context; returns True when ready
+        """
+        with self.lock:
+            self.components[name] = Component(name, initializer)
+    
+    def start(self, app, names=None):
+        """
+        Initialize components in the background
+        
+        Components that are warming up or ready are skipped; failed ones are
+        started again once their retry backoff has passed.
+        
+        Args:
+            app: Flask app whose context the initializers run in
+            names: Components to start (default: all registered)
+        """
+        for name in names if names is not None else list(self.components):
+            with self.lock:
+                component = self.components.get(name)
+                if component is None:
+                    logger.warning(f"Unknown warmup component '{name}'")
+                    continue
+                if not component.startable():
+                    continue
+                component.state = WARMING
+            
+            thread = os_threading().Thread(target=self._run, args=(app, component),
+                                           name=f'warmup-{name}', daemon=True)
+            thread.start()
+    
+    def _run(self, app, component):
+        """Run one initializer and record the outcome"""
+        logger.info(f"Warming up {component.name}")
+        start = time.time()
+        
+        try:
+            with app.app_context():
+                ready = component.initializer()
+            error = None if ready else 'initialization failed'
+        except Exception as e:
+            ready = False
+            error = str(e)
+        
+        with self.lock:
+            component.seconds = time.time() - start
+            component.error = error
+            if ready:
+                component.failures = 0
+                component.retry_at = None
+            else:
+                component.failures += 1
+                delay = min(RETRY_BACKOFF_SECONDS * 2 ** (component.failures - 1), RETRY_BACKOFF_MAX_SECONDS)
+                component.retry_at = time.monotonic() + delay
+            component.state = READY if ready else FAILED
+        
+        if ready:
+            logger.info(f"{component.name} ready in {component.seconds:.2f}s")
+        else:
+            logger.error(f"Warm-up of {component.name} failed ({component.failures}x): {error}; "
+                         f"retrying in {delay:.0f}s")
+    
+    def state(self, name):
+        """Current state of a component"""
+        component = self.components.get(name)
+        return component.state if component else None
+    
+    def ensure(self, app, name):
+        """
+        Start a component if needed (or retry it after a failure), without waiting for it
+        
+        Args:
+            app: Flask app whose context the initializer runs in
+            name: Component name
+        
+        Returns:
+            bool: Whether the component is ready
+        """
+        if self.state(name) in (PENDING, FAILED):
+            self.start(app, [name])
+        return self.state(name) == READY
+    
+    def status(self):
+        """Readiness details of all components"""
+        with self.lock:
+            components = list(self.components.values())
+        return {component.name: component.to_dict() for component in components}
+
+
+warmup = Warmup()
@@ -1,248 +1,536 @@
 """
 Roboflow Workflow-based Object Detection using InferencePipeline
 This uses the InferencePipeline approach for real-time video processing
+
+Setting WORKFLOW_BACKEND to another registered detector backend (e.g.
+'synthetic' or 'onnx') runs a LocalPipeline instead, which needs no
+Roboflow account or network.
+
+inference, cv2 and the detector backends are imported when a pipeline or
+camera slot is first created, so importing this module (e.g. for
+DEFAULT_CAMERA_ID) does not load the inference stack.
 """
-import cv2
-import numpy as np
 import threading
 import time
 import logging
+from datetime import datetime
 from flask import current_app
-from inference import InferencePipeline
+from app.utils.metrics import observe_stage, FRAMES_PROCESSED
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CAMERA_ID = 'default'
+
+
+class CameraSlot:
+    """Latest frame and predictions of one camera"""
+    
+    def __init__(self, camera_id, video_source, encode_profiles):
+        """
+        Initialize camera slot
+        
+        Args:
+            camera_id: Camera identifier
+            video_source: Camera index, video path or stream URL
+            encode_profiles: Encode profiles for the frame cache
+        """
+        from app.utils.video_utils import EncodedFrameCache
+        
+        self.camera_id = camera_id
+        self.video_source = video_source
+        self.pipeline_id = None
+        self.current_frame = None
+        self.latest_predictions = None
+        self.frame_count = 0
+        self.error_message = None
+        self.lock = threading.Lock()
+        self.encode_cache = EncodedFrameCache(encode_profiles, camera_id)
+
+
 class WorkflowDetector:
     """
     Roboflow InferencePipeline-based detector with custom workflow
     This approach is more efficient for continuous video streams
+    
+    Keeps one slot (frame, predictions, counters) per camera. Cameras
+    started together share a single InferencePipeline fed with several
+    video references, and therefore a single copy of the model weights.
     """
     
     def __init__(self):
         """Initialize the workflow detector"""
-        self.pipeline = None
-        self.is_running = False
-        self.current_frame = None
-        self.latest_predictions = None
+        self.pipelines = {}
+        self.cameras = {}
+        self.backends = {}
+        self.classes = None  # ClassMap of parsed detections, created on first parse
         self.lock = threading.Lock()
-        self.frame_count = 0
         self.error_message = None
-        self.video_source = None
+        self.max_cameras = current_app.config['MAX_CAMERAS']
+        self.encode_profiles = current_app.config['ENCODE_PROFILES']
+        self._next_pipeline_id = 1
+    
+    @property
+    def is_running(self):
+        """Whether any pipeline is running"""
+        return bool(self.pipelines)
+    
+    def _make_sink(self, camera_ids):
+        """
+        Build the on_prediction callback of a pipeline
+        
+        Args:
+            camera_ids: Camera IDs in the order of the pipeline's video references
+        
+        Returns:
+            Callable accepting single or batched (result, video_frame) pairs
+        """
+        def sink(result, video_frame):
+            # Several video references: the pipeline hands over batches
+            if isinstance(result, list):
+                for item, frame in zip(result, video_frame):
+                    if item is None and frame is None:
+                        continue
+                    index = getattr(frame, 'source_id', 0) or 0
+                    if index < len(camera_ids):
+                        self.frame_sink(item or {}, frame, camera_ids[index])
+            else:
+                self.frame_sink(result, video_frame, camera_ids[0])
+        
+        return sink
+    
+    def _make_error_sink(self, camera_ids):
+        """
+        Build the callback a local pipeline reports sources it gave up on to
+        
+        Args:
+            camera_ids: Camera IDs in the order of the pipeline's video references
+        
+        Returns:
+            Callable accepting (source index, message)
+        """
+        def on_source_error(index, message):
+            slot = self.cameras.get(camera_ids[index]) if index < len(camera_ids) else None
+            if slot is not None:
+                with slot.lock:
+                    slot.error_message = message
         
-    def frame_sink(self, result, video_frame):
+        return on_source_error
+    
+    def frame_sink(self, result, video_frame, camera_id=DEFAULT_CAMERA_ID):
         """
         Callback function that receives processed frames from InferencePipeline
         
         Args:
             result: Dictionary containing predictions and processed image
             video_frame: Raw video frame object
+            camera_id: Camera the frame belongs to
         """
-        with self.lock:
+        slot = self.cameras.get(camera_id)
+        if slot is None:
+            return
+        
+        with slot.lock:
             try:
                 # Get the processed image with bounding boxes drawn
                 if result.get("output_image"):
-                    self.current_frame = result["output_image"].numpy_image
-                    self.frame_count += 1
+                    slot.current_frame = result["output_image"].numpy_image
+                    slot.frame_count += 1
                 # Fallback to raw frame if no output image
                 elif video_frame is not None:
                     if hasattr(video_frame, 'image'):
-                        self.current_frame = video_frame.image
+                        slot.current_frame = video_frame.image
                     elif hasattr(video_frame, 'numpy_image'):
-                        self.current_frame = video_frame.numpy_image
-                    self.frame_count += 1
+                        slot.current_frame = video_frame.numpy_image
+                    slot.frame_count += 1
                 
-                # Store predictions for analysis
-                self.latest_predictions = result
+                # Capture-to-result latency of the pipeline
+                captured_at = getattr(video_frame, 'frame_timestamp', None)
+                if isinstance(captured_at, datetime):
+                    captured_at = captured_at.timestamp()
+                if captured_at:
+                    observe_stage('pipeline', camera_id, time.time() - captured_at)
+                FRAMES_PROCESSED.inc(pipeline='workflow', camera=camera_id)
+                
+                # Store predictions for analysis (the image is kept above;
+                # leaving it out keeps the predictions JSON-serializable)
+                slot.latest_predictions = {k: v for k, v in result.items() if k != 'output_image'}
                 
                 # Log progress periodically
-                if self.frame_count % 30 == 0:
-                    logger.info(f"Processed frame {self.frame_count}")
-                    
+                if slot.frame_count % 30 == 0:
+                    logger.info(f"Camera {camera_id}: processed frame {slot.frame_count}")
+            
             except Exception as e:
-                logger.error(f"Error in frame_sink: {e}")
-                self.error_message = str(e)
+                logger.error(f"Error in frame_sink for camera {camera_id}: {e}")
+                slot.error_message = str(e)
     
-    def start_detection(self, video_source=0):
+    def start_detection(self, video_source=0, camera_id=DEFAULT_CAMERA_ID):
         """
-        Start the detection pipeline
+        Start the detection pipeline for one camera
         
         Args:
             video_source: Camera index (0 for webcam) or video path/URL
-            
+            camera_id: Camera identifier
+        
         Returns:
             dict: Status of the operation
         """
-        if self.is_running:
-            return {"success": False, "message": "Detection already running"}
+        return self.start_group({camera_id: video_source})
+    
+    def start_group(self, sources):
+        """
+        Start one pipeline serving several cameras
+        
+        Args:
+            sources: Mapping of camera ID to video source
+        
+        Returns:
+            dict: Status of the operation
+        """
+        if not sources:
+            return {"success": False, "message": "No camera sources given"}
+        
+        with self.lock:
+            running = [camera_id for camera_id in sources if camera_id in self.cameras]
+            if running:
+                return {"success": False,
+                        "message": f"Detection already running for camera {', '.join(map(str, running))}"}
+            
+            if len(self.cameras) + len(sources) > self.max_cameras:
+                return {"success": False,
+                        "message": f"Maximum number of cameras ({self.max_cameras}) reached"}
+            
+            pipeline_id = self._next_pipeline_id
+            self._next_pipeline_id += 1
+            camera_ids = list(sources.keys())
+            for camera_id in camera_ids:
+                slot = CameraSlot(camera_id, sources[camera_id], self.encode_profiles)
+                slot.pipeline_id = pipeline_id
+                self.cameras[camera_id] = slot
         
         try:
             # Get configuration from Flask app
-            api_key = current_app.config.get('ROBOFLOW_API_KEY')
-            workspace = current_app.config.get('ROBOFLOW_WORKSPACE')
-            workflow_id = current_app.config.get('ROBOFLOW_WORKFLOW_ID', 'detect-count-and-visualize')
+            backend_name = current_app.config.get('WORKFLOW_BACKEND', 'roboflow')
             max_fps = current_app.config.get('MAX_FPS', 30)
             
-            if not api_key:
-                return {"success": False, "message": "Roboflow API key not configured"}
-            
-            self.video_source = video_source
-            
             # Convert string "0" to integer 0 for webcam
-            video_reference = video_source
-            if video_source == "0" or video_source == 0:
-                video_reference = 0
-            
-            # Initialize InferencePipeline with workflow (simplified approach)
-            logger.info(f"Initializing InferencePipeline with workflow {workflow_id}")
-            logger.info(f"Workspace: {workspace}, Video source: {video_reference}")
+            video_references = []
+            for camera_id in camera_ids:
+                video_source = sources[camera_id]
+                if video_source == "0" or video_source == 0:
+                    video_source = 0
+                video_references.append(video_source)
             
-            self.pipeline = InferencePipeline.init_with_workflow(
-                api_key=api_key,
-                workspace_name=workspace,
-                workflow_id=workflow_id,
-                video_reference=video_reference,  # Path to video, device id, or RTSP stream url
-                max_fps=max_fps,
-                on_prediction=self.frame_sink
-            )
+            if backend_name == 'roboflow':
+                pipeline = self._create_inference_pipeline(video_references, camera_ids, max_fps)
+            else:
+                pipeline = self._create_local_pipeline(backend_name, video_references, camera_ids, max_fps)
             
-            # Start the pipeline (non-blocking)
-            self.pipeline.start()
-            self.is_running = True
+            if pipeline is None:
+                self._release_cameras(camera_ids)
+                return {"success": False, "message": self.error_message}
             
-            logger.info("Detection pipeline started successfully")
-            return {"success": True, "message": "Detection started"}
+            # Start the pipeline (non-blocking; raises if a local source cannot be opened)
+            pipeline.start()
+            with self.lock:
+                self.pipelines[pipeline_id] = {'pipeline': pipeline, 'camera_ids': camera_ids}
             
+            logger.info(f"Detection pipeline {pipeline_id} started for cameras {camera_ids}")
+            return {"success": True, "message": "Detection started", "cameras": camera_ids}
+        
         except Exception as e:
             error_msg = f"Failed to start detection: {str(e)}"
             logger.error(error_msg)
             self.error_message = error_msg
+            self._release_cameras(camera_ids)
             return {"success": False, "message": error_msg}
     
-    def stop_detection(self):
+    def _create_inference_pipeline(self, video_references, camera_ids, max_fps):
+        """
+        Build a Roboflow InferencePipeline running the configured workflow
+        
+        Returns:
+            InferencePipeline or None if Roboflow is not configured
+        """
+        from inference import InferencePipeline
+        
+        api_key = current_app.config.get('ROBOFLOW_API_KEY')
+        workspace = current_app.config.get('ROBOFLOW_WORKSPACE')
+        workflow_id = current_app.config.get('ROBOFLOW_WORKFLOW_ID', 'detect-count-and-visualize')
+        
+        if not api_key:
+            self.error_message = "Roboflow API key not configured"
+            return None
+        
+        video_reference = video_references[0] if len(video_references) == 1 else video_references
+        
+        # Initialize InferencePipeline with workflow (simplified approach)
+        logger.info(f"Initializing InferencePipeline with workflow {workflow_id}")
+        logger.info(f"Workspace: {workspace}, Video sources: {dict(zip(camera_ids, video_references))}")
+        
+        return InferencePipeline.init_with_workflow(
+            api_key=api_key,
+            workspace_name=workspace,
+            workflow_id=workflow_id,
+            video_reference=video_reference,  # Path to video, device id, RTSP url, or a list of them
+            max_fps=max_fps,
+            on_prediction=self._make_sink(camera_ids)
+        )
+    
+    def prewarm(self):
+        """
+        Load the configured backend ahead of the first start
+        
+        Local backends are loaded, warmed up and kept for later pipelines.
+        The Roboflow workflow only gets its (slow) inference import done here;
+        its model is fetched when the pipeline starts.
+        
+        Returns:
+            bool: Whether the backend is ready
+        """
+        backend_name = current_app.config.get('WORKFLOW_BACKEND', 'roboflow')
+        if backend_name == 'roboflow':
+            import inference  # noqa: F401
+            return True
+        return self._get_backend(backend_name) is not None
+    
+    def _get_backend(self, backend_name):
+        """
+        Loaded detector backend for local pipelines, shared by every pipeline
+        
+        Returns:
+            DetectorBackend or None if it cannot be loaded
+        """
+        backend = self.backends.get(backend_name)
+        if backend is not None:
+            return backend
+        
+        from app.utils.detector_backends import create_backend
+        
+        try:
+            backend = create_backend(backend_name, current_app.config)
+        except ValueError as e:
+            self.error_message = str(e)
+            return None
+        
+        if not backend.load():
+            self.error_message = f"Detector backend '{backend_name}' failed to load"
+            return None
+        
+        try:
+            warmup_runs = current_app.config['DETECTOR_WARMUP_RUNS']
+            if warmup_runs:
+                backend.warmup(warmup_runs)
+        except Exception as e:
+            logger.warning(f"Workflow backend warm-up failed: {str(e)}")
+        
+        self.backends[backend_name] = backend
+        return backend
+    
+    def _create_local_pipeline(self, backend_name, video_references, camera_ids, max_fps):
+        """
+        Build an in-process pipeline around a registered detector backend
+        
+        Returns:
+            LocalPipeline or None if the backend cannot be loaded
+        """
+        from app.utils.local_pipeline import LocalPipeline
+        
+        backend = self._get_backend(backend_name)
+        if backend is None:
+            return None
+        
+        logger.info(f"Initializing local pipeline with backend '{backend_name}' "
+                    f"for video sources {dict(zip(camera_ids, video_references))}")
+        
+        return LocalPipeline(
+            backend,
+            video_references,
+            on_prediction=self._make_sink(camera_ids),
+            max_fps=max_fps,
+            confidence=current_app.config['CONFIDENCE_THRESHOLD'],
+            loop_video_files=current_app.config['CAMERA_LOOP_VIDEO_FILES'],
+            reconnect_delay=current_app.config['CAMERA_RECONNECT_DELAY'],
+            reconnect_max_delay=current_app.config['CAMERA_RECONNECT_MAX_DELAY'],
+            max_reconnect_attempts=current_app.config['CAMERA_MAX_RECONNECT_ATTEMPTS'],
+            stall_timeout=current_app.config['CAMERA_STALL_TIMEOUT'],
+            on_source_error=self._make_error_sink(camera_ids)
+        )
+    
+    def _release_cameras(self, camera_ids):
+        """Forget the slots of cameras whose pipeline is gone"""
+        with self.lock:
+            for camera_id in camera_ids:
+                self.cameras.pop(camera_id, None)
+    
+    def stop_detection(self, camera_id=None):
         """
         Stop the detection pipeline
         
+        Stopping a camera that shares a pipeline stops every camera of
+        that pipeline.
+        
+        Args:
+            camera_id: Camera to stop, or None to stop all pipelines
+        
         Returns:
             dict: Status of the operation
         """
-        if not self.is_running:
+        with self.lock:
+            if camera_id is None:
+                pipeline_ids = list(self.pipelines.keys())
+            else:
+                slot = self.cameras.get(camera_id)
+                pipeline_ids = [slot.pipeline_id] if slot and slot.pipeline_id in self.pipelines else []
+            
+            entries = [self.pipelines.pop(pipeline_id) for pipeline_id in pipeline_ids]
+        
+        if not entries:
             return {"success": False, "message": "Detection not running"}
         
+        stopped = []
         try:
-            if self.pipeline:
-                self.pipeline.terminate()
-                self.pipeline = None
-            
-            self.is_running = False
-            self.current_frame = None
-            self.latest_predictions = None
-            
-            logger.info("Detection pipeline stopped")
-            return {"success": True, "message": "Detection stopped"}
+            for entry in entries:
+                entry['pipeline'].terminate()
+                self._release_cameras(entry['camera_ids'])
+                stopped.extend(entry['camera_ids'])
             
+            logger.info(f"Detection stopped for cameras {stopped}")
+            return {"success": True, "message": "Detection stopped", "cameras": stopped}
+        
         except Exception as e:
             error_msg = f"Error stopping detection: {str(e)}"
             logger.error(error_msg)
             return {"success": False, "message": error_msg}
     
-    def get_frame(self):
+    def get_frame(self, profile='stream', camera_id=DEFAULT_CAMERA_ID):
         """
         Get the latest processed frame as JPEG bytes
         
+        Each frame is encoded once per profile; all viewers share the bytes.
+        
+        Args:
+            profile: Encode profile name ('preview', 'stream', ...)
+            camera_id: Camera identifier
+        
         Returns:
             bytes: JPEG encoded frame or None
         """
-        with self.lock:
-            if self.current_frame is not None:
-                # Encode with lower quality for faster transmission
-                ret, buffer = cv2.imencode('.jpg', self.current_frame, 
-                                          [cv2.IMWRITE_JPEG_QUALITY, 75])
-                if ret:
-                    return buffer.tobytes()
-        return None
+        slot = self.cameras.get(camera_id)
+        if slot is None:
+            return None
+        
+        with slot.lock:
+            frame = slot.current_frame
+            frame_key = slot.frame_count
+        
+        if frame is None:
+            return None
+        
+        return slot.encode_cache.get(frame_key, frame, profile)
     
-    def get_status(self):
+    def get_current_frame(self, camera_id=DEFAULT_CAMERA_ID):
         """
-        Get current status of the detector
+        Get the latest processed frame without encoding it
+        
+        Args:
+            camera_id: Camera identifier
+        
+        Returns:
+            numpy array or None
+        """
+        slot = self.cameras.get(camera_id)
+        if slot is None:
+            return None
+        
+        with slot.lock:
+            return slot.current_frame
+    
+    def get_status(self, camera_id=DEFAULT_CAMERA_ID):
+        """
+        Get current status of the detector for one camera
+        
+        Args:
+            camera_id: Camera identifier
         
         Returns:
             dict: Status information
         """
+        slot = self.cameras.get(camera_id)
+        if slot is None:
+            return {
+                "camera_id": camera_id,
+                "is_running": False,
+                "frame_count": 0,
+                "has_frame": False,
+                "video_source": None,
+                "error_message": self.error_message,
+                "predictions": None
+            }
+        
         return {
-            "is_running": self.is_running,
-            "frame_count": self.frame_count,
-            "has_frame": self.current_frame is not None,
-            "video_source": self.video_source,
-            "error_message": self.error_message,
-            "predictions": self.latest_predictions
+            "camera_id": camera_id,
+            "is_running": slot.pipeline_id in self.pipelines,
+            "frame_count": slot.frame_count,
+            "has_frame": slot.current_frame is not None,
+            "video_source": slot.video_source,
+            "error_message": slot.error_message or self.error_message,
+            "predictions": slot.latest_predictions
         }
     
-    def get_predictions(self):
+    def get_all_status(self):
         """
-        Get latest predictions from the workflow
+        Get a short status of every camera
         
         Returns:
-            dict: Latest predictions or None
+            dict: Camera ID to status summary (without predictions)
         """
-        with self.lock:
-            return self.latest_predictions
+        summary = {}
+        for camera_id in list(self.cameras.keys()):
+            status = self.get_status(camera_id)
+            status.pop('predictions', None)
+            summary[camera_id] = status
+        return summary
     
-    def parse_detections(self):
+    def get_predictions(self, camera_id=DEFAULT_CAMERA_ID):
         """
-        Parse predictions into standardized detection format
+        Get latest predictions from the workflow
+        
+        Args:
+            camera_id: Camera identifier
         
         Returns:
-            list: List of detection dictionaries
+            dict: Latest predictions or None
         """
-        if not self.latest_predictions:
-            return []
-        
-        detections = []
-        try:
-            # Parse workflow predictions (format may vary based on workflow)
-            predictions = self.latest_predictions.get('predictions', [])
-            
-            for pred in predictions:
-                detection = {
-                    'class': pred.get('class', pred.get('class_name', 'unknown')),
-                    'confidence': pred.get('confidence', 0.0),
-                    'bbox': self._extract_bbox(pred)
-                }
-                detections.append(detection)
-                
-        except Exception as e:
-            logger.error(f"Error parsing detections: {e}")
+        slot = self.cameras.get(camera_id)
+        if slot is None:
+            return None
         
-        return detections
+        with slot.lock:
+            return slot.latest_predictions
     
-    def _extract_bbox(self, pred):
+    def parse_detections(self, camera_id=DEFAULT_CAMERA_ID):
         """
-        Extract bounding box from prediction in various formats
+        Parse predictions into standardized detections
         
         Args:
-            pred: Prediction dictionary
-            
+            camera_id: Camera identifier
+        
         Returns:
-            list: [x, y, width, height]
+            Detections (centre x/y/width/height, top-left bbox and
+            bounding_box prediction formats are all accepted)
         """
+        from app.utils.detections import Detections, ClassMap
+        
+        if self.classes is None:
+            self.classes = ClassMap()
+        
+        latest_predictions = self.get_predictions(camera_id)
+        if not latest_predictions:
+            return Detections.empty(self.classes)
+        
         try:
-            # Format 1: x, y, width, height
-            if 'x' in pred and 'y' in pred and 'width' in pred and 'height' in pred:
-                return [
-                    int(pred['x'] - pred['width'] / 2),
-                    int(pred['y'] - pred['height'] / 2),
-                    int(pred['width']),
-                    int(pred['height'])
-                ]
-            # Format 2: bbox array
-            elif 'bbox' in pred:
-                return pred['bbox']
-            # Format 3: bounding_box object
-            elif 'bounding_box' in pred:
-                bb = pred['bounding_box']
-                return [bb.get('x', 0), bb.get('y', 0), 
-                       bb.get('width', 0), bb.get('height', 0)]
+            # Parse workflow predictions (format may vary based on workflow)
+            return Detections.from_predictions(latest_predictions.get('predictions', []), self.classes)
         except Exception as e:
-            logger.error(f"Error extracting bbox: {e}")
-        
-        return [0, 0, 0, 0]
+            logger.error(f"Error parsing detections: {e}")
+            return Detections.empty(self.classes)
@@ -0,0 +1,363 @@
+"""
+Zone rule engine over the detections of a frame
+
+Cameras can be given named polygon zones (desks, aisles, the invigilator
+area) and rules over them, e.g. "phone inside any desk zone for 3 s" or
+"two persons in one desk zone". Each frame, every rule is evaluated against
+all of its zones at once: zones are stored as padded vertex arrays,
+detections are reduced to anchor points (or a grid of sample points for
+area overlap), and point-in-polygon is a vectorized ray-casting test on
+the candidate pairs left after a bounding-box prefilter. Dwell timers are
+arrays per rule, so hundreds of zones per hall cost a handful of NumPy
+operations per frame.
+
+Only rule-level events come out: one when a rule has held in a zone for
+its minimum duration, then nothing until the condition clears.
+
+Configuration (ZONE_CONFIG, inline JSON or a path to a JSON file):
+
+    {
+        "hall_a": {
+            "zones": {"desk_1": [[100, 200], [300, 200], [300, 400], [100, 400]], ...},
+            "rules": [
+                {"name": "phone_at_desk", "class": "cell phone", "zones": "desk_*", "min_seconds": 3},
+                {"name": "shared_desk", "class": "person", "zones": "desk_*", "min_count": 2,
+                 "anchor": "bottom"},
+                {"name": "invigilator_away", "class": "person", "zones": ["front"], "max_count": 0,
+                 "min_seconds": 60}
+            ]
+        }
+    }
+
+Vertex values <= 1 are treated as fractions of the frame size. Rule keys:
+    class           Detection class counted by the rule
+    zones           Zone name or glob pattern (or a list of them); default all zones
+    min_count       Detections needed in a zone (default 1, or 0 with max_count)
+    max_count       Optional upper bound on the detections in a zone
+    min_seconds     How long the condition must hold before the event (default 0)
+    grace_seconds   Gaps shorter than this do not reset the dwell timer (default 1)
+    anchor          Point tested when min_overlap is 0: 'center' (default) or 'bottom'
+    min_overlap     Fraction of the box that must lie inside the zone (default 0)
+"""
+import os
+import json
+import logging
+from fnmatch import fnmatch
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sample points per box side used for area-overlap tests
+OVERLAP_GRID = 3
+
+
+def parse_zone_config(value):
+    """
+    Parse the ZONE_CONFIG setting
+    
+    Args:
+        value: JSON string, path to a JSON file, or dict mapping camera ID
+            to {"zones": {...}, "rules": [...]}
+    
+    Returns:
+        dict: Camera ID to zone configuration
+    """
+    if not value:
+        return {}
+    
+    if isinstance(value, dict):
+        return value
+    
+    try:
+        if os.path.isfile(value):
+            with open(value) as f:
+                config = json.load(f)
+        else:
+            config = json.loads(value)
+    except ValueError as e:
+        logger.error(f"Invalid ZONE_CONFIG setting: {str(e)}")
+        return {}
+    
+    if not isinstance(config, dict):
+        logger.error("ZONE_CONFIG must map camera IDs to {\"zones\": ..., \"rules\": ...}")
+        return {}
+    
+    return config
+
+
+def polygon_edges(polygons):
+    """
+    Edges of padded polygons
+    
+    Args:
+        polygons: Array of shape (Z, V, 2), shorter polygons padded with their first vertex
+    
+    Returns:
+        Array of shape (Z, V, 4), [x1, y1, x2, y2] per edge (the last closes the polygon)
+    """
+    return np.concatenate([polygons, np.roll(polygons, -1, axis=1)], axis=2)
+
+
+def points_in_polygons(points, edges, bounds):
+    """
+    Test every point against every polygon
+    
+    Args:
+        points: Array of shape (K, 2)
+        edges: Array of shape (Z, V, 4) from polygon_edges()
+        bounds: Array of shape (Z, 4), [min_x, min_y, max_x, max_y] per polygon
+    
+    Returns:
+        Boolean array of shape (K, Z)
+    """
+    px = points[:, 0][:, None]
+    py = points[:, 1][:, None]
+    
+    # Only pairs inside the polygon's bounding box need the full test
+    inside = ((px >= bounds[:, 0]) & (px <= bounds[:, 2]) &
+              (py >= bounds[:, 1]) & (py <= bounds[:, 3]))
+    point_index, polygon_index = np.nonzero(inside)
+    if point_index.size == 0:
+        return inside
+    
+    # Ray casting: count polygon edges crossed by a ray to the right of the point
+    candidate_edges = edges[polygon_index]
+    x1, y1, x2, y2 = (candidate_edges[:, :, i] for i in range(4))
+    cx = points[point_index, 0][:, None]
+    cy = points[point_index, 1][:, None]
+    
+    straddles = (y1 > cy) != (y2 > cy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (cy - y1) * (x2 - x1) / (y2 - y1)
+    crossings = np.count_nonzero(straddles & (cx < x_cross), axis=1)
+    
+    inside[point_index, polygon_index] = crossings % 2 == 1
+    return inside
+
+
+class ZoneRule:
+    """One rule and its dwell state in each of its zones"""
+    
+    def __init__(self, config, zone_names):
+        """
+        Initialize rule
+        
+        Args:
+            config: Rule dictionary (see module docstring)
+            zone_names: Names of all zones of the camera
+        """
+        self.name = config['name']
+        self.object_type = config['class']
+        
+        patterns = config.get('zones', '*')
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        self.zones = np.array([index for index, zone in enumerate(zone_names)
+                               if any(fnmatch(zone, pattern) for pattern in patterns)], dtype=np.intp)
+        if self.zones.size == 0:
+            raise ValueError(f"Rule '{self.name}' matches no zones ({patterns})")
+        
+        self.max_count = config.get('max_count')
+        self.min_count = config.get('min_count', 0 if self.max_count is not None else 1)
+        self.min_seconds = float(config.get('min_seconds', 0))
+        self.grace_seconds = float(config.get('grace_seconds', 1.0))
+        self.anchor = config.get('anchor', 'center')
+        self.min_overlap = float(config.get('min_overlap', 0))
+        if self.anchor not in ('center', 'bottom'):
+            raise ValueError(f"Rule '{self.name}': anchor must be 'center' or 'bottom'")
+        
+        # Dwell state per zone of the rule
+        self.since = np.full(self.zones.size, np.nan)
+        self.last_true = np.full(self.zones.size, -np.inf)
+        self.fired = np.zeros(self.zones.size, dtype=bool)
+    
+    def evaluate(self, counts, now):
+        """
+        Advance the dwell timers
+        
+        Args:
+            counts: Detections of the rule's class per zone of the rule
+            now: Time of the frame (seconds)
+        
+        Returns:
+            Indices (into the rule's zones) where the rule fires now
+        """
+        active = counts >= self.min_count
+        if self.max_count is not None:
+            active &= counts <= self.max_count
+        
+        self.last_true[active] = now
+        self.since[active & np.isnan(self.since)] = now
+        
+        # Short gaps (missed detections) keep the timer running
+        holding = (now - self.last_true) <= self.grace_seconds
+        self.since[~holding] = np.nan
+        self.fired[~holding] = False
+        
+        due = active & ~self.fired & (now - self.since >= self.min_seconds)
+        self.fired |= due
+        return np.nonzero(due)[0]
+    
+    def reset(self):
+        """Forget all dwell state"""
+        self.since[:] = np.nan
+        self.last_true[:] = -np.inf
+        self.fired[:] = False
+
+
+class ZoneRuleEngine:
+    """Zones and rules of one camera"""
+    
+    def __init__(self, zones, rules):
+        """
+        Initialize engine
+        
+        Args:
+            zones: Dictionary of zone name to list of [x, y] vertices
+            rules: List of rule dictionaries
+        """
+        self.zone_names = list(zones)
+        if not self.zone_names:
+            raise ValueError("No zones configured")
+        
+        vertices = [np.asarray(zones[name], dtype=np.float64).reshape(-1, 2) for name in self.zone_names]
+        for name, polygon in zip(self.zone_names, vertices):
+            if len(polygon) < 3:
+                raise ValueError(f"Zone '{name}' needs at least 3 vertices")
+        
+        # Pad to a common vertex count with the first vertex (degenerate edges never cross)
+        max_vertices = max(len(polygon) for polygon in vertices)
+        self.polygons = np.stack([np.vstack([polygon, np.repeat(polygon[:1], max_vertices - len(polygon), axis=0)])
+                                  for polygon in vertices])
+        self.fractional = bool(np.all(self.polygons <= 1.0))
+        
+        self.rules = [ZoneRule(rule, self.zone_names) for rule in rules]
+        
+        self._frame_size = None
+        self._scaled = None
+        self._bounds = None
+        self._rule_geometry = None
+        self.last_seq = None
+    
+    def _geometry(self, frame_shape):
+        """Zone polygons and bounds in pixels for a frame size"""
+        size = (frame_shape[1], frame_shape[0]) if frame_shape is not None else (1, 1)
+        if size != self._frame_size:
+            scale = np.array(size, dtype=np.float64) if self.fractional else np.ones(2)
+            self._scaled = self.polygons * scale
+            self._bounds = np.concatenate([self._scaled.min(axis=1), self._scaled.max(axis=1)], axis=1)
+            edges = polygon_edges(self._scaled)
+            self._rule_geometry = [(edges[rule.zones], self._bounds[rule.zones]) for rule in self.rules]
+            self._frame_size = size
+        return self._scaled, self._bounds
+    
+    def zone_box(self, index, frame_shape=None):
+        """Bounding box [x, y, width, height] of a zone in pixels"""
+        _, bounds = self._geometry(frame_shape)
+        x1, y1, x2, y2 = bounds[index]
+        return [int(x1), int(y1), int(x2 - x1), int(y2 - y1)]
+    
+    def membership(self, boxes, rule, edges, bounds):
+        """
+        Which boxes count as inside which of the rule's zones
+        
+        Args:
+            boxes: Array of shape (N, 4), [x1, y1, x2, y2]
+            rule: ZoneRule
+            edges, bounds: Geometry of the rule's zones in pixels
+        
+        Returns:
+            Boolean array of shape (N, zones of the rule)
+        """
+        if rule.min_overlap > 0:
+            # Share of a grid of sample points inside the zone approximates the overlap
+            offsets = (np.arange(OVERLAP_GRID) + 0.5) / OVERLAP_GRID
+            fx, fy = np.meshgrid(offsets, offsets)
+            points = np.stack([
+                boxes[:, 0][:, None] + (boxes[:, 2] - boxes[:, 0])[:, None] * fx.ravel(),
+                boxes[:, 1][:, None] + (boxes[:, 3] - boxes[:, 1])[:, None] * fy.ravel()
+            ], axis=2).reshape(-1, 2)
+            inside = points_in_polygons(points, edges, bounds)
+            overlap = inside.reshape(len(boxes), OVERLAP_GRID * OVERLAP_GRID, -1).mean(axis=1)
+            return overlap >= rule.min_overlap
+        
+        anchor_y = boxes[:, 3] if rule.anchor == 'bottom' else (boxes[:, 1] + boxes[:, 3]) / 2
+        points = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, anchor_y], axis=1)
+        return points_in_polygons(points, edges, bounds)
+    
+    def update(self, detections, now, frame_shape=None, seq=None):
+        """
+        Evaluate all rules on one frame
+        
+        Args:
+            detections: Detections of the frame
+            now: Time of the frame (seconds, e.g. time.time())
+            frame_shape: Shape of the frame, needed for fractional zones
+            seq: Frame sequence number; a frame already evaluated is ignored
+        
+        Returns:
+            list: Rule events, dictionaries with rule, zone, object_type,
+                count, confidence, since (seconds), dwell_seconds, bbox
+                (of the zone) and detections (Detections inside the zone)
+        """
+        if seq is not None:
+            if seq == self.last_seq:
+                return []
+            self.last_seq = seq
+        
+        self._geometry(frame_shape)
+        boxes = detections.xyxy
+        classes = detections.class_names
+        
+        events = []
+        # Rules testing the same class, zones and geometry share one membership test
+        memberships = {}
+        for rule, (edges, bounds) in zip(self.rules, self._rule_geometry):
+            selected = np.nonzero(classes == rule.object_type)[0]
+            key = (rule.object_type, rule.anchor, rule.min_overlap, rule.zones.tobytes())
+            inside = memberships.get(key)
+            if inside is None:
+                if selected.size:
+                    inside = self.membership(boxes[selected], rule, edges, bounds)
+                else:
+                    inside = np.zeros((0, rule.zones.size), dtype=bool)
+                memberships[key] = inside
+            
+            for index in rule.evaluate(inside.sum(axis=0), now):
+                zone_detections = detections[selected[inside[:, index]]]
+                events.append({
+                    'rule': rule.name,
+                    'zone': self.zone_names[rule.zones[index]],
+                    'object_type': rule.object_type,
+                    'count': len(zone_detections),
+                    'confidence': float(zone_detections.confidence.max()) if len(zone_detections) else 0.0,
+                    'since': float(rule.since[index]),
+                    'dwell_seconds': float(now - rule.since[index]),
+                    'bbox': self.zone_box(rule.zones[index], frame_shape),
+                    'detections': zone_detections
+                })
+        
+        return events
+    
+    def reset(self):
+        """Forget the dwell state of all rules"""
+        for rule in self.rules:
+            rule.reset()
+        self.last_seq = None
+
+
+def create_zone_engine(config):
+    """
+    Create the engine for one camera's zone configuration
+    
+    Args:
+        config: {"zones": {...}, "rules": [...]}
+    
+    Returns:
+        ZoneRuleEngine, or None if the configuration is invalid
+    """
+    try:
+        return ZoneRuleEngine(config.get('zones', {}), config.get('rules', []))
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Invalid zone configuration: {str(e)}")
+        return None
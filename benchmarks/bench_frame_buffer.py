@@ -0,0 +1,126 @@
+"""
+Frame handoff benchmark: per-read allocation + per-consumer copy (the old
+Camera behaviour) versus the preallocated FrameBuffer with read-only views
+
+Usage:
+    python benchmarks/bench_frame_buffer.py --width 1920 --height 1080 --consumers 3
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.frame_buffer import FrameBuffer  # noqa: E402
+
+
+def write_synthetic_video(path, width, height, frames, fps=30):
+    """Write a short MJPEG video with moving content"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for i in range(frames):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        x = (i * 17) % max(1, width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (0, 255, 0), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def run_legacy(path, consumers):
+    """Old behaviour: read() allocates, every consumer copies"""
+    capture = cv2.VideoCapture(path)
+    allocations = 0
+    frames = 0
+    
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        allocations += 1
+        for _ in range(consumers):
+            frame.copy()
+            allocations += 1
+        frames += 1
+    
+    capture.release()
+    return frames, allocations
+
+
+def run_buffered(path, consumers, slots):
+    """New behaviour: read(image) into a slot, consumers get views"""
+    capture = cv2.VideoCapture(path)
+    frame_buffer = FrameBuffer(slots)
+    frames = 0
+    
+    while True:
+        index, target = frame_buffer.acquire_write_slot()
+        if target is not None:
+            ret, frame = capture.read(target)
+        else:
+            ret, frame = capture.read()
+        if not ret:
+            break
+        frame_buffer.commit(index, frame)
+        for _ in range(consumers):
+            frame_buffer.latest()
+        frames += 1
+    
+    capture.release()
+    return frames, frame_buffer.allocations
+
+
+def measure(label, func, *args):
+    """Run one scenario and collect timing and page-fault counters"""
+    faults_before = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    start = time.perf_counter()
+    frames, allocations = func(*args)
+    elapsed = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults_before
+    
+    return {
+        'scenario': label,
+        'frames': frames,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed else 0.0,
+        'frame_allocations': allocations,
+        'allocations_per_sec': allocations / elapsed if elapsed else 0.0,
+        'minor_faults_per_sec': faults / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--consumers', type=int, default=2)
+    parser.add_argument('--slots', type=int, default=3)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='bench_frames_')
+    try:
+        path = os.path.join(workdir, 'synthetic.avi')
+        write_synthetic_video(path, args.width, args.height, args.frames)
+        
+        results = [
+            measure('legacy copy', run_legacy, path, args.consumers),
+            measure('frame buffer', run_buffered, path, args.consumers, args.slots)
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"{args.width}x{args.height}, {args.frames} frames, {args.consumers} consumers")
+    print(f"{'scenario':<14}{'fps':>10}{'allocs':>10}{'allocs/s':>12}{'faults/s':>12}")
+    for r in results:
+        print(f"{r['scenario']:<14}{r['fps']:>10.1f}{r['frame_allocations']:>10}"
+              f"{r['allocations_per_sec']:>12.1f}{r['minor_faults_per_sec']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
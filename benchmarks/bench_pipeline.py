@@ -0,0 +1,365 @@
+"""
+End-to-end benchmark of the surveillance pipeline
+
+Runs every stage against a synthetic video and the synthetic detector
+backend (no network, no API keys) and reports throughput, p50/p99 latency
+and resident memory per stage. Results can be written as JSON, tagged with
+the current git commit, to track regressions across commits.
+
+Stages:
+    capture         Camera decoding a video file into its frame buffer
+    detect          ObjectDetector.detect_objects with the synthetic backend
+    draw            draw_detections on a full frame
+    encode          encode_frame_to_jpeg
+    persist         Event row + evidence image, as in api.video_feed
+    video_feed      MJPEG generator of /api/video-feed/<camera_id>
+    workflow_feed   MJPEG generator of /api/workflow/workflow-video-feed
+
+Usage:
+    python benchmarks/bench_pipeline.py --iterations 200 --output results.json
+    python benchmarks/bench_pipeline.py --stages draw,encode --width 1920 --height 1080
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ['capture', 'detect', 'draw', 'encode', 'persist', 'video_feed', 'workflow_feed']
+
+
+def write_synthetic_video(path, width, height, frames, fps):
+    """Write a short MJPEG video with moving content"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for i in range(frames):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        x = (i * 17) % max(1, width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 100, height // 3 + 100), (0, 255, 0), -1)
+        cv2.putText(frame, f'frame {i}', (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+
+
+def rss_mb():
+    """Current resident set size in MiB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        # No procfs: fall back to the peak, reported in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(name, latencies, elapsed, rss_before, extra=None):
+    """Build the result record of one stage"""
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    result = {
+        'stage': name,
+        'iterations': len(latencies),
+        'seconds': round(elapsed, 4),
+        'throughput_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'mean_ms': round(float(values.mean()), 3),
+        'max_ms': round(float(values.max()), 3),
+        'rss_mb': round(rss_mb(), 1),
+        'rss_delta_mb': round(rss_mb() - rss_before, 1)
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def time_calls(name, func, iterations, warmup=3):
+    """Time repeated calls of a zero-argument function"""
+    for _ in range(warmup):
+        func()
+    
+    rss_before = rss_mb()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(name, latencies, time.perf_counter() - started, rss_before)
+
+
+def time_stream(name, response, frames):
+    """Time the gaps between MJPEG parts of a streaming response"""
+    chunks = iter(response.response)
+    rss_before = rss_mb()
+    latencies = []
+    received = 0
+    
+    try:
+        next(chunks)
+        started = last = time.perf_counter()
+        while len(latencies) < frames:
+            chunk = next(chunks)
+            received += len(chunk)
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+        elapsed = time.perf_counter() - started
+    finally:
+        response.close()
+    
+    return summarize(name, latencies, elapsed, rss_before,
+                     {'mean_frame_kb': round(received / max(1, len(latencies)) / 1024, 1)})
+
+
+def make_app(workdir, args):
+    """Application configured for offline benchmarking"""
+    from config.config import config, TestingConfig
+    
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'DETECTED_EVENTS_FOLDER': workdir,
+        'DETECTOR_BACKEND': 'synthetic',
+        'WORKFLOW_BACKEND': 'synthetic',
+        'SYNTHETIC_LATENCY_MS': args.latency_ms,
+        'SYNTHETIC_JITTER_MS': args.jitter_ms,
+        'DETECTION_CLASSES': ['person', 'phone'],
+        'CAMERA_LOOP_VIDEO_FILES': True,
+        'MAX_FPS': args.fps
+    })
+    
+    from app import create_app, db
+    from app.models.user import User
+    
+    app = create_app('benchmark')
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def login(app):
+    """Test client with an authenticated session"""
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    return client
+
+
+def bench_capture(app, video_path, args):
+    """Frames delivered by a Camera reading the synthetic file"""
+    from app.utils.camera import Camera, get_camera_settings
+    
+    settings = get_camera_settings(app.config)
+    camera = Camera('bench', video_path, settings)
+    if not camera.start():
+        raise RuntimeError(f"Could not open {video_path}")
+    
+    try:
+        rss_before = rss_mb()
+        latencies = []
+        last_seq = 0
+        last = started = time.perf_counter()
+        while len(latencies) < args.iterations:
+            handle = camera.get_frame_handle()
+            if handle is None or handle.seq == last_seq:
+                time.sleep(0.0005)
+                continue
+            last_seq = handle.seq
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+        elapsed = time.perf_counter() - started
+        stats = camera.frame_buffer.get_stats()
+    finally:
+        camera.stop()
+    
+    return summarize('capture', latencies, elapsed, rss_before,
+                     {'dropped_frames': stats.get('dropped'), 'frame_allocations': stats.get('allocations')})
+
+
+def bench_detect(app, frame, args):
+    """Detector overhead plus simulated inference latency"""
+    from app.utils.detector import ObjectDetector
+    
+    with app.app_context():
+        detector = ObjectDetector()
+    return time_calls('detect', lambda: detector.detect_objects(frame), args.iterations)
+
+
+def bench_draw(app, frame, detections, args):
+    """Bounding box and label drawing"""
+    from app.utils.detector import draw_detections
+    return time_calls('draw', lambda: draw_detections(frame, detections), args.iterations)
+
+
+def bench_encode(app, frame, args):
+    """JPEG encoding at the default quality"""
+    from app.utils.video_utils import encode_frame_to_jpeg
+    return time_calls('encode', lambda: encode_frame_to_jpeg(frame), args.iterations)
+
+
+def bench_persist(app, frame, detections, args):
+    """Event insert + evidence image write + commit, as in api.video_feed"""
+    from app import db
+    from app.models.event import Event
+    from app.utils.detector import draw_detections
+    from app.utils.video_utils import save_frame_image
+    
+    detection = detections.to_dict(0)
+    
+    def persist():
+        event = Event(
+            camera_id='bench',
+            camera_name='Camera bench',
+            object_type=detection['class'],
+            confidence=detection['confidence'],
+            bounding_box=json.dumps(detection['bbox']),
+            user_id=1
+        )
+        db.session.add(event)
+        db.session.flush()
+        event.image_path = save_frame_image(draw_detections(frame, detections), 'bench', event.id)
+        db.session.commit()
+    
+    with app.app_context():
+        return time_calls('persist', persist, args.iterations)
+
+
+def bench_video_feed(app, video_path, args):
+    """Standard MJPEG feed: capture, detect, persist and encode in one generator"""
+    client = login(app)
+    client.post('/api/start-detection', json={'camera_id': 'feed', 'camera_source': video_path})
+    try:
+        response = client.get('/api/video-feed/feed', buffered=False)
+        return time_stream('video_feed', response, args.iterations)
+    finally:
+        client.post('/api/stop-detection')
+
+
+def bench_workflow_feed(app, video_path, args):
+    """Workflow MJPEG feed fed by a local synthetic pipeline"""
+    client = login(app)
+    client.post('/api/workflow/start-workflow-detection',
+                json={'camera_id': 'workflow', 'camera_source': video_path})
+    try:
+        # Let the pipeline publish its first frame
+        for _ in range(100):
+            status = client.get('/api/workflow/workflow-status/workflow').get_json()
+            if status.get('status', {}).get('has_frame'):
+                break
+            time.sleep(0.05)
+        
+        response = client.get('/api/workflow/workflow-video-feed/workflow', buffered=False)
+        return time_stream('workflow_feed', response, min(args.iterations, args.feed_frames))
+    finally:
+        client.post('/api/workflow/stop-workflow-detection', json={})
+
+
+def git_commit():
+    """Current commit hash, if the tree is a git checkout"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--feed-frames', type=int, default=60,
+                        help='frames timed on the workflow feed (throttled to ~15 FPS)')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=int, default=240,
+                        help='frame rate written into the synthetic video; Camera paces files to it')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='synthetic inference latency')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='synthetic inference jitter')
+    parser.add_argument('--output', help='write JSON results to this file ("-" for stdout)')
+    args = parser.parse_args()
+    
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    
+    logging.basicConfig(level=logging.ERROR)
+    
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    results = []
+    try:
+        video_path = os.path.join(workdir, 'synthetic.avi')
+        write_synthetic_video(video_path, args.width, args.height, 120, args.fps)
+        
+        app = make_app(workdir, args)
+        capture = cv2.VideoCapture(video_path)
+        _, frame = capture.read()
+        capture.release()
+        
+        from app.utils.detector_backends import SyntheticBackend
+        backend = SyntheticBackend(app.config)
+        backend.latency = backend.jitter = 0
+        from app.utils.detections import Detections
+        detections = Detections.from_predictions(backend.predict(frame, 0.0))
+        
+        runners = {
+            'capture': lambda: bench_capture(app, video_path, args),
+            'detect': lambda: bench_detect(app, frame, args),
+            'draw': lambda: bench_draw(app, frame, detections, args),
+            'encode': lambda: bench_encode(app, frame, args),
+            'persist': lambda: bench_persist(app, frame, detections, args),
+            'video_feed': lambda: bench_video_feed(app, video_path, args),
+            'workflow_feed': lambda: bench_workflow_feed(app, video_path, args)
+        }
+        
+        for stage in stages:
+            print(f"running {stage}...", file=sys.stderr)
+            results.append(runners[stage]())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': vars(args),
+        'results': results
+    }
+    
+    print(f"{args.width}x{args.height}, {args.iterations} iterations, "
+          f"synthetic latency {args.latency_ms}±{args.jitter_ms} ms")
+    print(f"{'stage':<15}{'per sec':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'rss MB':>10}")
+    for r in results:
+        print(f"{r['stage']:<15}{r['throughput_per_sec']:>10.1f}{r['p50_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}{r['rss_mb']:>10.1f}")
+    
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+    
+    # Tear down background camera/pipeline threads without waiting on them
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Event list serialization benchmark: ORM objects + to_dict() + jsonify versus
+column-only rows + orjson, per page size
+
+Each scenario builds the full /api/events response body for one page
+(query, conversion and JSON encoding) and reports serialized rows per
+second, plus the body size with and without gzip.
+
+Usage:
+    python benchmarks/bench_serialization.py --page-sizes 20,100,1000 --repeat 50
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+
+from config.config import config, TestingConfig  # noqa: E402
+
+
+def make_app(database_url):
+    """App bound to a benchmark database"""
+    from app import create_app
+    
+    config['bench_serialization'] = type('BenchSerialization', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_url
+    })
+    return create_app('bench_serialization')
+
+
+def seed(rows):
+    """Insert `rows` events with realistic field values"""
+    from app import db
+    from app.models import Event
+    
+    now = datetime.utcnow()
+    db.session.bulk_insert_mappings(Event, [{
+        'camera_id': f'camera-{i % 4}', 'camera_name': f'Camera {i % 4}',
+        'object_type': ('person', 'cell phone', 'laptop')[i % 3], 'confidence': 0.5 + (i % 50) / 100,
+        'bounding_box': f'[{i % 640}, {i % 480}, 64, 128]', 'track_id': i,
+        'timestamp': now - timedelta(seconds=i), 'first_seen': now - timedelta(seconds=i + 3),
+        'last_seen': now - timedelta(seconds=i), 'image_path': f'/data/detected_events/event_{i}.jpg',
+        'alert_sent': i % 2 == 0, 'is_reviewed': i % 5 == 0
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def orm_page(per_page):
+    """The previous /api/events path"""
+    from flask import jsonify
+    from app import db
+    from app.models import Event
+    
+    pagination = Event.query.order_by(Event.timestamp.desc()).paginate(page=1, per_page=per_page, error_out=False)
+    body = jsonify({'success': True, 'events': [event.to_dict() for event in pagination.items],
+                    'total': pagination.total, 'pages': pagination.pages,
+                    'current_page': pagination.page}).get_data()
+    db.session.rollback()
+    return body
+
+
+def column_page(per_page):
+    """The column-only /api/events path"""
+    from sqlalchemy import func
+    from app import db
+    from app.models import Event
+    from app.utils.serialization import dumps
+    
+    total = db.session.execute(select(func.count(Event.id))).scalar()
+    rows = db.session.execute(select(*Event.dict_columns()).order_by(Event.timestamp.desc()).limit(per_page)).all()
+    body = dumps({'success': True, 'events': Event.rows_to_dicts(rows), 'total': total,
+                  'pages': -(-total // per_page), 'current_page': 1})
+    db.session.rollback()
+    return body
+
+
+def measure(func, per_page, repeat):
+    """Seconds per call (best of `repeat`) and the body of the last call"""
+    func(per_page)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(per_page)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page-sizes', default='20,50,100,250,500,1000')
+    parser.add_argument('--rows', type=int, default=5000, help='Events in the table')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--gzip-level', type=int, default=5)
+    args = parser.parse_args()
+    
+    from app.utils import serialization
+    encoder = 'orjson' if serialization.orjson is not None else 'json (orjson not installed)'
+    
+    workdir = tempfile.mkdtemp(prefix='bench_serialization_')
+    try:
+        app = make_app(f"sqlite:///{os.path.join(workdir, 'events.db')}")
+        with app.test_request_context():
+            seed(args.rows)
+            print(f"{args.rows} events, encoder {encoder}, best of {args.repeat}")
+            print(f"{'page':>6}{'orm rows/s':>13}{'column rows/s':>15}{'speedup':>9}{'bytes':>9}{'gzip bytes':>12}")
+            for per_page in (int(size) for size in args.page_sizes.split(',')):
+                orm_seconds, _ = measure(orm_page, per_page, args.repeat)
+                column_seconds, body = measure(column_page, per_page, args.repeat)
+                compressed = gzip.compress(body, compresslevel=args.gzip_level)
+                print(f"{per_page:>6}{per_page / orm_seconds:>13.0f}{per_page / column_seconds:>15.0f}"
+                      f"{orm_seconds / column_seconds:>8.1f}x{len(body):>9}{len(compressed):>12}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Startup import cost of the app
+
+Runs each scenario in a fresh interpreter with `python -X importtime`, and
+reports wall time plus the import time broken down per top-level package
+(self time summed over all its submodules) and the slowest modules by
+cumulative time.
+
+Scenarios:
+    app         create_app() only, as paid by every gunicorn boot and flask CLI command
+    prewarm     create_app() with PREWARM_IMPORTS=True
+    detection   create_app() + the modules imported by the first detection request
+    workflow    create_app() + the modules imported by the first Roboflow workflow start
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --scenarios app,prewarm --top 15 --output imports.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = "from app import create_app; create_app('testing')"
+
+SCENARIOS = {
+    'app': (APP, {}),
+    'prewarm': (APP, {'PREWARM_IMPORTS': 'True'}),
+    'detection': (APP + "; import app.utils.detector, app.utils.camera, app.utils.preprocessing", {}),
+    'workflow': (APP + "; import app.utils.workflow_detector, inference", {})
+}
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$')
+
+TIMED = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+
+def run_scenario(code, env_overrides):
+    """
+    Run one scenario in a fresh interpreter
+    
+    Returns:
+        (wall seconds, list of (module, self_us, cumulative_us))
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT, **env_overrides)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', TIMED.format(code=code)],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"scenario failed:\n{result.stderr[-2000:]}")
+    
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us)))
+    return float(result.stdout.strip().splitlines()[-1]), imports
+
+
+def breakdown(imports, top):
+    """Per-package self time and slowest modules, in milliseconds"""
+    packages = {}
+    for module, self_us, _ in imports:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    
+    slowest = sorted(imports, key=lambda item: item[2], reverse=True)
+    return {
+        'import_ms': round(sum(item[1] for item in imports) / 1000, 1),
+        'modules': len(imports),
+        'packages': [{'package': name, 'self_ms': round(us / 1000, 1)}
+                     for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]],
+        'slowest_modules': [{'module': module, 'cumulative_ms': round(cumulative_us / 1000, 1)}
+                            for module, _, cumulative_us in slowest[:top]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario (median wall time)')
+    parser.add_argument('--top', type=int, default=10, help='packages/modules listed per scenario')
+    parser.add_argument('--output', help='write JSON results to this file ("-" for stdout)')
+    args = parser.parse_args()
+    
+    results = {}
+    for name in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+        code, env_overrides = SCENARIOS[name]
+        print(f"running {name}...", file=sys.stderr)
+        try:
+            runs = [run_scenario(code, env_overrides) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"  {name}: {e}", file=sys.stderr)
+            continue
+        results[name] = {'wall_s': round(statistics.median(wall for wall, _ in runs), 3),
+                         **breakdown(runs[-1][1], args.top)}
+    
+    for name, r in results.items():
+        print(f"\n{name}: {r['wall_s']:.2f}s wall, {r['import_ms']:.0f} ms in {r['modules']} imports")
+        print(f"  {'package':<28}{'self ms':>10}    {'module':<44}{'cumulative ms':>14}")
+        for package, module in zip(r['packages'], r['slowest_modules']):
+            print(f"  {package['package']:<28}{package['self_ms']:>10.1f}    "
+                  f"{module['module'][:44]:<44}{module['cumulative_ms']:>14.1f}")
+    
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+HTTP load test for concurrent dashboard viewers
+
+Logs in like a browser, starts workflow detection, then opens N concurrent
+MJPEG streams of /api/workflow/workflow-video-feed plus JSON pollers of
+workflow-status and workflow-predictions, for each N in --clients. Reports
+delivered FPS per stream client, tail latency of the JSON endpoints and
+(with --server-pid, on the same host) the server's CPU usage.
+
+Run the server with a synthetic detector so results do not depend on the
+network, e.g.:
+    WORKFLOW_BACKEND=synthetic gunicorn --worker-class eventlet -w 1 --bind 0.0.0.0:5000 run:app
+
+Usage:
+    python benchmarks/load_test.py --base-url http://localhost:5000 \\
+        --username admin --password secret --camera-source video.mp4 \\
+        --clients 1,5,10,20 --duration 20 --server-pid 12345 --output load.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+BOUNDARY = b'--frame\r\n'
+
+
+def login(base_url, username, password):
+    """Session authenticated through the login form"""
+    session = requests.Session()
+    response = session.post(f'{base_url}/login', data={'username': username, 'password': password},
+                            allow_redirects=False, timeout=10)
+    # A successful login redirects away from the login page
+    if response.status_code != 302 or '/login' in response.headers.get('Location', ''):
+        raise RuntimeError(f"Login failed for user {username!r} (HTTP {response.status_code})")
+    return session
+
+
+def read_cpu_seconds(pid):
+    """utime + stime of a process from /proc, in seconds"""
+    with open(f'/proc/{pid}/stat') as f:
+        # The command name may contain spaces; fields restart after its ')'
+        fields = f.read().rsplit(')', 1)[1].split()
+    ticks = int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+class StreamClient(threading.Thread):
+    """Reads one MJPEG stream and counts delivered frames"""
+    
+    def __init__(self, session, url, stop_event):
+        super().__init__(daemon=True)
+        self.session = session
+        self.url = url
+        self.stop_event = stop_event
+        self.frames = 0
+        self.first_frame_at = None
+        self.last_frame_at = None
+        self.error = None
+    
+    def run(self):
+        try:
+            with self.session.get(self.url, stream=True, timeout=(10, 30)) as response:
+                response.raise_for_status()
+                tail = b''
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if self.stop_event.is_set():
+                        break
+                    data = tail + chunk
+                    count = data.count(BOUNDARY)
+                    if count:
+                        now = time.perf_counter()
+                        if self.first_frame_at is None:
+                            self.first_frame_at = now
+                        self.frames += count
+                        self.last_frame_at = now
+                    # Keep enough bytes to catch a boundary split across chunks
+                    tail = data[-(len(BOUNDARY) - 1):]
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self.error = str(e)
+    
+    @property
+    def fps(self):
+        """Frames per second after the first frame arrived"""
+        if self.first_frame_at is None or self.frames < 2:
+            return 0.0
+        elapsed = self.last_frame_at - self.first_frame_at
+        return (self.frames - 1) / elapsed if elapsed else 0.0
+
+
+class Poller(threading.Thread):
+    """Polls JSON endpoints like the dashboard does and records latency"""
+    
+    def __init__(self, session, urls, interval, stop_event):
+        super().__init__(daemon=True)
+        self.session = session
+        self.urls = urls
+        self.interval = interval
+        self.stop_event = stop_event
+        self.latencies = {url: [] for url in urls}
+        self.errors = 0
+    
+    def run(self):
+        while not self.stop_event.is_set():
+            for url in self.urls:
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(url, timeout=10)
+                    response.raise_for_status()
+                    self.latencies[url].append(time.perf_counter() - started)
+                except Exception:
+                    self.errors += 1
+            self.stop_event.wait(self.interval)
+
+
+def percentiles(values):
+    """p50/p95/p99 in milliseconds"""
+    if not values:
+        return {'count': 0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    ms = np.array(values) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2)
+    }
+
+
+def run_level(args, clients):
+    """Run one load level and collect its results"""
+    base = args.base_url.rstrip('/')
+    feed_url = f'{base}/api/workflow/workflow-video-feed/{args.camera_id}?profile={args.profile}'
+    poll_urls = [
+        f'{base}/api/workflow/workflow-status/{args.camera_id}',
+        f'{base}/api/workflow/workflow-predictions/{args.camera_id}'
+    ]
+    
+    stop_event = threading.Event()
+    streams = [StreamClient(login(base, args.username, args.password), feed_url, stop_event)
+               for _ in range(clients)]
+    pollers = [Poller(login(base, args.username, args.password), poll_urls, args.poll_interval, stop_event)
+               for _ in range(args.pollers)]
+    
+    cpu_before = read_cpu_seconds(args.server_pid) if args.server_pid else None
+    started = time.perf_counter()
+    
+    for thread in streams + pollers:
+        thread.start()
+    time.sleep(args.duration)
+    stop_event.set()
+    
+    elapsed = time.perf_counter() - started
+    cpu_after = read_cpu_seconds(args.server_pid) if args.server_pid else None
+    
+    for thread in streams + pollers:
+        thread.join(timeout=5)
+    
+    fps = [stream.fps for stream in streams]
+    latencies = {url: [] for url in poll_urls}
+    for poller in pollers:
+        for url, values in poller.latencies.items():
+            latencies[url].extend(values)
+    
+    return {
+        'clients': clients,
+        'duration_s': round(elapsed, 2),
+        'fps_per_client': [round(value, 2) for value in fps],
+        'fps_mean': round(float(np.mean(fps)), 2) if fps else 0.0,
+        'fps_min': round(float(np.min(fps)), 2) if fps else 0.0,
+        'stream_errors': [stream.error for stream in streams if stream.error],
+        'server_cpu_percent': round((cpu_after - cpu_before) / elapsed * 100, 1) if args.server_pid else None,
+        'poll_errors': sum(poller.errors for poller in pollers),
+        'endpoints': {url.replace(base, ''): percentiles(values) for url, values in latencies.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--camera-id', default='default')
+    parser.add_argument('--camera-source', help='start workflow detection on this source first')
+    parser.add_argument('--clients', default='1,5,10', help='comma-separated stream client counts')
+    parser.add_argument('--pollers', type=int, default=2, help='JSON pollers per level')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between polls')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds per level')
+    parser.add_argument('--profile', default='stream', help='encode profile requested by stream clients')
+    parser.add_argument('--server-pid', type=int, help='server process to sample CPU from (same host)')
+    parser.add_argument('--output', help='write JSON results to this file ("-" for stdout)')
+    args = parser.parse_args()
+    
+    levels = [int(n) for n in args.clients.split(',') if n.strip()]
+    base = args.base_url.rstrip('/')
+    admin = login(base, args.username, args.password)
+    
+    if args.camera_source is not None:
+        response = admin.post(f'{base}/api/workflow/start-workflow-detection',
+                              json={'camera_id': args.camera_id, 'camera_source': args.camera_source},
+                              timeout=60)
+        print(f"start-workflow-detection: {response.json().get('message')}", file=sys.stderr)
+    
+    results = []
+    try:
+        for clients in levels:
+            print(f"running {clients} stream clients for {args.duration:.0f}s...", file=sys.stderr)
+            results.append(run_level(args, clients))
+    finally:
+        if args.camera_source is not None:
+            admin.post(f'{base}/api/workflow/stop-workflow-detection',
+                       json={'camera_id': args.camera_id}, timeout=30)
+    
+    print(f"{'clients':>8}{'fps mean':>10}{'fps min':>10}{'cpu %':>8}{'status p99':>12}{'preds p99':>11}{'errors':>8}")
+    for r in results:
+        status, predictions = r['endpoints'].values()
+        cpu = f"{r['server_cpu_percent']:.0f}" if r['server_cpu_percent'] is not None else '-'
+        errors = len(r['stream_errors']) + r['poll_errors']
+        print(f"{r['clients']:>8}{r['fps_mean']:>10.1f}{r['fps_min']:>10.1f}{cpu:>8}"
+              f"{status['p99_ms'] or 0:>12.1f}{predictions['p99_ms'] or 0:>11.1f}{errors:>8}")
+    
+    report = {'base_url': base, 'settings': vars(args), 'results': results}
+    report['settings'].pop('password', None)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
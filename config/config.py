@@ -19,18 +19,34 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///surveillance.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
+    DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'auto')  # 'auto' tunes the engine for the URL's database, 'default' keeps SQLAlchemy defaults
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # with WAL, NORMAL only risks the last commits on power loss
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # ms a connection waits for the write lock before failing
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes of the database file read through mmap
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # persistent Postgres connections per process
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))  # extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds before a connection is replaced
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 15000))  # ms before Postgres cancels a query (0 = no limit)
     
     # Session Settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 30))  # seconds a logged-in user is served without a query (0 = off)
     
     # File Upload Settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     DETECTED_EVENTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'detected_events')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'jpg', 'jpeg', 'png'}
+    ASSET_BUILD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app', 'static', 'dist')  # fingerprinted bundles, see app/utils/assets.py
+    ASSET_MAX_AGE = int(os.getenv('ASSET_MAX_AGE', 365 * 24 * 3600))  # seconds browsers may cache a fingerprinted bundle
+    JSON_GZIP_MIN_BYTES = int(os.getenv('JSON_GZIP_MIN_BYTES', 2048))  # gzip JSON list/polling responses from this size (0 = never)
+    JSON_GZIP_LEVEL = int(os.getenv('JSON_GZIP_LEVEL', 5))  # 1 (fast) .. 9 (small)
+    HISTOGRAM_MAX_BUCKETS = int(os.getenv('HISTOGRAM_MAX_BUCKETS', 1000))  # largest range /api/events/histogram answers
+    HISTOGRAM_CACHE_TTL = float(os.getenv('HISTOGRAM_CACHE_TTL', 300))  # seconds closed-bucket counts are reused (deletes in other workers show up after this)
     
     # Roboflow API Settings
     ROBOFLOW_API_KEY = os.getenv('ROBOFLOW_API_KEY', '')
@@ -53,11 +69,52 @@ class Config:
     # Camera Settings
     CAMERA_SOURCE = os.getenv('CAMERA_SOURCE', '0')
     MAX_CAMERAS = int(os.getenv('MAX_CAMERAS', 4))
+    CAMERA_BUFFER_SLOTS = int(os.getenv('CAMERA_BUFFER_SLOTS', 3))  # 2 = double, 3 = triple buffering (minimum 2)
+    CAMERA_RECONNECT_DELAY = float(os.getenv('CAMERA_RECONNECT_DELAY', 1.0))  # seconds, doubled per attempt
+    CAMERA_RECONNECT_MAX_DELAY = float(os.getenv('CAMERA_RECONNECT_MAX_DELAY', 30.0))
+    CAMERA_MAX_RECONNECT_ATTEMPTS = int(os.getenv('CAMERA_MAX_RECONNECT_ATTEMPTS', 0))  # 0 = retry forever
+    CAMERA_STALL_TIMEOUT = float(os.getenv('CAMERA_STALL_TIMEOUT', 5.0))  # seconds without frames before reconnecting
+    CAMERA_LOOP_VIDEO_FILES = os.getenv('CAMERA_LOOP_VIDEO_FILES', 'True') == 'True'
+    CAMERA_CAPTURE_MODE = os.getenv('CAMERA_CAPTURE_MODE', 'thread')  # 'thread' or 'process' (one process per camera)
+    CAMERA_PROCESS_MAX_WIDTH = int(os.getenv('CAMERA_PROCESS_MAX_WIDTH', 1920))  # sizes the shared-memory frame slots
+    CAMERA_PROCESS_MAX_HEIGHT = int(os.getenv('CAMERA_PROCESS_MAX_HEIGHT', 1080))
+    CAMERA_PROCESS_START_TIMEOUT = float(os.getenv('CAMERA_PROCESS_START_TIMEOUT', 15.0))
     
     # Detection Settings
     CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', 0.5))
     DETECTION_CLASSES = os.getenv('DETECTION_CLASSES', 'person,car,truck,bicycle,motorcycle').split(',')
     FRAME_SKIP = int(os.getenv('FRAME_SKIP', 2))
+    INFERENCE_INPUT_SIZE = int(os.getenv('INFERENCE_INPUT_SIZE', 640))  # longest side sent to the model, 0 = no downscale
+    CAMERA_ROIS = os.getenv('CAMERA_ROIS', '')  # JSON: {"camera_id": [[x, y, width, height], ...]}
+    CONFIRMATION_HITS = int(os.getenv('CONFIRMATION_HITS', 3))  # a class must be detected in K ...
+    CONFIRMATION_WINDOW = int(os.getenv('CONFIRMATION_WINDOW', 5))  # ... of the last M processed frames before events are saved
+    CONFIRMATION_CLEAR_HITS = int(os.getenv('CONFIRMATION_CLEAR_HITS', 1))  # stays confirmed while hits in the window >= this
+    ZONE_CONFIG = os.getenv('ZONE_CONFIG', '')  # JSON (or path to a JSON file) of zones and rules per camera, see app/utils/zones.py
+    TRACKER_IOU_THRESHOLD = float(os.getenv('TRACKER_IOU_THRESHOLD', 0.3))  # box overlap that continues a track
+    TRACKER_MAX_AGE = float(os.getenv('TRACKER_MAX_AGE', 2.0))  # seconds unseen before a track (and its event) ends
+    
+    # Metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # bearer token required by /metrics (outside development)
+    PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 60))  # cap for /api/admin/profile
+    
+    # Detector Backend
+    DETECTOR_BACKEND = os.getenv('DETECTOR_BACKEND', 'roboflow')  # 'roboflow' (hosted), 'onnx' (local) or 'synthetic'
+    WORKFLOW_BACKEND = os.getenv('WORKFLOW_BACKEND', 'roboflow')  # 'roboflow' workflow, or any detector backend run locally
+    DETECTOR_WARMUP_RUNS = int(os.getenv('DETECTOR_WARMUP_RUNS', 2))
+    PREWARM_IMPORTS = os.getenv('PREWARM_IMPORTS', 'False') == 'True'  # import the vision/inference stack at startup
+    # Models loaded in the background at startup; /readyz waits for them ('detector', 'workflow')
+    PREWARM_MODELS = [name for name in os.getenv('PREWARM_MODELS', 'detector,workflow').split(',') if name]
+    ONNX_MODEL_PATH = os.getenv('ONNX_MODEL_PATH', 'models/model.onnx')
+    ONNX_CLASS_NAMES = os.getenv('ONNX_CLASS_NAMES', '')  # comma-separated; read from model metadata when empty
+    ONNX_INPUT_SIZE = int(os.getenv('ONNX_INPUT_SIZE', 640))  # used when the model has a dynamic input size
+    ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', 0))  # 0 = onnxruntime default
+    ONNX_INTER_OP_THREADS = int(os.getenv('ONNX_INTER_OP_THREADS', 0))
+    ONNX_NMS_IOU = float(os.getenv('ONNX_NMS_IOU', 0.45))
+    SYNTHETIC_LATENCY_MS = float(os.getenv('SYNTHETIC_LATENCY_MS', 25))  # simulated inference time
+    SYNTHETIC_JITTER_MS = float(os.getenv('SYNTHETIC_JITTER_MS', 5))
+    SYNTHETIC_OBJECTS = int(os.getenv('SYNTHETIC_OBJECTS', 3))  # detections per frame
+    SYNTHETIC_SEED = int(os.getenv('SYNTHETIC_SEED', 0))
     
     # Video Settings
     MAX_VIDEO_CLIP_DURATION = int(os.getenv('MAX_VIDEO_CLIP_DURATION', 10))
@@ -66,6 +123,19 @@ class Config:
     VIDEO_WIDTH = 640
     VIDEO_HEIGHT = 480
     
+    # Encode profiles: optional max width and JPEG quality per consumer
+    ENCODE_PROFILES = {
+        'preview': {'width': int(os.getenv('PREVIEW_WIDTH', 480)), 'quality': int(os.getenv('PREVIEW_JPEG_QUALITY', 60))},
+        'stream': {'width': None, 'quality': int(os.getenv('STREAM_JPEG_QUALITY', 80))},
+        'evidence': {'width': None, 'quality': int(os.getenv('EVIDENCE_JPEG_QUALITY', 95))},
+        'thumbnail': {'width': int(os.getenv('THUMBNAIL_WIDTH', 320)), 'quality': int(os.getenv('THUMBNAIL_JPEG_QUALITY', 70))}
+    }
+    SAVE_EVIDENCE_THUMBNAILS = os.getenv('SAVE_EVIDENCE_THUMBNAILS', 'True') == 'True'
+    THUMBNAIL_SIZES = sorted(int(size) for size in os.getenv('THUMBNAIL_SIZES', '160,320,640').split(','))  # widths /media/events/<id>/thumbnail serves
+    THUMBNAIL_CACHE_FOLDER = os.getenv('THUMBNAIL_CACHE_FOLDER', os.path.join(DETECTED_EVENTS_FOLDER, 'thumbnails'))
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # least recently used thumbnails are evicted past this
+    MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', 0))  # seconds browsers may reuse evidence media without revalidating (0 = always revalidate)
+    
     # Logging Settings
     LOG_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
     LOG_FILE = os.path.join(LOG_FOLDER, 'app.log')
@@ -73,18 +143,70 @@ class Config:
     LOG_BACKUP_COUNT = 5
     
     # SocketIO Settings
-    SOCKETIO_MESSAGE_QUEUE = None
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None  # e.g. redis:// when running several web workers
     SOCKETIO_ASYNC_MODE = 'eventlet'
     
+    # Detection Workers
+    DETECTION_MODE = os.getenv('DETECTION_MODE', 'inline')  # 'inline' (in the web process) or 'worker'
+    MESSAGE_BUS_URL = os.getenv('MESSAGE_BUS_URL', 'memory://')  # memory:// (single process) or redis://host:6379/0
+    DETECTION_WORKER_NAME = os.getenv('DETECTION_WORKER_NAME', 'default')
+    WORKER_PUBLISH_FPS = float(os.getenv('WORKER_PUBLISH_FPS', 15))
+    WORKER_PUBLISH_PROFILES = os.getenv('WORKER_PUBLISH_PROFILES', 'preview,stream').split(',')
+    WORKER_REPLY_TIMEOUT = float(os.getenv('WORKER_REPLY_TIMEOUT', 30))  # seconds to wait for start/stop replies
+    
     @staticmethod
     def init_app(app):
         """Initialize application with configuration"""
+        # Render and Heroku hand out postgres:// URLs, which SQLAlchemy no longer accepts
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        if uri.startswith('postgres://'):
+            app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://' + uri[len('postgres://'):]
+        
+        if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+        
         # Create necessary directories
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(Config.DETECTED_EVENTS_FOLDER, exist_ok=True)
         os.makedirs(Config.LOG_FOLDER, exist_ok=True)
 
 
+def engine_options(settings):
+    """
+    SQLAlchemy engine options of the DATABASE_PROFILE for the database URL
+    
+    SQLite pragmas (WAL, synchronous, mmap) are set per connection by
+    app.models.engine.configure_engine; only the busy timeout is a driver
+    option.
+    
+    Args:
+        settings: App config
+    
+    Returns:
+        dict: Options for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    uri = settings['SQLALCHEMY_DATABASE_URI']
+    if settings['DATABASE_PROFILE'] != 'auto':
+        return {}
+    
+    if uri.startswith('sqlite'):
+        return {'connect_args': {'timeout': settings['SQLITE_BUSY_TIMEOUT'] / 1000}}
+    
+    if uri.startswith('postgresql'):
+        options = {
+            'pool_size': settings['DB_POOL_SIZE'],
+            'max_overflow': settings['DB_MAX_OVERFLOW'],
+            'pool_timeout': settings['DB_POOL_TIMEOUT'],
+            'pool_recycle': settings['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True
+        }
+        if settings['DB_STATEMENT_TIMEOUT']:
+            options['connect_args'] = {'options': f"-c statement_timeout={settings['DB_STATEMENT_TIMEOUT']}"}
+        return options
+    
+    return {}
+
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
@@ -121,6 +243,9 @@ class ProductionConfig(Config):
         app.logger.addHandler(file_handler)
         app.logger.setLevel(logging.INFO)
         app.logger.info('Smart Surveillance System startup')
+        
+        if app.config['METRICS_ENABLED'] and not app.config['METRICS_TOKEN']:
+            app.logger.warning('METRICS_TOKEN is not set, /metrics is disabled')
 
 
 class TestingConfig(Config):
@@ -128,6 +253,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    PREWARM_MODELS = []
 
 
 # Configuration dictionary
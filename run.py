@@ -2,6 +2,7 @@
 Smart Surveillance System - Main Entry Point
 """
 import os
+import click
 from dotenv import load_dotenv
 from app import create_app, db, socketio
 from app.models.user import User
@@ -24,7 +25,10 @@ def make_shell_context():
 @app.cli.command()
 def init_db():
     """Initialize the database"""
+    from app.models.schema import add_missing_columns
     db.create_all()
+    for column in add_missing_columns(db):
+        print(f"Added column {column}")
     print("Database initialized successfully!")
 
 @app.cli.command()
@@ -47,6 +51,39 @@ def create_admin():
     db.session.commit()
     print(f"Admin user '{username}' created successfully!")
 
+@app.cli.command()
+def build_assets():
+    """Build fingerprinted, precompressed static bundles (see app/utils/assets.py)"""
+    from app.utils.assets import build_assets as build
+    
+    for name, filename in build(app.static_folder, app.config['ASSET_BUILD_FOLDER']).items():
+        print(f"{name} -> {filename}")
+
+@app.cli.command()
+@click.option('--name', default=None, help='Worker name control requests are addressed to (default: DETECTION_WORKER_NAME)')
+def detection_worker(name):
+    """Run workflow detection and publish frames to the message bus (DETECTION_MODE=worker)"""
+    from app.utils.detection_worker import DetectionWorker
+    from app.utils.message_bus import create_bus, InProcessBus
+    
+    bus = create_bus(app.config['MESSAGE_BUS_URL'])
+    if isinstance(bus, InProcessBus):
+        raise click.UsageError("MESSAGE_BUS_URL must point to a shared bus such as redis:// "
+                               "for a separate detection worker")
+    
+    worker = DetectionWorker(
+        bus,
+        name or app.config['DETECTION_WORKER_NAME'],
+        publish_fps=app.config['WORKER_PUBLISH_FPS'],
+        profiles=app.config['WORKER_PUBLISH_PROFILES']
+    )
+    print(f"Detection worker '{worker.name}' running on {app.config['MESSAGE_BUS_URL']} (Ctrl+C to stop)")
+    
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+
 if __name__ == '__main__':
     # Check if ngrok should be used (for Google Colab)
     use_ngrok = os.getenv('USE_NGROK', 'False').lower() == 'true'